@@ -1,11 +1,14 @@
 # app.py
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog
 from src.main_window import MainWindow # Импортируем класс главного окна
 from database import connect_db, create_all_tables, close_db # Импортируем функции для работы с БД
 from src.login_dialog import LoginDialog # Импортируем класс диалога входа
 
 if __name__ == "__main__":
+    # Нужен для процессов параллельного импорта CSV в собранном (frozen) приложении
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
 
     # --- Шаг 1: Показать диалог входа ---
@@ -20,7 +23,11 @@ if __name__ == "__main__":
             print("Вход выполнен успешно.")
             db_connection = connect_db()
             if db_connection:
-                create_all_tables(db_connection)
+                if not create_all_tables(db_connection):
+                    QMessageBox.critical(None, "Ошибка базы данных",
+                                         "Не удалось обновить структуру базы данных. Подробности - в журнале консоли.")
+                    close_db(db_connection)
+                    sys.exit(1)
             else:
                 QMessageBox.critical(None, "Ошибка базы данных", "Не удалось подключиться к базе данных.")
                 sys.exit(1)
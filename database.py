@@ -1,10 +1,78 @@
 # database.py
+import os
+import re
 import sys
+import configparser
+from collections import namedtuple
 from PyQt5.QtSql import QSqlDatabase, QSqlQuery, QSqlError
 
-# Используем имя базы данных, которое вы указали
-def connect_db(db_name="st.db"):
-    db = QSqlDatabase.addDatabase("QSQLITE")
+# --- Профили производительности SQLite ---
+# Ключ - название профиля, значение - PRAGMA, применяемые сразу после открытия соединения.
+# Порядок важен: journal_mode переключается первым.
+DB_PROFILES = {
+    "default": {}, # Настройки QSQLITE по умолчанию (rollback journal, synchronous=FULL)
+    "performance": {
+        "journal_mode": "WAL",          # Читатели не блокируются писателями
+        "synchronous": "NORMAL",        # В режиме WAL безопасно и значительно быстрее FULL
+        "mmap_size": 268435456,         # 256 МБ файла базы читаются через mmap
+        "cache_size": -65536,           # 64 МБ кэша страниц (отрицательное значение - в КБ)
+        "temp_store": "MEMORY",         # Временные таблицы и сортировки в памяти
+        "busy_timeout": 5000            # Ждать блокировку до 5 с вместо немедленной ошибки
+    },
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000
+    }
+}
+
+DEFAULT_DB_PROFILE = "performance"
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini")
+
+# Активный профиль для каждого соединения (ключ - имя соединения Qt)
+_active_profiles = {}
+
+def load_db_profile_name():
+    """Возвращает имя профиля из переменной окружения STOCKTAKING_DB_PROFILE или config.ini."""
+    profile_name = os.environ.get("STOCKTAKING_DB_PROFILE")
+    if profile_name:
+        return profile_name
+
+    config = configparser.ConfigParser()
+    if config.read(CONFIG_FILE, encoding="utf-8"):
+        return config.get("database", "profile", fallback=DEFAULT_DB_PROFILE)
+    return DEFAULT_DB_PROFILE
+
+def apply_db_profile(db, profile_name):
+    """Применяет PRAGMA выбранного профиля к открытому соединению."""
+    if profile_name not in DB_PROFILES:
+        print(f"Предупреждение: Неизвестный профиль базы данных '{profile_name}', используется '{DEFAULT_DB_PROFILE}'.")
+        profile_name = DEFAULT_DB_PROFILE
+
+    query = QSqlQuery(db)
+    for pragma, value in DB_PROFILES[profile_name].items():
+        if not query.exec_(f"PRAGMA {pragma} = {value};"):
+            print(f"Предупреждение: Не удалось установить PRAGMA {pragma} = {value}.")
+            print(query.lastError().text())
+
+    _active_profiles[db.connectionName()] = profile_name
+    print(f"Профиль базы данных: {profile_name}")
+    return profile_name
+
+def get_active_profile(db):
+    """Возвращает имя профиля, примененного к соединению."""
+    if db is None:
+        return None
+    return _active_profiles.get(db.connectionName())
+
+# Используем имя базы данных, которое вы указали.
+# connection_name задается для дополнительных соединений (например, в фоновых потоках):
+# соединение Qt можно использовать только в том потоке, где оно создано.
+def connect_db(db_name="st.db", profile=None, connection_name=None):
+    if connection_name:
+        db = QSqlDatabase.addDatabase("QSQLITE", connection_name)
+    else:
+        db = QSqlDatabase.addDatabase("QSQLITE")
     db.setDatabaseName(db_name)
 
     if not db.open():
@@ -12,6 +80,14 @@ def connect_db(db_name="st.db"):
         print(db.lastError().text())
         return None
 
+    # Поддержка внешних ключей в SQLite включается для каждого соединения один раз
+    enable_fk_query = QSqlQuery(db)
+    if not enable_fk_query.exec_("PRAGMA foreign_keys = ON;"):
+        print("Предупреждение: Не удалось включить поддержку внешних ключей.")
+        print(enable_fk_query.lastError().text())
+
+    apply_db_profile(db, profile if profile is not None else load_db_profile_name())
+
     print(f"Успешно подключено к базе данных {db_name}")
     return db
 
@@ -20,6 +96,35 @@ def close_db(db):
         db.close()
         print("Соединение с базой данных закрыто.")
 
+# Функции, освобождающие данные, привязанные к имени соединения (например, кэш справочников);
+# вызываются из remove_connection с именем удаляемого соединения
+_connection_removed_callbacks = []
+
+def on_connection_removed(callback):
+    """Регистрирует callback(имя_соединения), вызываемый при удалении соединения."""
+    _connection_removed_callbacks.append(callback)
+
+def remove_connection(connection_name):
+    """Удаляет именованное соединение Qt (все объекты QSqlDatabase для него должны быть уже освобождены)."""
+    _active_profiles.pop(connection_name, None)
+    for callback in _connection_removed_callbacks:
+        callback(connection_name)
+    QSqlDatabase.removeDatabase(connection_name)
+
+# --- Версии таблиц ---
+# Счетчик изменений по каждой таблице в пределах процесса. Модели и импорт увеличивают его
+# после успешной записи, а открытые представления сравнивают сохраненные версии,
+# чтобы перечитывать данные только если они действительно изменились.
+_table_versions = {}
+
+def mark_tables_changed(*table_names):
+    for table_name in table_names:
+        _table_versions[table_name] = _table_versions.get(table_name, 0) + 1
+
+def get_table_versions(table_names):
+    """Возвращает кортеж текущих версий для списка таблиц."""
+    return tuple(_table_versions.get(table_name, 0) for table_name in table_names)
+
 # --- Определение схемы базы данных ---
 # Используем словарь, где ключ - название таблицы, значение - список определений столбцов
 # Каждое определение столбца - это строка SQL (например, "column_name INTEGER PRIMARY KEY")
@@ -32,6 +137,7 @@ DATABASE_SCHEMA = {
         "id_category VARCHAR(2)", 
         "id_subcategory VARCHAR(2)",
         "subcategory VARCHAR(40) NOT NULL",
+        "UNIQUE (id_category, id_subcategory)", # Подкатегория определяется парой; цель составного FK из Units_inventory
         "FOREIGN KEY (id_category) REFERENCES Category(id_category) ON DELETE SET NULL" # Добавлен FK
     ],
     "Unit_type": [
@@ -58,11 +164,14 @@ DATABASE_SCHEMA = {
         "id_order_status INTEGER",
         "date_issue DATE",
         "notice TEXT",
+        "id_employee INTEGER", # Сотрудник, за которым закреплен объект
         # Добавлены FOREIGN KEYs
         "FOREIGN KEY (id_category) REFERENCES Category(id_category) ON DELETE SET NULL",
-        "FOREIGN KEY (id_subcategory) REFERENCES Subcategory(id_subcategory) ON DELETE SET NULL",
+        # Без ON DELETE SET NULL: иначе удаление подкатегории обнулило бы и id_category
+        "FOREIGN KEY (id_category, id_subcategory) REFERENCES Subcategory(id_category, id_subcategory)",
         "FOREIGN KEY (id_unit_type) REFERENCES Unit_type(id_unit_type) ON DELETE SET NULL",
-        "FOREIGN KEY (id_order_status) REFERENCES Order_status(id_order_status) ON DELETE SET NULL"
+        "FOREIGN KEY (id_order_status) REFERENCES Order_status(id_order_status) ON DELETE SET NULL",
+        "FOREIGN KEY (id_employee) REFERENCES Employee(id_employee) ON DELETE SET NULL"
     ],
     "Units_extended_info": [
         "id_unit_inventory INTEGER PRIMARY KEY UNIQUE", # PK и FK
@@ -102,10 +211,259 @@ DATABASE_SCHEMA = {
         "id_note INTEGER PRIMARY KEY AUTOINCREMENT",
         "section VARCHAR(50)",
         "title VARCHAR(50)",
-        "text TEXT"  
+        "text TEXT"
+    ]
+}
+
+# --- Разобранная схема ---
+# DATABASE_SCHEMA разбирается один раз при импорте модуля; модели, контроллеры и
+# импорт CSV берут отсюда списки столбцов, типы, длины и ключи вместо разбора строк.
+ColumnInfo = namedtuple("ColumnInfo", [
+    "name", "sql_type", "max_length", "primary_key", "autoincrement", "not_null", "unique", "foreign_key",
+])
+ColumnInfo.__doc__ = "Описание столбца; foreign_key - (таблица, столбец), на который он ссылается, или None."
+
+ForeignKeyInfo = namedtuple("ForeignKeyInfo", ["columns", "ref_table", "ref_columns", "on_delete"])
+
+
+class TableInfo:
+    """Описание таблицы: столбцы по порядку, индексы полей по имени, первичный, уникальные и внешние ключи."""
+
+    def __init__(self, name, columns, foreign_keys, unique_constraints=()):
+        self.name = name
+        self.columns = columns
+        self.column_names = [column.name for column in columns]
+        self.field_index = {column.name: i for i, column in enumerate(columns)}
+        self.by_name = {column.name: column for column in columns}
+        self.foreign_keys = foreign_keys
+        self.primary_key = next((column.name for column in columns if column.primary_key), None)
+        self.autoincrement_column = next((column.name for column in columns if column.autoincrement), None)
+        # Наборы столбцов с уникальными значениями: одностолбцовые PRIMARY KEY/UNIQUE и составные UNIQUE (...)
+        self.unique_keys = [(column.name,) for column in columns if column.unique] + list(unique_constraints)
+
+    def column(self, column_name):
+        return self.by_name.get(column_name)
+
+    def max_length(self, column_name):
+        column = self.by_name.get(column_name)
+        return column.max_length if column else None
+
+
+_TYPE_PATTERN = re.compile(r"^(\w+)\s*(?:\((\d+)\))?", re.IGNORECASE)
+_UNIQUE_PATTERN = re.compile(r"UNIQUE\s*\(([^)]*)\)", re.IGNORECASE)
+# Ограничения уровня таблицы, которые не являются столбцами
+_TABLE_CONSTRAINT_PATTERN = re.compile(r"^(?:(?:FOREIGN\s+KEY|UNIQUE|PRIMARY\s+KEY|CHECK)\s*\(|CONSTRAINT\s)", re.IGNORECASE)
+_FOREIGN_KEY_PATTERN = re.compile(
+    r"FOREIGN KEY\s*\(([^)]*)\)\s*REFERENCES\s+(\w+)\s*\(([^)]*)\)(?:\s+ON DELETE\s+(SET NULL|CASCADE|RESTRICT|NO ACTION|SET DEFAULT))?",
+    re.IGNORECASE)
+
+
+def _split_names(text):
+    return tuple(name.strip() for name in text.split(",") if name.strip())
+
+
+def _parse_table(table_name, column_definitions):
+    columns = []
+    foreign_keys = []
+    unique_constraints = []
+    for definition in column_definitions:
+        definition = definition.strip()
+        if _TABLE_CONSTRAINT_PATTERN.match(definition):
+            foreign_key_match = _FOREIGN_KEY_PATTERN.match(definition)
+            unique_match = _UNIQUE_PATTERN.match(definition)
+            if foreign_key_match:
+                foreign_keys.append(ForeignKeyInfo(_split_names(foreign_key_match.group(1)), foreign_key_match.group(2),
+                                                   _split_names(foreign_key_match.group(3)),
+                                                   (foreign_key_match.group(4) or "").upper() or None))
+            elif unique_match:
+                unique_constraints.append(_split_names(unique_match.group(1)))
+            continue
+        name, _, rest = definition.partition(" ")
+        upper_rest = rest.upper()
+        type_match = _TYPE_PATTERN.match(rest.strip())
+        columns.append(ColumnInfo(
+            name=name,
+            sql_type=type_match.group(1).upper() if type_match else "",
+            max_length=int(type_match.group(2)) if type_match and type_match.group(2) else None,
+            primary_key="PRIMARY KEY" in upper_rest,
+            autoincrement="AUTOINCREMENT" in upper_rest,
+            not_null="NOT NULL" in upper_rest,
+            unique="UNIQUE" in upper_rest or "PRIMARY KEY" in upper_rest,
+            foreign_key=None,
+        ))
+
+    # Ссылка дублируется в описании столбца; если столбец входит в несколько ключей,
+    # приоритет у одностолбцового (id_category -> Category, а не пара из Subcategory)
+    column_references = {}
+    for fk in sorted(foreign_keys, key=lambda fk: len(fk.columns)):
+        for column_name, ref_column in zip(fk.columns, fk.ref_columns):
+            column_references.setdefault(column_name, (fk.ref_table, ref_column))
+    columns = [column._replace(foreign_key=column_references.get(column.name)) for column in columns]
+    return TableInfo(table_name, columns, foreign_keys, unique_constraints)
+
+
+SCHEMA = {table_name: _parse_table(table_name, definitions) for table_name, definitions in DATABASE_SCHEMA.items()}
+
+
+def get_table_info(table_name):
+    """Возвращает TableInfo таблицы или None, если таблицы нет в схеме."""
+    return SCHEMA.get(table_name)
+
+
+def get_column_names(table_name):
+    """Список столбцов таблицы в порядке схемы (без определений FOREIGN KEY)."""
+    table_info = SCHEMA.get(table_name)
+    return list(table_info.column_names) if table_info else []
+
+def get_id_column_digits(table_name):
+    """
+    Ширина идентификаторов-строк таблицы для дополнения нулями при импорте: {столбец: n} для
+    столбцов id_* типа VARCHAR(n) (ID справочников хранятся как '01', '02', ...). Используется
+    всеми путями импорта, чтобы один и тот же файл давал одинаковые значения.
+    """
+    table_info = SCHEMA.get(table_name)
+    if table_info is None:
+        return {}
+    return {column.name: column.max_length for column in table_info.columns
+            if column.name.startswith("id_") and column.sql_type == "VARCHAR" and column.max_length}
+
+def sort_tables_by_dependencies(table_names):
+    """
+    Упорядочивает таблицы так, чтобы таблицы, на которые ссылаются внешние ключи (по SCHEMA),
+    шли раньше ссылающихся. Порядок независимых таблиц сохраняется; ссылки на себя не учитываются.
+    """
+    remaining = list(dict.fromkeys(table_names))
+    ordered = []
+    while remaining:
+        for table_name in remaining:
+            table_info = SCHEMA.get(table_name)
+            dependencies = {fk.ref_table for fk in table_info.foreign_keys} if table_info else set()
+            if not dependencies.intersection(remaining) - {table_name}:
+                break
+        else:
+            table_name = remaining[0] # Циклическая зависимость: берем первую по порядку
+        remaining.remove(table_name)
+        ordered.append(table_name)
+    return ordered
+
+# --- Определение индексов ---
+# Ключ - название таблицы, значение - список индексов в виде кортежей (имя индекса, список столбцов).
+# Составные индексы перечисляют столбцы в порядке, в котором они используются в фильтрах и сортировке.
+DATABASE_INDEXES = {
+    "Subcategory": [
+        # Пара (id_category, id_subcategory) индексируется ограничением UNIQUE из схемы
+        ("idx_subcategory_id_subcategory", ["id_subcategory"]) # Проверка уникальности ID подкатегории
+    ],
+    "Units_inventory": [
+        ("idx_units_inventory_category_subcategory", ["id_category", "id_subcategory"]),
+        ("idx_units_inventory_subcategory", ["id_subcategory"]),
+        ("idx_units_inventory_unit_type", ["id_unit_type"]),
+        ("idx_units_inventory_order_status", ["id_order_status"]),
+        ("idx_units_inventory_date_inventory_number", ["date_order_buhgaltery", "inventory_number"]), # BETWEEN + ORDER BY в отчетах
+        ("idx_units_inventory_inventory_number", ["inventory_number"]),
+        ("idx_units_inventory_employee", ["id_employee"])
+    ],
+    "Employee": [
+        ("idx_employee_department", ["id_department"])
+    ],
+    "Departments": [
+        ("idx_departments_id_department", ["id_department"]) # Связь Employee -> Departments
     ]
 }
 
+# --- Полнотекстовый поиск (FTS5) по инвентаризации ---
+# Теневая таблица хранит текстовые столбцы Units_inventory и Units_extended_info,
+# rowid совпадает с id_unit_inventory. Токенизатор trigram дает поиск по подстроке
+# (как LIKE '%...%'), но через индекс.
+INVENTORY_FTS_TABLE = "Units_inventory_fts"
+INVENTORY_FTS_COLUMNS = {
+    "Units_inventory": ["inventory_number", "serial_number", "manufacturer", "model", "series", "cabinet", "notice"],
+    "Units_extended_info": ["device_name", "ip", "mac"]
+}
+
+def _inventory_fts_column_names():
+    return INVENTORY_FTS_COLUMNS["Units_inventory"] + INVENTORY_FTS_COLUMNS["Units_extended_info"]
+
+def _inventory_fts_refresh_sql(id_expression):
+    """SQL, заново индексирующий одну запись инвентаризации (id_expression - NEW/OLD.id_unit_inventory)."""
+    select_cols = [f"ui.{col}" for col in INVENTORY_FTS_COLUMNS["Units_inventory"]] + \
+                  [f"uei.{col}" for col in INVENTORY_FTS_COLUMNS["Units_extended_info"]]
+    return (f"DELETE FROM {INVENTORY_FTS_TABLE} WHERE rowid = {id_expression}; "
+            f"INSERT INTO {INVENTORY_FTS_TABLE} (rowid, {', '.join(_inventory_fts_column_names())}) "
+            f"SELECT ui.id_unit_inventory, {', '.join(select_cols)} FROM Units_inventory ui "
+            f"LEFT JOIN Units_extended_info uei ON uei.id_unit_inventory = ui.id_unit_inventory "
+            f"WHERE ui.id_unit_inventory = {id_expression};")
+
+# Триггеры, поддерживающие теневую таблицу в актуальном состоянии: (имя, событие, тело)
+INVENTORY_FTS_TRIGGERS = [
+    ("trg_units_inventory_fts_insert", "AFTER INSERT ON Units_inventory",
+     _inventory_fts_refresh_sql("NEW.id_unit_inventory")),
+    ("trg_units_inventory_fts_update", "AFTER UPDATE ON Units_inventory",
+     f"DELETE FROM {INVENTORY_FTS_TABLE} WHERE rowid = OLD.id_unit_inventory; " + _inventory_fts_refresh_sql("NEW.id_unit_inventory")),
+    ("trg_units_inventory_fts_delete", "AFTER DELETE ON Units_inventory",
+     f"DELETE FROM {INVENTORY_FTS_TABLE} WHERE rowid = OLD.id_unit_inventory;"),
+    ("trg_units_extended_info_fts_insert", "AFTER INSERT ON Units_extended_info",
+     _inventory_fts_refresh_sql("NEW.id_unit_inventory")),
+    ("trg_units_extended_info_fts_update", "AFTER UPDATE ON Units_extended_info",
+     _inventory_fts_refresh_sql("OLD.id_unit_inventory") + " " + _inventory_fts_refresh_sql("NEW.id_unit_inventory")),
+    ("trg_units_extended_info_fts_delete", "AFTER DELETE ON Units_extended_info",
+     _inventory_fts_refresh_sql("OLD.id_unit_inventory"))
+]
+
+def inventory_fts_available(db):
+    """Проверяет, создана ли теневая таблица полнотекстового поиска."""
+    query = QSqlQuery(db)
+    query.prepare("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?")
+    query.addBindValue(INVENTORY_FTS_TABLE)
+    return query.exec_() and query.next()
+
+def create_inventory_fts_triggers(db):
+    query = QSqlQuery(db)
+    for trigger_name, event, body in INVENTORY_FTS_TRIGGERS:
+        if not query.exec_(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {event} BEGIN {body} END"):
+            print(f"Ошибка при создании триггера '{trigger_name}':", query.lastError().text())
+            return False
+    return True
+
+def drop_inventory_fts_triggers(db):
+    """Удаляет триггеры синхронизации (для массовой загрузки с последующим rebuild_inventory_fts)."""
+    query = QSqlQuery(db)
+    for trigger_name, _, _ in INVENTORY_FTS_TRIGGERS:
+        if not query.exec_(f"DROP TRIGGER IF EXISTS {trigger_name}"):
+            print(f"Ошибка при удалении триггера '{trigger_name}':", query.lastError().text())
+            return False
+    return True
+
+def rebuild_inventory_fts(db):
+    """Полностью перестраивает теневую таблицу по текущим данным."""
+    if not inventory_fts_available(db):
+        return True # FTS5 недоступен - поиск работает через LIKE
+    select_cols = [f"ui.{col}" for col in INVENTORY_FTS_COLUMNS["Units_inventory"]] + \
+                  [f"uei.{col}" for col in INVENTORY_FTS_COLUMNS["Units_extended_info"]]
+    query = QSqlQuery(db)
+    if not query.exec_(f"DELETE FROM {INVENTORY_FTS_TABLE}"):
+        print("Ошибка при очистке индекса полнотекстового поиска:", query.lastError().text())
+        return False
+    if not query.exec_(f"INSERT INTO {INVENTORY_FTS_TABLE} (rowid, {', '.join(_inventory_fts_column_names())}) "
+                       f"SELECT ui.id_unit_inventory, {', '.join(select_cols)} FROM Units_inventory ui "
+                       f"LEFT JOIN Units_extended_info uei ON uei.id_unit_inventory = ui.id_unit_inventory"):
+        print("Ошибка при заполнении индекса полнотекстового поиска:", query.lastError().text())
+        return False
+    return True
+
+def create_inventory_fts(db):
+    """Создает теневую таблицу FTS5, триггеры синхронизации и индексирует существующие записи."""
+    query = QSqlQuery(db)
+    create_sql = (f"CREATE VIRTUAL TABLE IF NOT EXISTS {INVENTORY_FTS_TABLE} "
+                  f"USING fts5({', '.join(_inventory_fts_column_names())}, tokenize = 'trigram')")
+    print(f"Выполнение SQL для {INVENTORY_FTS_TABLE}: {create_sql}") # Для отладки
+    if not query.exec_(create_sql):
+        # Сборка SQLite без FTS5/trigram: приложение продолжает работать с фильтрами LIKE
+        print("Предупреждение: Полнотекстовый поиск FTS5 недоступен, используются фильтры LIKE.")
+        print(query.lastError().text())
+        return True
+    return create_inventory_fts_triggers(db) and rebuild_inventory_fts(db)
+
 # --- Отдельные функции для создания каждой таблицы ---
 
 def create_table(db, table_name, column_definitions):
@@ -118,14 +476,6 @@ def create_table(db, table_name, column_definitions):
     create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_definitions)})"
     print(f"Выполнение SQL для {table_name}: {create_table_sql}") # Для отладки
 
-    # Включаем поддержку внешних ключей в SQLite, если она еще не включена
-    # Это нужно делать для каждого соединения
-    enable_fk_query = QSqlQuery("PRAGMA foreign_keys = ON;", db)
-    if not enable_fk_query.exec_():
-        print("Предупреждение: Не удалось включить поддержку внешних ключей.")
-        print(enable_fk_query.lastError().text())
-
-
     if not query.exec_(create_table_sql):
         print(f"Ошибка при создании таблицы '{table_name}':")
         print(query.lastError().text())
@@ -133,6 +483,46 @@ def create_table(db, table_name, column_definitions):
     print(f"Таблица '{table_name}' проверена/создана.")
     return True
 
+def create_index(db, table_name, index_name, columns):
+    """Создает индекс на таблице, если он еще не существует."""
+    if db is None or not db.isOpen():
+        print(f"Ошибка: База данных не открыта для создания индекса {index_name}.")
+        return False
+
+    query = QSqlQuery(db)
+    create_index_sql = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})"
+    print(f"Выполнение SQL для {table_name}: {create_index_sql}") # Для отладки
+
+    if not query.exec_(create_index_sql):
+        print(f"Ошибка при создании индекса '{index_name}' для таблицы '{table_name}':")
+        print(query.lastError().text())
+        return False
+    return True
+
+def drop_table_indexes(db, table_name):
+    """Удаляет индексы из DATABASE_INDEXES для таблицы (перед массовой загрузкой; восстанавливаются create_table_indexes)."""
+    query = QSqlQuery(db)
+    for index_name, _ in DATABASE_INDEXES.get(table_name, []):
+        if not query.exec_(f"DROP INDEX IF EXISTS {index_name}"):
+            print(f"Ошибка при удалении индекса '{index_name}':", query.lastError().text())
+            return False
+    return True
+
+def create_table_indexes(db, table_name, existing_columns_only=False):
+    """
+    Создает все индексы, объявленные в DATABASE_INDEXES для таблицы.
+    При existing_columns_only пропускаются индексы по столбцам, которых в таблице еще нет
+    (их добавляет более поздняя миграция, она же и создает индекс).
+    """
+    success = True
+    existing_columns = set(get_table_columns(db, table_name)) if existing_columns_only else None
+    for index_name, columns in DATABASE_INDEXES.get(table_name, []):
+        if existing_columns is not None and not existing_columns.issuperset(columns):
+            print(f"Индекс '{index_name}' пропущен: столбцов {', '.join(columns)} еще нет в таблице '{table_name}'.")
+            continue
+        if not create_index(db, table_name, index_name, columns): success = False
+    return success
+
 # Функции для создания каждой конкретной таблицы
 def create_category_table(db):
     return create_table(db, "Category", DATABASE_SCHEMA["Category"])
@@ -166,17 +556,109 @@ def create_note_table(db):
 
 
 
-# --- Главная функция создания всех таблиц ---
-def create_all_tables(db):
-    if db is None or not db.isOpen():
-        print("Ошибка: База данных не открыта для создания всех таблиц.")
+def add_column_if_missing(db, table_name, column_definition):
+    """Добавляет столбец в существующую таблицу (ALTER TABLE), если его еще нет."""
+    column_name = column_definition.split()[0]
+    query = QSqlQuery(db)
+    if not query.exec_(f"PRAGMA table_info({table_name})"):
+        print(f"Ошибка при чтении структуры таблицы '{table_name}':", query.lastError().text())
+        return False
+    while query.next():
+        if query.value(1) == column_name:
+            return True # Столбец уже существует (например, таблица создана по актуальной схеме)
+
+    alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {column_definition}"
+    print(f"Выполнение SQL для {table_name}: {alter_sql}") # Для отладки
+    if not query.exec_(alter_sql):
+        print(f"Ошибка при добавлении столбца '{column_name}' в таблицу '{table_name}':")
+        print(query.lastError().text())
+        return False
+    return True
+
+def get_table_columns(db, table_name):
+    """Список столбцов существующей таблицы в базе (PRAGMA table_info)."""
+    query = QSqlQuery(db)
+    columns = []
+    if query.exec_(f"PRAGMA table_info({table_name})"):
+        while query.next():
+            columns.append(query.value(1))
+    return columns
+
+def table_has_unique_key(db, table_name, columns):
+    """Есть ли у таблицы уникальный индекс (в том числе от ограничения UNIQUE) ровно по столбцам columns."""
+    query = QSqlQuery(db)
+    index_query = QSqlQuery(db)
+    if not query.exec_(f"PRAGMA index_list({table_name})"):
+        return False
+    while query.next():
+        if not query.value(2): # Неуникальный индекс
+            continue
+        index_columns = []
+        if index_query.exec_(f"PRAGMA index_info({query.value(1)})"):
+            while index_query.next():
+                index_columns.append(index_query.value(2))
+        if index_columns == list(columns):
+            return True
+    return False
+
+def table_has_foreign_key(db, table_name, columns, ref_table):
+    """Есть ли у таблицы внешний ключ по столбцам columns на ref_table."""
+    query = QSqlQuery(db)
+    keys = {}
+    if query.exec_(f"PRAGMA foreign_key_list({table_name})"):
+        while query.next():
+            if query.value(2) == ref_table:
+                keys.setdefault(query.value(0), []).append(query.value(3))
+    return list(columns) in keys.values()
+
+def rebuild_table(db, table_name):
+    """
+    Пересоздает таблицу по текущему DATABASE_SCHEMA, сохраняя данные общих столбцов
+    (SQLite не умеет менять ограничения через ALTER TABLE). Индексы из DATABASE_INDEXES
+    создаются заново. Внешние ключи должны быть отключены (см. apply_migrations), а триггеры,
+    ссылающиеся на таблицу из других таблиц, - удалены на время перестройки.
+    """
+    new_table_name = f"{table_name}_rebuild"
+    query = QSqlQuery(db)
+    if not query.exec_(f"DROP TABLE IF EXISTS {new_table_name}") or \
+       not create_table(db, new_table_name, DATABASE_SCHEMA[table_name]):
         return False
 
+    old_columns = set(get_table_columns(db, table_name))
+    common_columns = ", ".join(col for col in get_column_names(table_name) if col in old_columns)
+    steps = [
+        f"INSERT INTO {new_table_name} ({common_columns}) SELECT {common_columns} FROM {table_name}",
+        f"DROP TABLE {table_name}",
+        f"ALTER TABLE {new_table_name} RENAME TO {table_name}",
+    ]
+    for sql in steps:
+        print(f"Выполнение SQL для {table_name}: {sql}") # Для отладки
+        if not query.exec_(sql):
+            print(f"Ошибка при перестройке таблицы '{table_name}':")
+            print(query.lastError().text())
+            return False
+    return create_table_indexes(db, table_name)
+
+def report_foreign_key_violations(db, table_name):
+    """Печатает нарушения внешних ключей таблицы; возвращает их количество."""
     query = QSqlQuery(db)
-    if not query.exec_("PRAGMA foreign_keys = ON;"):
-         print("Предупреждение: Не удалось включить поддержку внешних ключей перед созданием таблиц.")
-         print(query.lastError().text())
+    violations = 0
+    if query.exec_(f"PRAGMA foreign_key_check({table_name})"):
+        while query.next():
+            violations += 1
+            if violations <= 10:
+                print(f"Предупреждение: {table_name} (rowid {query.value(1)}) ссылается на несуществующую запись в {query.value(2)}.")
+    if violations:
+        print(f"Предупреждение: В таблице '{table_name}' нарушений внешних ключей: {violations}.")
+    return violations
 
+
+# --- Шаги миграции схемы ---
+# Каждый шаг - функция, принимающая соединение и возвращающая True/False.
+# Шаги выполняются строго по порядку, каждый в своей транзакции.
+
+def _migration_create_tables(db):
+    """Создает все таблицы из DATABASE_SCHEMA (с учетом зависимостей внешних ключей)."""
     success = True
     if not create_category_table(db): success = False
     if not create_subcategory_table(db): success = False # Зависит от Category
@@ -188,4 +670,119 @@ def create_all_tables(db):
     if not create_departments_table(db): success = False
     if not create_group_dc_table(db): success = False
     if not create_note_table(db): success = False
-    return success
\ No newline at end of file
+    return success
+
+def _migration_create_indexes(db):
+    """
+    Создает индексы из DATABASE_INDEXES. Список индексов читается текущий, а таблицы старой базы
+    на этом шаге еще в прежней схеме, поэтому индексы по столбцам из поздних миграций
+    (например, id_employee из миграции 4) пропускаются: их создает rebuild_table.
+    """
+    success = True
+    for table_name in DATABASE_INDEXES:
+        if not create_table_indexes(db, table_name, existing_columns_only=True): success = False
+    return success
+
+def _migration_subcategory_keys(db):
+    """
+    Составной ключ подкатегории: UNIQUE (id_category, id_subcategory) в Subcategory и
+    FOREIGN KEY (id_category, id_subcategory) в Units_inventory вместо ссылки на неуникальный
+    id_subcategory (из-за нее любая вставка/удаление в Units_inventory завершалась ошибкой
+    "foreign key mismatch"). Заодно добавляется столбец id_employee.
+    """
+    # Новая база создана миграцией 1 уже по актуальной схеме - перестраивать нечего
+    if table_has_unique_key(db, "Subcategory", ["id_category", "id_subcategory"]) and \
+       table_has_foreign_key(db, "Units_inventory", ["id_category", "id_subcategory"], "Subcategory") and \
+       "id_employee" in get_table_columns(db, "Units_inventory"):
+        print("Таблицы Subcategory и Units_inventory уже соответствуют схеме, перестройка не нужна.")
+        return True
+    fts_available = inventory_fts_available(db)
+    # Триггеры Units_extended_info ссылаются на Units_inventory и мешают ее переименованию
+    if fts_available and not drop_inventory_fts_triggers(db):
+        return False
+    if not rebuild_table(db, "Subcategory"):
+        print("Ошибка: Не удалось перестроить Subcategory. Проверьте, нет ли повторяющихся пар (id_category, id_subcategory).")
+        return False
+    if not rebuild_table(db, "Units_inventory"):
+        return False
+    if fts_available and not create_inventory_fts_triggers(db):
+        return False
+    report_foreign_key_violations(db, "Units_inventory")
+    return True
+
+# Упорядоченный список миграций: (версия, описание, функция).
+# Новые изменения схемы добавляются в конец списка со следующим номером версии;
+# уже выпущенные шаги не редактируются, иначе существующие st.db их не получат.
+MIGRATIONS = [
+    (1, "Создание таблиц из DATABASE_SCHEMA", _migration_create_tables),
+    (2, "Создание индексов из DATABASE_INDEXES", _migration_create_indexes),
+    (3, "Полнотекстовый поиск FTS5 по инвентаризации", create_inventory_fts),
+    (4, "Составной внешний ключ подкатегории и сотрудник в Units_inventory", _migration_subcategory_keys),
+]
+
+SCHEMA_VERSION_TABLE = "Schema_version"
+
+
+def get_schema_version(db):
+    """Возвращает номер последней примененной миграции (0 для новой базы данных)."""
+    query = QSqlQuery(db)
+    # Если таблицы версий еще нет, запрос завершится ошибкой - это новая база
+    if not query.exec_(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}") or not query.next():
+        return 0
+    version = query.value(0)
+    return int(version) if version else 0
+
+def apply_migrations(db):
+    """Применяет недостающие миграции. Если версия базы актуальна, DDL не выполняется."""
+    if db is None or not db.isOpen():
+        print("Ошибка: База данных не открыта для применения миграций.")
+        return False
+
+    latest_version = MIGRATIONS[-1][0]
+    current_version = get_schema_version(db)
+    if current_version >= latest_version:
+        print(f"Схема базы данных актуальна (версия {current_version}).")
+        return True
+
+    query = QSqlQuery(db)
+    if not query.exec_(f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+                       "version INTEGER PRIMARY KEY, "
+                       "description TEXT, "
+                       "applied_at TEXT DEFAULT CURRENT_TIMESTAMP)"):
+        print("Ошибка при создании таблицы версий схемы:", query.lastError().text())
+        return False
+
+    # Перестройка таблиц (DROP/RENAME) возможна только с отключенными внешними ключами;
+    # PRAGMA foreign_keys не действует внутри транзакции, поэтому переключается здесь
+    query.exec_("PRAGMA foreign_keys = OFF;")
+    try:
+        for version, description, migration in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            print(f"Применение миграции {version}: {description}")
+            db.transaction()
+            if not migration(db):
+                db.rollback()
+                print(f"Ошибка: Миграция {version} не применена, изменения отменены.")
+                return False
+
+            query.prepare(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (?, ?)")
+            query.addBindValue(version)
+            query.addBindValue(description)
+            if not query.exec_() or not db.commit():
+                print(f"Ошибка при сохранении версии схемы {version}:", query.lastError().text())
+                db.rollback()
+                return False
+    finally:
+        if not query.exec_("PRAGMA foreign_keys = ON;"):
+            print("Предупреждение: Не удалось включить поддержку внешних ключей.")
+
+    print(f"Схема базы данных обновлена до версии {latest_version}.")
+    return True
+
+
+# --- Главная функция создания всех таблиц ---
+def create_all_tables(db):
+    """Приводит схему базы данных к актуальной версии через механизм миграций."""
+    return apply_migrations(db)
@@ -1,5 +1,4 @@
 # File: src/controller/generic_lookup_controller.py
-import re
 from PyQt5.QtWidgets import QMessageBox, QFileDialog, QDialog
 from PyQt5.QtCore import QDate, QObject
 
@@ -7,8 +6,9 @@ from PyQt5.QtCore import QDate, QObject
 from src.model._generic_model import GenericModel
 from src.view._generic_view import GenericView
 
-from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
-from database import DATABASE_SCHEMA
+from src.utils.csv_handler import import_data_from_csv, export_data_to_csv, EXPORT_FILE_FILTER
+from src.utils.background_jobs import run_database_job
+from database import get_column_names, get_table_info
 
 
 class GenericController(QObject):
@@ -17,6 +17,8 @@ class GenericController(QObject):
 
         self.db = db_connection
         self.table_name = table_name
+        # Таблицы, изменение которых требует перечитать данные представления
+        self.watched_tables = [table_name]
         self.id_column = id_column
         self.name_column = name_column
         self.unique_name_column = unique_name_column if unique_name_column is not None else name_column
@@ -38,13 +40,10 @@ class GenericController(QObject):
         self.view = GenericView(view_title=self.view_title, add_input_placeholder=self.add_input_placeholder)
         self.view.set_model(self.model.get_model())
 
-        for col_def in DATABASE_SCHEMA.get(self.table_name, []):
-             if col_def.strip().startswith(self.name_column):
-                 match = re.search(r'VARCHAR\((\d+)\)', col_def, re.IGNORECASE)
-                 if match:
-                     max_len = int(match.group(1))
-                     self.view.add_input.setMaxLength(max_len)
-                     break
+        table_info = get_table_info(self.table_name)
+        max_len = table_info.max_length(self.name_column) if table_info else None
+        if max_len:
+            self.view.add_input.setMaxLength(max_len)
 
         self.view.add_item_requested.connect(self.add_item)
         self.view.delete_item_requested.connect(self.delete_item)
@@ -56,6 +55,10 @@ class GenericController(QObject):
     def get_view(self):
         return self.view
 
+    def reload_data(self):
+        """Перечитывает данные без сообщений пользователю (вызывается главным окном при изменении таблиц)."""
+        return self.model.load_data() if self.model else False
+
     def refresh_list(self):
         if self.model and self.model.load_data():
             QMessageBox.information(self.view, "Обновление", f"Список '{self.view_title}' обновлен.")
@@ -64,7 +67,6 @@ class GenericController(QObject):
 
     def handle_model_error(self, error_message):
         QMessageBox.critical(self.view, "Ошибка сохранения", f"Не удалось сохранить изменение: {error_message}")
-        self.refresh_list()
 
 
     def add_item(self):
@@ -78,7 +80,6 @@ class GenericController(QObject):
         if success:
             QMessageBox.information(self.view, "Успех", message)
             self.view.clear_add_input()
-            self.refresh_list()
         else:
             QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -99,7 +100,6 @@ class GenericController(QObject):
             success, message = self.model.delete_item(row)
             if success:
                 QMessageBox.information(self.view, "Успех", message)
-                self.refresh_list()
             else:
                 QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -113,45 +113,51 @@ class GenericController(QObject):
         if file_path:
             print(f"Выбран файл для импорта в {self.table_name}: {file_path}")
 
-            all_table_cols = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            all_table_cols = get_column_names(self.table_name)
 
+            # Строковые ID фиксированной длины дополняются нулями до длины VARCHAR(n)
             column_digits = {}
-            for col_def in DATABASE_SCHEMA.get(self.table_name, []):
-                 if col_def.strip().startswith(self.id_column) and "VARCHAR" in col_def.upper():
-                     match = re.search(r'VARCHAR\((\d+)\)', col_def, re.IGNORECASE)
-                     if match:
-                         column_digits[self.id_column] = int(match.group(1))
-                         break
+            table_info = get_table_info(self.table_name)
+            id_info = table_info.column(self.id_column) if table_info else None
+            if id_info and id_info.sql_type == "VARCHAR" and id_info.max_length:
+                column_digits[self.id_column] = id_info.max_length
 
           
-            success, message = import_data_from_csv(self.db, file_path, self.table_name, all_table_cols, column_digits=column_digits, unique_column=self.unique_name_column)
-
-            if success:
-                QMessageBox.information(self.view, "Импорт завершен", message)
-                self.refresh_list()
-            else:
-                QMessageBox.critical(self.view, "Ошибка импорта", message)
+            # Импорт выполняется в фоновом потоке, результат приходит в _on_import_finished
+            run_database_job(self.view, f"Импорт в таблицу '{self.table_name}'", self.db,
+                             lambda db, progress: import_data_from_csv(db, file_path, self.table_name, all_table_cols, column_digits=column_digits, unique_column=self.unique_name_column, progress_callback=progress),
+                             self._on_import_finished)
         else:
             print("Выбор файла отменен.")
 
+    def _on_import_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Импорт завершен", message)
+            self.refresh_list()
+        else:
+            QMessageBox.critical(self.view, "Ошибка импорта", message)
+
     def export_items(self):
         if self.db is None or not self.db.isOpen():
              QMessageBox.warning(self.view, "Предупреждение", "Невозможно выполнить экспорт: соединение с базой данных отсутствует.")
              return
 
         default_filename = f"{self.table_name}_export_{QDate.currentDate().toString('yyyyMMdd')}.csv"
-        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.table_name}'", default_filename, "CSV файлы (*.csv);;Все файлы (*)")
+        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.table_name}'", default_filename, EXPORT_FILE_FILTER)
         if file_path:
             print(f"Выбран файл для экспорта из {self.table_name}: {file_path}")
-            all_table_cols = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            all_table_cols = get_column_names(self.table_name)
             cols_to_export = all_table_cols
 
-            success, message = export_data_to_csv(self.db, file_path, self.table_name, cols_to_export)
+            run_database_job(self.view, f"Экспорт из таблицы '{self.table_name}'", self.db,
+                             lambda db, progress: export_data_to_csv(db, file_path, self.table_name, cols_to_export, progress_callback=progress),
+                             lambda success, message: self._on_export_finished(success, message, file_path))
+        else:
+            print("Сохранение отчета отменено.")
 
-            if success:
-                QMessageBox.information(self.view, "Экспорт завершен", message)
-                print(f"Экспорт сохранен: {file_path}")
-            else:
-                QMessageBox.critical(self.view, "Ошибка экспорта", message)
+    def _on_export_finished(self, success, message, file_path):
+        if success:
+            QMessageBox.information(self.view, "Экспорт завершен", message)
+            print(f"Экспорт сохранен: {file_path}")
         else:
-            print("Сохранение отчета отменено.")
\ No newline at end of file
+            QMessageBox.critical(self.view, "Ошибка экспорта", message)
\ No newline at end of file
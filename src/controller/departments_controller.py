@@ -3,14 +3,17 @@ from PyQt5.QtCore import QDate
 
 from src.model.departments_model import DepartmentsModel
 from src.view.departments_view import DepartmentsView, DepartmentDialog
-from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
+from src.utils.csv_handler import import_data_from_csv, export_data_to_csv, EXPORT_FILE_FILTER
+from src.utils.background_jobs import run_database_job
 
-from database import DATABASE_SCHEMA
+from database import get_column_names, get_id_column_digits
 
 
 class DepartmentsController:
     def __init__(self, db_connection):
         self.db = db_connection
+        # Таблицы, изменение которых требует перечитать данные представления
+        self.watched_tables = ["Departments"]
         if not self.db or not self.db.isOpen():
             print("Ошибка: Соединение с базой данных не установлено или закрыто. Контроллер отделов не может быть инициализирован.")
             self.model = None
@@ -33,6 +36,10 @@ class DepartmentsController:
     def get_view(self):
         return self.view
 
+    def reload_data(self):
+        """Перечитывает данные без сообщений пользователю (вызывается главным окном при изменении таблиц)."""
+        return self.model.load_data() if self.model else False
+
     def refresh_list(self):
         if self.model and self.model.load_data():
             QMessageBox.information(self.view, "Обновление", "Список отделов обновлен.")
@@ -48,7 +55,6 @@ class DepartmentsController:
                 success, message = self.model.add_department(data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list()
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -70,7 +76,6 @@ class DepartmentsController:
                 success, message = self.model.update_department(row, new_data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list()
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -93,7 +98,6 @@ class DepartmentsController:
             success, message = self.model.delete_department(row)
             if success:
                 QMessageBox.information(self.view, "Успех", message)
-                self.refresh_list()
             else:
                 QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -106,17 +110,42 @@ class DepartmentsController:
 
         if file_path:
             print(f"Выбран файл для импорта в {self.model.table_name}: {file_path}")
-            all_department_cols = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            all_department_cols = get_column_names(self.model.table_name)
+
+            # Режим слияния обновляет существующие записи (например, при регулярной выгрузке из кадров);
+            # проверка только находит ошибки в файле, не изменяя базу
+            mode_box = QMessageBox(QMessageBox.Question, "Режим импорта", "Как импортировать файл?", parent=self.view)
+            merge_button = mode_box.addButton("Добавить и обновить", QMessageBox.AcceptRole)
+            insert_button = mode_box.addButton("Только добавить", QMessageBox.AcceptRole)
+            check_button = mode_box.addButton("Только проверить", QMessageBox.ActionRole)
+            mode_box.addButton(QMessageBox.Cancel)
+            mode_box.setDefaultButton(merge_button)
+            mode_box.exec_()
+            clicked_button = mode_box.clickedButton()
+            if clicked_button not in (merge_button, insert_button, check_button):
+                print("Импорт отменен.")
+                return
+            merge = clicked_button is merge_button
+            dry_run = clicked_button is check_button
+
+            run_database_job(self.view, f"Проверка файла для таблицы '{self.model.table_name}'" if dry_run else f"Импорт в таблицу '{self.model.table_name}'", self.db,
+                             lambda db, progress: import_data_from_csv(db, file_path, self.model.table_name, all_department_cols, column_digits=get_id_column_digits(self.model.table_name), unique_column=self.model.unique_column, progress_callback=progress, merge=merge, dry_run=dry_run),
+                             self._on_validation_finished if dry_run else self._on_import_finished)
+        else:
+            print("Выбор файла отменен.")
 
-            success, message = import_data_from_csv(self.db, file_path, self.model.table_name, all_department_cols, unique_column=self.model.unique_column)
+    def _on_validation_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Проверка завершена", message)
+        else:
+            QMessageBox.warning(self.view, "Проверка файла", message)
 
-            if success:
-                QMessageBox.information(self.view, "Импорт завершен", message)
-                self.refresh_list()
-            else:
-                QMessageBox.critical(self.view, "Ошибка импорта", message)
+    def _on_import_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Импорт завершен", message)
+            self.refresh_list()
         else:
-            print("Выбор файла отменен.")
+            QMessageBox.critical(self.view, "Ошибка импорта", message)
 
     def export_departments_to_csv(self):
         if self.db is None or not self.db.isOpen():
@@ -124,18 +153,20 @@ class DepartmentsController:
              return
 
         default_filename = f"{self.model.table_name}_export_{QDate.currentDate().toString('yyyyMMdd')}.csv"
-        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, "CSV файлы (*.csv);;Все файлы (*)")
+        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, EXPORT_FILE_FILTER)
         if file_path:
             print(f"Выбран файл для экспорта из {self.model.table_name}: {file_path}")
-            department_col_names_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            department_col_names_in_schema = get_column_names(self.model.table_name)
             cols_to_export = department_col_names_in_schema
-            success, message = export_data_to_csv(self.db, file_path, self.model.table_name, cols_to_export)
-
-            if success:
-                QMessageBox.information(self.view, "Экспорт завершен", message)
-                print(f"Экспорт сохранен: {file_path}")
-            else:
-                QMessageBox.critical(self.view, "Ошибка экспорта", message)
+            run_database_job(self.view, f"Экспорт из таблицы '{self.model.table_name}'", self.db,
+                             lambda db, progress: export_data_to_csv(db, file_path, self.model.table_name, cols_to_export, progress_callback=progress),
+                             lambda success, message: self._on_export_finished(success, message, file_path))
         else:
             print("Сохранение отчета отменено.")
 
+    def _on_export_finished(self, success, message, file_path):
+        if success:
+            QMessageBox.information(self.view, "Экспорт завершен", message)
+            print(f"Экспорт сохранен: {file_path}")
+        else:
+            QMessageBox.critical(self.view, "Ошибка экспорта", message)
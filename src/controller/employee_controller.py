@@ -3,13 +3,16 @@ from PyQt5.QtCore import QDate
 
 from src.model.employee_model import EmployeeModel
 from src.view.employee_view import EmployeeView, EmployeeDialog # Import both View components
-from src.utils.csv_handler import import_data_from_csv, export_data_to_csv # Assuming these are available
-from database import DATABASE_SCHEMA # Need schema for CSV handler
+from src.utils.csv_handler import import_data_from_csv, export_data_to_csv, EXPORT_FILE_FILTER # Assuming these are available
+from src.utils.background_jobs import run_database_job
+from database import get_column_names, get_id_column_digits # Столбцы таблицы для CSV
 
 
 class EmployeeController:
     def __init__(self, db_connection):
         self.db = db_connection
+        # Таблицы, изменение которых требует перечитать данные представления (имя отдела берется из Departments)
+        self.watched_tables = ["Employee", "Departments"]
         if not self.db or not self.db.isOpen():
             print("Ошибка: Соединение с базой данных не установлено или закрыто. Контроллер пользователей не может быть инициализирован.")
             self.model = None
@@ -34,6 +37,10 @@ class EmployeeController:
         """Возвращает виджет представления для отображения."""
         return self.view
 
+    def reload_data(self):
+        """Перечитывает данные без сообщений пользователю (вызывается главным окном при изменении таблиц)."""
+        return self.model.load_data() if self.model else False
+
     def refresh_list(self):
         """Обновляет список пользователей, вызывая метод модели."""
         if self.model and self.model.load_data():
@@ -51,7 +58,6 @@ class EmployeeController:
                 success, message = self.model.add_employee(data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list() # Refresh view after successful add
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -76,7 +82,6 @@ class EmployeeController:
                 success, message = self.model.update_employee(row, new_data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list() # Refresh view after successful edit
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -100,7 +105,6 @@ class EmployeeController:
             success, message = self.model.delete_employee(row)
             if success:
                 QMessageBox.information(self.view, "Успех", message)
-                self.refresh_list() # Refresh view after successful delete
             else:
                 QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -117,18 +121,43 @@ class EmployeeController:
         if file_path:
             print(f"Выбран файл для импорта в {self.model.table_name}: {file_path}")
             # Get column names from schema, excluding FK definitions
-            all_employee_cols = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            all_employee_cols = get_column_names(self.model.table_name)
+
+            # Режим слияния обновляет существующие записи (например, при регулярной выгрузке из кадров);
+            # проверка только находит ошибки в файле, не изменяя базу
+            mode_box = QMessageBox(QMessageBox.Question, "Режим импорта", "Как импортировать файл?", parent=self.view)
+            merge_button = mode_box.addButton("Добавить и обновить", QMessageBox.AcceptRole)
+            insert_button = mode_box.addButton("Только добавить", QMessageBox.AcceptRole)
+            check_button = mode_box.addButton("Только проверить", QMessageBox.ActionRole)
+            mode_box.addButton(QMessageBox.Cancel)
+            mode_box.setDefaultButton(merge_button)
+            mode_box.exec_()
+            clicked_button = mode_box.clickedButton()
+            if clicked_button not in (merge_button, insert_button, check_button):
+                print("Импорт отменен.")
+                return
+            merge = clicked_button is merge_button
+            dry_run = clicked_button is check_button
+
+            # Call the utility function in a background thread; the result arrives in _on_import_finished
+            run_database_job(self.view, f"Проверка файла для таблицы '{self.model.table_name}'" if dry_run else f"Импорт в таблицу '{self.model.table_name}'", self.db,
+                             lambda db, progress: import_data_from_csv(db, file_path, self.model.table_name, all_employee_cols, column_digits=get_id_column_digits(self.model.table_name), progress_callback=progress, merge=merge, dry_run=dry_run, resolve_names=True),
+                             self._on_validation_finished if dry_run else self._on_import_finished)
+        else:
+            print("Выбор файла отменен.")
 
-            # Call the utility function
-            success, message = import_data_from_csv(self.db, file_path, self.model.table_name, all_employee_cols, column_digits={'id_department': 2})
+    def _on_validation_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Проверка завершена", message)
+        else:
+            QMessageBox.warning(self.view, "Проверка файла", message)
 
-            if success:
-                QMessageBox.information(self.view, "Импорт завершен", message)
-                self.refresh_list() # Refresh view after import
-            else:
-                QMessageBox.critical(self.view, "Ошибка импорта", message)
+    def _on_import_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Импорт завершен", message)
+            self.refresh_list() # Refresh view after import
         else:
-            print("Выбор файла отменен.")
+            QMessageBox.critical(self.view, "Ошибка импорта", message)
 
     def export_employee_to_csv(self):
         """Обрабатывает запрос на экспорт пользователей в CSV."""
@@ -137,12 +166,20 @@ class EmployeeController:
              return
 
         default_filename = f"{self.model.table_name}_export_{QDate.currentDate().toString('yyyyMMdd')}.csv"
-        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, "CSV файлы (*.csv);;Все файлы (*)")
+        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, EXPORT_FILE_FILTER)
         if file_path:
             print(f"Выбран файл для экспорта из {self.model.table_name}: {file_path}")         
-            employee_col_names_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            employee_col_names_in_schema = get_column_names(self.model.table_name)
             cols_to_export = employee_col_names_in_schema
-            success, message = export_data_to_csv(self.db, file_path, self.model.table_name, cols_to_export)
+            run_database_job(self.view, f"Экспорт из таблицы '{self.model.table_name}'", self.db,
+                             lambda db, progress: export_data_to_csv(db, file_path, self.model.table_name, cols_to_export, progress_callback=progress),
+                             lambda success, message: self._on_export_finished(success, message, file_path))
+        else:
+            print("Сохранение отчета отменено.")
 
-            if success:
-                QMessageBox.information(self.view, "Экспорт завершен", message)
+    def _on_export_finished(self, success, message, file_path):
+        if success:
+            QMessageBox.information(self.view, "Экспорт завершен", message)
+            print(f"Экспорт сохранен: {file_path}")
+        else:
+            QMessageBox.critical(self.view, "Ошибка экспорта", message)
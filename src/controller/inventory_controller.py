@@ -0,0 +1,29 @@
+# File: inventory_controller.py
+from src.view._inventory_view import InventoryView
+
+
+class InventoryController:
+    def __init__(self, db_connection):
+        """
+        Инициализирует контроллер просмотра инвентаризации.
+        Представление само работает с постраничной моделью Units_inventory.
+        """
+        self.db = db_connection
+        # Таблицы, изменение которых требует перечитать данные представления
+        self.watched_tables = ["Units_inventory", "Units_extended_info", "Category", "Subcategory", "Unit_type", "Order_status", "Employee"]
+        if not self.db or not self.db.isOpen():
+            print("Ошибка: Соединение с базой данных не установлено или закрыто. Контроллер инвентаризации не может быть инициализирован.")
+            self.view = None
+            return
+
+        self.view = InventoryView(self.db)
+
+    def get_view(self):
+        """
+        Возвращает виджет представления (InventoryView) для отображения в главном окне.
+        """
+        return self.view
+
+    def reload_data(self):
+        """Перечитывает данные без сообщений пользователю (вызывается главным окном при изменении таблиц)."""
+        return self.view.model.reload() if self.view else False
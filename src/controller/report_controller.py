@@ -0,0 +1,33 @@
+# File: report_controller.py
+from src.view._report_view import ReportView
+from src.model.report_model import REPORT_TABLES
+
+
+class ReportController:
+    def __init__(self, db_connection):
+        """
+        Инициализирует контроллер отчетов.
+        Отчет формируется представлением в фоновом потоке (см. generate_inventory_report).
+        """
+        self.db = db_connection
+        # Таблицы, изменение которых требует обновить списки фильтров и предпросмотр
+        self.watched_tables = list(REPORT_TABLES)
+        if not self.db or not self.db.isOpen():
+            print("Ошибка: Соединение с базой данных не установлено или закрыто. Контроллер отчетов не может быть инициализирован.")
+            self.view = None
+            return
+
+        self.view = ReportView(self.db)
+
+    def get_view(self):
+        """
+        Возвращает виджет представления (ReportView) для отображения в главном окне.
+        """
+        return self.view
+
+    def reload_data(self):
+        """Обновляет списки фильтров и предпросмотр (вызывается главным окном при изменении данных)."""
+        if self.view is None:
+            return False
+        self.view.reload_lookups()
+        return True
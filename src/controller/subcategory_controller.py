@@ -8,10 +8,11 @@ from src.view.subcategory_view import SubcategoryView, SubcategoryDialog
 
 # Импортируем универсальный обработчик CSV (предполагается, что он доступен)
 # Убедитесь, что путь к файлу csv_handler.py правильный
-from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
+from src.utils.csv_handler import import_data_from_csv, export_data_to_csv, EXPORT_FILE_FILTER
+from src.utils.background_jobs import run_database_job
 
 # Импортируем схему базы данных (нужна для CSV обработчика и валидации в Модели)
-from database import DATABASE_SCHEMA
+from database import get_column_names, get_id_column_digits
 
 
 class SubcategoryController:
@@ -20,6 +21,8 @@ class SubcategoryController:
         Инициализирует контроллер для управления подкатегориями.
         """
         self.db = db_connection
+        # Таблицы, изменение которых требует перечитать данные представления (название категории берется из Category)
+        self.watched_tables = ["Subcategory", "Category"]
         # Проверяем соединение с БД при инициализации контроллера
         if not self.db or not self.db.isOpen():
             print("Ошибка: Соединение с базой данных не установлено или закрыто. Контроллер подкатегорий не может быть инициализирован.")
@@ -51,6 +54,10 @@ class SubcategoryController:
         """
         return self.view
 
+    def reload_data(self):
+        """Перечитывает данные без сообщений пользователю (вызывается главным окном при изменении таблиц)."""
+        return self.model.load_data() if self.model else False
+
     def refresh_list(self):
         """
         Обновляет список подкатегорий в представлении, вызывая метод модели.
@@ -77,7 +84,6 @@ class SubcategoryController:
                 success, message = self.model.add_subcategory(data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list() # Обновляем список в представлении после успешного добавления
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -108,7 +114,6 @@ class SubcategoryController:
                 success, message = self.model.update_subcategory(row, new_data)
                 if success:
                     QMessageBox.information(self.view, "Успех", message)
-                    self.refresh_list() # Обновляем список в представлении после успешного редактирования
                 else:
                     QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -140,7 +145,6 @@ class SubcategoryController:
             success, message = self.model.delete_subcategory(row)
             if success:
                 QMessageBox.information(self.view, "Успех", message)
-                self.refresh_list() # Обновляем список в представлении после успешного удаления
             else:
                 QMessageBox.critical(self.view, "Ошибка", message)
 
@@ -161,21 +165,24 @@ class SubcategoryController:
         if file_path:
             print(f"Выбран файл для импорта в {self.model.table_name}: {file_path}")
             # Получаем названия столбцов из схемы БД, исключая определения внешних ключей
-            all_subcategory_cols = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            all_subcategory_cols = get_column_names(self.model.table_name)
 
             # Вызываем универсальную функцию импорта из CSV утилит
             # Передаем соединение с БД, путь к файлу, имя таблицы, список столбцов,
             # информацию о столбцах с фиксированной длиной (если нужно) и уникальный столбец
-            success, message = import_data_from_csv(self.db, file_path, self.model.table_name, all_subcategory_cols, column_digits={'id_subcategory': 2}, unique_column=self.model.unique_column)
-
-            if success:
-                QMessageBox.information(self.view, "Импорт завершен", message)
-                self.refresh_list() # Обновляем список в представлении после импорта
-            else:
-                QMessageBox.critical(self.view, "Ошибка импорта", message)
+            run_database_job(self.view, f"Импорт в таблицу '{self.model.table_name}'", self.db,
+                             lambda db, progress: import_data_from_csv(db, file_path, self.model.table_name, all_subcategory_cols, column_digits=get_id_column_digits(self.model.table_name), unique_column=self.model.unique_column, progress_callback=progress, resolve_names=True),
+                             self._on_import_finished)
         else:
             print("Выбор файла отменен.")
 
+    def _on_import_finished(self, success, message):
+        if success:
+            QMessageBox.information(self.view, "Импорт завершен", message)
+            self.refresh_list() # Обновляем список в представлении после импорта
+        else:
+            QMessageBox.critical(self.view, "Ошибка импорта", message)
+
     def export_subcategories_to_csv(self):
         """
         Обрабатывает запрос на экспорт подкатегорий в CSV файл.
@@ -188,20 +195,23 @@ class SubcategoryController:
         # Предлагаем имя файла по умолчанию
         default_filename = f"{self.model.table_name}_export_{QDate.currentDate().toString('yyyyMMdd')}.csv"
         # Открываем диалог сохранения файла
-        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, "CSV файлы (*.csv);;Все файлы (*)")
+        file_path, _ = QFileDialog.getSaveFileName(self.view, f"Экспорт данных из таблицы '{self.model.table_name}'", default_filename, EXPORT_FILE_FILTER)
         if file_path:
             print(f"Выбран файл для экспорта из {self.model.table_name}: {file_path}")
             # Получаем названия столбцов из схемы БД, которые нужно экспортировать
-            subcategory_col_names_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.model.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+            subcategory_col_names_in_schema = get_column_names(self.model.table_name)
             cols_to_export = subcategory_col_names_in_schema
 
             # Вызываем универсальную функцию экспорта в CSV утилит
-            success, message = export_data_to_csv(self.db, file_path, self.model.table_name, cols_to_export)
+            run_database_job(self.view, f"Экспорт из таблицы '{self.model.table_name}'", self.db,
+                             lambda db, progress: export_data_to_csv(db, file_path, self.model.table_name, cols_to_export, progress_callback=progress),
+                             lambda success, message: self._on_export_finished(success, message, file_path))
+        else:
+            print("Сохранение отчета отменено.")
 
-            if success:
-                QMessageBox.information(self.view, "Экспорт завершен", message)
-                print(f"Экспорт сохранен: {file_path}")
-            else:
-                QMessageBox.critical(self.view, "Ошибка экспорта", message)
+    def _on_export_finished(self, success, message, file_path):
+        if success:
+            QMessageBox.information(self.view, "Экспорт завершен", message)
+            print(f"Экспорт сохранен: {file_path}")
         else:
-            print("Сохранение отчета отменено.")
\ No newline at end of file
+            QMessageBox.critical(self.view, "Ошибка экспорта", message)
@@ -1,17 +1,26 @@
 # ui/main_window.py
 import sys
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QAction, QVBoxLayout, QWidget, QLabel, QMessageBox)
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QAction, QVBoxLayout, QWidget, QLabel, QMessageBox,
+                             QStackedWidget, QTableView, QFileDialog)
 from PyQt5.QtCore import Qt
 
 from src.controller.employee_controller import EmployeeController
 from src.controller.departments_controller import DepartmentsController
 from src.controller.subcategory_controller import SubcategoryController
 # from src.controller.note_controller import NoteController
-# from src.controller.units_inventory_controller import UnitsInventoryController # Для новой инвентаризации
-# from src.controller.report_controller import ReportController # Для нового отчета
+from src.controller.inventory_controller import InventoryController
+from src.controller.report_controller import ReportController
 from src.controller._generic_controller import GenericController
+from src.utils.background_jobs import run_database_job
+from src.utils.bootstrap_import import bootstrap_import, DEFAULT_IMPORT_DIR
+
+from database import close_db, get_active_profile, get_table_versions
 
-from database import close_db
+# Ограничения кэша открытых представлений
+MAX_CACHED_VIEWS = 6
+MAX_CACHED_ROWS = 200000 # Суммарное число загруженных в модели строк
 
 class MainWindow(QMainWindow):
     def __init__(self, db_connection):
@@ -33,18 +42,28 @@ class MainWindow(QMainWindow):
         self.layout = QVBoxLayout(self.central_widget)
         self.layout.setContentsMargins(0, 0, 0, 0) # Убираем отступы вокруг центрального виджета
 
+        # Открытые представления хранятся в стеке и не пересоздаются при переключении разделов
+        self.view_stack = QStackedWidget()
+        self.layout.addWidget(self.view_stack)
+
         # Изначально показываем приветственное сообщение
         self.welcome_label = QLabel("Добро пожаловать в систему управления инвентаризацией!")
         self.welcome_label.setAlignment(Qt.AlignCenter)
-        self.layout.addWidget(self.welcome_label)
+        self.view_stack.addWidget(self.welcome_label)
 
-        # Переменная для хранения ссылки на текущий активный виджет представления
-        self._current_view = None
+        # Кэш представлений: ключ -> [контроллер, виджет, версии таблиц на момент ухода с раздела].
+        # Порядок OrderedDict - от давно использованных к недавним (LRU).
+        self._view_cache = OrderedDict()
+        self._current_key = None
         self._current_view_widget = None
         self._current_controller = None
 
         self._create_menu_bar()
 
+        # Показываем активный профиль производительности SQLite в строке состояния
+        if self.db is not None and self.db.isOpen():
+            self.statusBar().showMessage(f"Профиль базы данных: {get_active_profile(self.db)}")
+
     def _create_menu_bar(self):
         """Создает строку меню приложения."""
         menu_bar = self.menuBar()
@@ -85,9 +104,9 @@ class MainWindow(QMainWindow):
 
         # Меню "Инвентаризация"
         inventory_menu = menu_bar.addMenu("Инвентаризация")
-        # view_inventory_action = QAction("Просмотр инвентаризации", self)
-        # view_inventory_action.triggered.connect(self._open_inventory_view)
-        # inventory_menu.addAction(view_inventory_action)
+        view_inventory_action = QAction("Просмотр инвентаризации", self)
+        view_inventory_action.triggered.connect(self._open_inventory_view)
+        inventory_menu.addAction(view_inventory_action)
 
      
         subcategory_action = QAction("Категории", self)
@@ -111,7 +130,7 @@ class MainWindow(QMainWindow):
         unit_type_action = QAction("Типы единиц", self)
         unit_type_action.triggered.connect(
             lambda: self._open_generic_view(
-            "UnitType",
+            "Unit_type",
             "id_unit_type",
             "unit_type",
             "Управление типами единиц",
@@ -124,7 +143,7 @@ class MainWindow(QMainWindow):
         order_status_action = QAction("Статусы заказов", self)
         order_status_action.triggered.connect(
             lambda: self._open_generic_view(
-                "OrderStatus",
+                "Order_status",
                 "id_order_status",
                 "order_status",
                 "Управление статусами заказов",
@@ -135,49 +154,93 @@ class MainWindow(QMainWindow):
         inventory_menu.addAction(order_status_action)
 
         # Меню "Отчеты"
-        # reports_menu = menu_bar.addMenu("Отчеты")
-        # create_report_action = QAction("Сформировать отчет", self)
-        # create_report_action.triggered.connect(self._open_report_view)
-        # reports_menu.addAction(create_report_action)
-
-    def _clear_layout(self):
-        """Удаляет все виджеты из центрального макета."""
-        if self._current_view_widget is not None:
-            self.layout.removeWidget(self._current_view_widget)
-            self._current_view_widget.deleteLater()
-            self._current_view_widget = None
-            self._current_controller = None
-
-        # Проверяем, что welcome_label существует и является дочерним элементом central_widget
-        if hasattr(self, 'welcome_label') and self.welcome_label is not None and self.welcome_label.parent() == self.central_widget:
-             self.layout.removeWidget(self.welcome_label)
-             self.welcome_label.deleteLater()
-             self.welcome_label = None
+        reports_menu = menu_bar.addMenu("Отчеты")
+        create_report_action = QAction("Сформировать отчет", self)
+        create_report_action.triggered.connect(self._open_report_view)
+        reports_menu.addAction(create_report_action)
+
+        # Меню "Сервис"
+        service_menu = menu_bar.addMenu("Сервис")
+        bootstrap_action = QAction("Первичная загрузка данных...", self)
+        bootstrap_action.triggered.connect(self._bootstrap_import)
+        service_menu.addAction(bootstrap_action)
+
+    def _cached_row_count(self, widget):
+        """Количество загруженных строк во всех таблицах представления (оценка занимаемой памяти)."""
+        row_count = 0
+        for table_view in widget.findChildren(QTableView):
+            if table_view.model() is not None:
+                row_count += table_view.model().rowCount()
+        return row_count
+
+    def _evict_cached_views(self):
+        """Удаляет давно использованные представления сверх лимита по количеству и по числу загруженных строк."""
+        while len(self._view_cache) > 1:
+            total_rows = sum(self._cached_row_count(entry[1]) for entry in self._view_cache.values())
+            if len(self._view_cache) <= MAX_CACHED_VIEWS and total_rows <= MAX_CACHED_ROWS:
+                break
+            key = next(iter(self._view_cache))
+            if key == self._current_key:
+                break # Текущее представление всегда последнее в порядке LRU
+            controller, widget, _ = self._view_cache.pop(key)
+            print(f"Представление '{key[0]}' удалено из кэша.")
+            self.view_stack.removeWidget(widget)
+            widget.deleteLater()
+
+    def _leave_current_view(self):
+        """Запоминает версии таблиц для представления, с которого уходит пользователь."""
+        if self._current_key in self._view_cache:
+            entry = self._view_cache[self._current_key]
+            entry[2] = get_table_versions(getattr(entry[0], "watched_tables", []))
 
     def _open_view(self, controller_class,view_title, *args, **kwargs):
         if self.db is None or not self.db.isOpen():
              QMessageBox.warning(self, "Предупреждение", f"Невозможно открыть раздел '{view_title}': соединение с базой данных отсутствует.")
              return
 
+        key = (controller_class.__name__, args, tuple(sorted(kwargs.items())))
+        if key == self._current_key:
+            return
+
+        if key in self._view_cache:
+            # Возвращаемся к уже открытому представлению: прокрутка и выделение сохраняются,
+            # данные перечитываются только если связанные таблицы изменились
+            self._leave_current_view()
+            self._view_cache.move_to_end(key)
+            controller, view_widget, versions = self._view_cache[key]
+            watched_tables = getattr(controller, "watched_tables", [])
+            if get_table_versions(watched_tables) != versions and hasattr(controller, "reload_data"):
+                print(f"Данные раздела '{view_title}' изменились, обновление.")
+                controller.reload_data()
+            self._show_view(key, controller, view_widget, view_title)
+            return
+
         controller = controller_class(self.db, *args, **kwargs)
 
         if controller:
-            self._clear_layout()
-
             view_widget = controller.get_view()
 
             if view_widget:
-                print(f"Открыть раздел '{view_title}'")
-                self.layout.addWidget(view_widget)
-                self._current_view_widget = view_widget # Сохраняем ссылку на текущий виджет
-                self._current_controller = controller # Сохраняем ссылку на текущий контроллер
-                self.setWindowTitle(f"Система управления инвентаризацией - {view_title}") # Обновляем заголовок окна
+                self._leave_current_view()
+                self.view_stack.addWidget(view_widget)
+                self._view_cache[key] = [controller, view_widget, None]
+                self._show_view(key, controller, view_widget, view_title)
+                self._evict_cached_views()
             else:
                  QMessageBox.critical(self, "Ошибка", f"Контроллер '{controller_class}' не предоставил виджет представления.")
-                 # Если виджет не получен, можно снова показать приветствие или сообщение об ошибке
-                 self.welcome_label = QLabel(f"Ошибка загрузки раздела: {view_title}")
-                 self.welcome_label.setAlignment(Qt.AlignCenter)
-                 self.layout.addWidget(self.welcome_label)
+                 # Если виджет не получен, показываем сообщение об ошибке
+                 self.welcome_label.setText(f"Ошибка загрузки раздела: {view_title}")
+                 self.view_stack.setCurrentWidget(self.welcome_label)
+                 self._leave_current_view()
+                 self._current_key = None
+
+    def _show_view(self, key, controller, view_widget, view_title):
+        print(f"Открыть раздел '{view_title}'")
+        self.view_stack.setCurrentWidget(view_widget)
+        self._current_key = key
+        self._current_view_widget = view_widget # Сохраняем ссылку на текущий виджет
+        self._current_controller = controller # Сохраняем ссылку на текущий контроллер
+        self.setWindowTitle(f"Система управления инвентаризацией - {view_title}") # Обновляем заголовок окна
 
     def _open_generic_view(self, table_name, id_column, name_column, view_title, add_input_placeholder, unique_name_column=None):
        self._open_view(GenericController, view_title, table_name, id_column, name_column, view_title, add_input_placeholder, unique_name_column)
@@ -200,12 +263,32 @@ class MainWindow(QMainWindow):
         # self._open_view(NoteController, "Заметки")
 
     def _open_inventory_view(self):
-        QMessageBox.information(self, "В разработке", "Раздел 'Просмотр инвентаризации' пока не реализован с использованием контроллера.")
-        # self._open_view(UnitsInventoryController, "Просмотр инвентаризации")
+        self._open_view(InventoryController, "Просмотр инвентаризации")
 
     def _open_report_view(self):
-        QMessageBox.information(self, "В разработке", "Раздел 'Отчеты' пока не реализован с использованием контроллера.")
-        # self._open_view(ReportController, "Отчеты")
+        self._open_view(ReportController, "Отчеты")
+
+    def _bootstrap_import(self):
+        """Загружает все выгрузки из каталога (по умолчанию public/import) одной транзакцией."""
+        if self.db is None or not self.db.isOpen():
+             QMessageBox.warning(self, "Предупреждение", "Невозможно выполнить загрузку: соединение с базой данных отсутствует.")
+             return
+        import_dir = QFileDialog.getExistingDirectory(self, "Каталог с файлами для загрузки", DEFAULT_IMPORT_DIR)
+        if not import_dir:
+            print("Выбор каталога отменен.")
+            return
+        print(f"Первичная загрузка из каталога: {import_dir}")
+        run_database_job(self, "Первичная загрузка данных", self.db,
+                         lambda db, progress: bootstrap_import(db, import_dir, progress_callback=progress),
+                         self._on_bootstrap_finished)
+
+    def _on_bootstrap_finished(self, success, message):
+        if success:
+            QMessageBox.information(self, "Загрузка завершена", message)
+            if hasattr(self._current_controller, "reload_data"):
+                self._current_controller.reload_data()
+        else:
+            QMessageBox.critical(self, "Ошибка загрузки", message)
 
     def closeEvent(self, event):
         print("Закрытие главного окна.")
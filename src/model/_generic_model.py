@@ -1,8 +1,9 @@
 
-from PyQt5.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlError
-from PyQt5.QtCore import Qt, QVariant, pyqtSignal, QObject
+from PyQt5.QtSql import QSqlQuery, QSqlError
+from PyQt5.QtCore import pyqtSignal, QObject
 
-from database import DATABASE_SCHEMA
+from database import get_column_names, get_table_info
+from src.model.paged_sql_model import PagedSqlTableModel
 
 class GenericModel(QObject): 
     model_error = pyqtSignal(str)
@@ -22,7 +23,7 @@ class GenericModel(QObject):
             return
 
 
-        all_table_cols_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+        all_table_cols_in_schema = get_column_names(self.table_name)
         if self.id_column not in all_table_cols_in_schema:
              print(f"Ошибка: Столбец ID '{self.id_column}' не найден в схеме для таблицы '{self.table_name}'.")
              self._model = None
@@ -37,21 +38,14 @@ class GenericModel(QObject):
              return
 
 
-        self._model = QSqlTableModel(self, self.db) 
-        self._model.setTable(self.table_name)
-        self._model.setEditStrategy(QSqlTableModel.OnFieldChange)
-     #    self._model.lastError.connect(self._on_model_last_error)
         header_map = {
             self.id_column: "ID",
             self.name_column: "Наименование",
         }
-
-        for i in range(self._model.columnCount()):
-             col_name = self._model.record().fieldName(i)
-             if col_name in header_map:
-                self._model.setHeaderData(i, Qt.Horizontal, header_map[col_name])
-             else:
-                self._model.setHeaderData(i, Qt.Horizontal, col_name)
+        # Постраничная модель с редактированием прямо в таблице (UPDATE одной ячейки по rowid)
+        self._model = PagedSqlTableModel(self.db, self.table_name, all_table_cols_in_schema,
+                                         headers=header_map, editable=True, parent=self)
+        self._model.write_failed.connect(self.model_error.emit)
 
 
         self.load_data()
@@ -68,9 +62,8 @@ class GenericModel(QObject):
         if self._model is None:
              return False # Модель не инициализирована из-за ошибки БД
 
-        self._model.select()
-        if self._model.lastError().type() != QSqlError.NoError:
-             print(f"Ошибка загрузки данных для таблицы '{self.table_name}':", self._model.lastError().text())
+        if not self._model.reload():
+             print(f"Ошибка загрузки данных для таблицы '{self.table_name}':", self._model.last_error())
              return False
         print(f"Данные для таблицы '{self.table_name}' загружены.")
         return True
@@ -78,16 +71,7 @@ class GenericModel(QObject):
     def get_item_data(self, row):
         if self._model is None or row < 0 or row >= self._model.rowCount():
              return {} 
-        item_data = {}
-
-        all_table_cols_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
-
-        for col_name in all_table_cols_in_schema:
-             col_index = self._model.fieldIndex(col_name)
-             if col_index != -1:
-                item_data[col_name] = self._model.data(self._model.index(row, col_index), Qt.EditRole)
-
-        return item_data
+        return self._model.row_data(row)
 
     def add_item(self, data):
         item_name = data.get(self.name_column, '').strip()
@@ -107,11 +91,8 @@ class GenericModel(QObject):
 
         # Если ID ручной (не автоинкрементный), проверяем его наличие и уникальность
         # Проверяем по схеме, является ли ID автоинкрементным
-        is_auto_increment = False
-        for col_def in DATABASE_SCHEMA.get(self.table_name, []):
-             if col_def.strip().startswith(self.id_column) and "AUTOINCREMENT" in col_def.upper():
-                 is_auto_increment = True
-                 break
+        table_info = get_table_info(self.table_name)
+        is_auto_increment = table_info is not None and table_info.autoincrement_column == self.id_column
 
         if not is_auto_increment:
              if item_id is None or str(item_id).strip() == "":
@@ -125,35 +106,18 @@ class GenericModel(QObject):
                  if count > 0:
                      return False, f"ID '{item_id}' уже существует."
 
-        row_count = self._model.rowCount()
-        if not self._model.insertRows(row_count, 1):
-             error_text = self._model.lastError().text()
-             print(f"Ошибка при вставке новой строки в модель для таблицы '{self.table_name}':", error_text)
-             return False, error_text
-
+        record = {self.name_column: item_name}
         # Устанавливаем ID, только если он ручной (не автоинкрементный)
         if not is_auto_increment and item_id is not None:
-             id_col_index = self._model.fieldIndex(self.id_column)
-             if id_col_index != -1:
-                  self._model.setData(self._model.index(row_count, id_col_index), item_id)
-
-        # Устанавливаем наименование
-        name_col_index = self._model.fieldIndex(self.name_column)
-        if name_col_index != -1:
-             self._model.setData(self._model.index(row_count, name_col_index), item_name)
-        else:
-             self._model.revertAll()
-             return False, f"Ошибка: Столбец '{self.name_column}' не найден в модели."
-
+             record[self.id_column] = item_id
 
-        if self._model.submitAll():
+        success, result = self._model.insert_record(record)
+        if success:
             print(f"Элемент '{item_name}' успешно добавлен в таблицу '{self.table_name}' (Model).")
             return True, f"Элемент '{item_name}' успешно добавлен."
         else:
-            error_text = self._model.lastError().text()
-            print(f"Ошибка при добавлении элемента в таблицу '{self.table_name}' (Model):", error_text)
-            self._model.revertAll()
-            return False, f"Не удалось добавить элемент: {error_text}"
+            print(f"Ошибка при добавлении элемента в таблицу '{self.table_name}' (Model):", result)
+            return False, f"Не удалось добавить элемент: {result}"
 
     def delete_item(self, row):
         if self._model is None or row < 0 or row >= self._model.rowCount():
@@ -163,15 +127,10 @@ class GenericModel(QObject):
         item_id = item_data.get(self.id_column, 'N/A')
         item_name = item_data.get(self.name_column, 'Выбранная запись')
 
-        if self._model.removeRow(row):
-            if self._model.submitAll():
-                print(f"Элемент '{item_name}' (ID: {item_id}) успешно удален из таблицы '{self.table_name}' (Model).")
-                return True, f"Элемент '{item_name}' (ID: {item_id}) успешно удален."
-            else:
-                error_text = self._model.lastError().text()
-                print(f"Ошибка при сохранении удаления из таблицы '{self.table_name}' (Model):", error_text)
-                self._model.revertAll()
-                return False, f"Не удалось удалить элемент: {error_text}"
+        success, error_text = self._model.delete_record(row)
+        if success:
+            print(f"Элемент '{item_name}' (ID: {item_id}) успешно удален из таблицы '{self.table_name}' (Model).")
+            return True, f"Элемент '{item_name}' (ID: {item_id}) успешно удален."
         else:
-            print(f"Ошибка при удалении строки из модели для таблицы '{self.table_name}' (Model).")
-            return False, "Не удалось удалить строку из модели."
\ No newline at end of file
+            print(f"Ошибка при сохранении удаления из таблицы '{self.table_name}' (Model):", error_text)
+            return False, f"Не удалось удалить элемент: {error_text}"
@@ -1,9 +1,9 @@
 # File: departments_model.py
-from PyQt5.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlError
-from PyQt5.QtCore import Qt, QVariant
+from PyQt5.QtSql import QSqlQuery
 
 # Импортируем схему базы данных для получения названий таблиц и столбцов
-from database import DATABASE_SCHEMA
+from database import get_column_names
+from src.model.paged_sql_model import PagedSqlTableModel
 
 class DepartmentsModel:
     def __init__(self, db_connection):
@@ -16,30 +16,22 @@ class DepartmentsModel:
 
         self.table_name = "Departments"
         # Получаем названия столбцов из схемы БД, исключая определения внешних ключей
-        self.column_names = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
+        self.column_names = get_column_names(self.table_name)
         self.unique_column = "department_fullname"
 
-        self._model = QSqlTableModel(None, self.db)
-        self._model.setTable(self.table_name)
-        self._model.setEditStrategy(QSqlTableModel.OnManualSubmit)
-
         header_map = {
             "id_department": "ID",
             "department_fullname": "Полное название",
             "department_shortname": "Краткое название",
         }
-        for i in range(self._model.columnCount()):
-             col_name = self._model.record().fieldName(i)
-             if col_name in header_map:
-                self._model.setHeaderData(i, Qt.Horizontal, header_map[col_name])
-             else:
-                self._model.setHeaderData(i, Qt.Horizontal, col_name)
+        # Постраничная модель; изменения применяются к загруженным строкам точечно
+        self._model = PagedSqlTableModel(self.db, self.table_name, self.column_names, headers=header_map)
 
         self.load_data() # Загружаем данные при создании модели
 
     def get_model(self):
         """
-        Возвращает экземпляр QSqlTableModel для использования в View.
+        Возвращает экземпляр PagedSqlTableModel для использования в View.
         """
         return self._model
 
@@ -48,9 +40,8 @@ class DepartmentsModel:
         Загружает или обновляет данные из таблицы Departments.
         Возвращает True в случае успеха, False в случае ошибки.
         """
-        self._model.select()
-        if self._model.lastError().type() != QSqlError.NoError:
-             print("Ошибка загрузки данных отделов:", self._model.lastError().text())
+        if not self._model.reload():
+             print("Ошибка загрузки данных отделов:", self._model.last_error())
              return False
         print("Данные отделов загружены.")
         return True
@@ -60,17 +51,8 @@ class DepartmentsModel:
         Получает данные отдела из указанной строки модели.
         Возвращает словарь с данными отдела.
         """
-        department_data = {}
-        # Получаем названия столбцов из схемы БД для таблицы Departments
-        department_col_names_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
-
-        for col_name in department_col_names_in_schema:
-             col_index = self._model.fieldIndex(col_name)
-             if col_index != -1:
-                # Используем Qt.EditRole для получения сырых данных
-                department_data[col_name] = self._model.data(self._model.index(row, col_index), Qt.EditRole)
-
-        return department_data
+        # Сырые данные строки
+        return self._model.row_data(row)
 
     def add_department(self, data):
         """
@@ -100,32 +82,17 @@ class DepartmentsModel:
                 return False, f"Отдел с полным названием '{fullname}' уже существует."
 
 
-        # Добавляем новую пустую строку в модель
-        row_count = self._model.rowCount()
-        if not self._model.insertRow(row_count):
-             error_text = self._model.lastError().text()
-             print("Ошибка при вставке новой строки в модель:", error_text)
-             return False, error_text
-
-        # Устанавливаем данные в модель для новой строки по именам столбцов
-        col_indices = {col: self._model.fieldIndex(col) for col in self.column_names}
-
         # ID отдела автоинкрементный, его не устанавливаем при добавлении
-        if "department_fullname" in col_indices and col_indices["department_fullname"] != -1:
-             self._model.setData(self._model.index(row_count, col_indices["department_fullname"]), fullname)
-        if "department_shortname" in col_indices and col_indices["department_shortname"] != -1:
-             self._model.setData(self._model.index(row_count, col_indices["department_shortname"]), shortname)
-
-
-        if self._model.submitAll(): # Сохраняем изменения в базу данных
+        success, result = self._model.insert_record({
+            "department_fullname": fullname,
+            "department_shortname": shortname,
+        })
+        if success: # Новая строка добавлена в модель без перезагрузки
             print(f"Отдел '{fullname}' успешно добавлен (Model).")
-            # Модель автоматически обновится после submitAll, если стратегия OnManualSubmit
             return True, "Отдел успешно добавлен."
         else:
-            error_text = self._model.lastError().text()
-            print("Ошибка при добавлении отдела (Model):", error_text)
-            self._model.revertAll() # Отменяем изменения в модели, если сохранение не удалось
-            return False, f"Не удалось добавить отдел: {error_text}"
+            print("Ошибка при добавлении отдела (Model):", result)
+            return False, f"Не удалось добавить отдел: {result}"
 
     def update_department(self, row, data):
         """
@@ -155,40 +122,27 @@ class DepartmentsModel:
              return False, f"Отдел с полным названием '{fullname}' уже существует."
 
 
-        # Устанавливаем данные в модель для указанной строки
-        col_indices = {col: self._model.fieldIndex(col) for col in data if col in self.column_names}
-
         # ID отдела не меняется при редактировании
-        if "department_fullname" in col_indices and col_indices["department_fullname"] != -1:
-             self._model.setData(self._model.index(row, col_indices["department_fullname"]), fullname)
-        if "department_shortname" in col_indices and col_indices["department_shortname"] != -1:
-             self._model.setData(self._model.index(row, col_indices["department_shortname"]), shortname)
-
-
-        if self._model.submitAll():
+        success, error_text = self._model.update_record(row, {
+            "department_fullname": fullname,
+            "department_shortname": shortname,
+        })
+        if success:
             print(f"Отдел в строке {row} успешно обновлен (Model).")
             return True, "Изменения успешно сохранены."
         else:
-            error_text = self._model.lastError().text()
             print("Ошибка при обновлении отдела (Model):", error_text)
-            self._model.revertAll()
             return False, f"Не удалось сохранить изменения: {error_text}"
 
     def delete_department(self, row):
-        id_col_index = self._model.fieldIndex("id_department")
-        name_col_index = self._model.fieldIndex("department_fullname")
-        item_id = self._model.data(self._model.index(row, id_col_index), Qt.DisplayRole) if id_col_index != -1 else "N/A"
-        item_name = self._model.data(self._model.index(row, name_col_index), Qt.DisplayRole) if name_col_index != -1 else "Выбранная запись"
-
-        if self._model.removeRow(row):
-            if self._model.submitAll():
-                print(f"Отдел '{item_name}' (ID: {item_id}) успешно удален (Model).")
-                return True, f"Отдел '{item_name}' (ID: {item_id}) успешно удален."
-            else:
-                error_text = self._model.lastError().text()
-                print("Ошибка при сохранении удаления (Model):", error_text)
-                self._model.revertAll()
-                return False, f"Не удалось удалить отдел: {error_text}"
+        department_data = self._model.row_data(row)
+        item_id = department_data.get("id_department", "N/A")
+        item_name = department_data.get("department_fullname", "Выбранная запись")
+
+        success, error_text = self._model.delete_record(row)
+        if success:
+            print(f"Отдел '{item_name}' (ID: {item_id}) успешно удален (Model).")
+            return True, f"Отдел '{item_name}' (ID: {item_id}) успешно удален."
         else:
-            print("Ошибка при удалении строки из модели (Model).")
-            return False, "Не удалось удалить строку из модели."
\ No newline at end of file
+            print("Ошибка при сохранении удаления (Model):", error_text)
+            return False, f"Не удалось удалить отдел: {error_text}"
@@ -0,0 +1,432 @@
+# File: paged_sql_model.py
+from PyQt5.QtSql import QSqlQuery
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, pyqtSignal
+
+from database import mark_tables_changed
+
+
+def _sqlite_order_key(value):
+    """Ключ сортировки Python, повторяющий порядок SQLite: NULL < числа < текст < BLOB."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, bytes(value))
+
+
+class PagedSqlTableModel(QAbstractTableModel):
+    """
+    Модель только для чтения, загружающая строки таблицы страницами по мере прокрутки.
+
+    Вместо QSqlRelationalTableModel.select(), который читает всю таблицу и разрешает
+    связи заранее, модель выбирает следующую страницу через keyset-пагинацию
+    (WHERE (столбец сортировки, rowid) > (последние значения) ... LIMIT page_size),
+    поэтому открытие большой таблицы стоит одного короткого запроса.
+    Связанные названия (например, название отдела) подставляются через LEFT JOIN.
+
+    Изменения применяются к загруженным строкам точечно (insert_key/refresh_key/remove_key):
+    строка перечитывается по ключу и занимает свое место в текущей сортировке,
+    полная перезагрузка (reload) нужна только для явного обновления списка.
+
+    relations: {столбец: (таблица, ключ, отображаемый столбец[, {доп. столбец: столбец таблицы}])}
+    """
+    write_failed = pyqtSignal(str) # Ошибка записи при редактировании прямо в таблице
+
+    DEFAULT_PAGE_SIZE = 256
+
+    def __init__(self, db_connection, table_name, column_names, relations=None, headers=None,
+                 key_column="rowid", page_size=DEFAULT_PAGE_SIZE, editable=False, parent=None):
+        super().__init__(parent)
+        self.db = db_connection
+        self.table_name = table_name
+        self.column_names = list(column_names)
+        self.relations = relations or {}
+        self.headers = headers or {}
+        self.key_column = key_column
+        self.page_size = page_size
+        self.editable = editable
+
+        self._column_index = {name: i for i, name in enumerate(self.column_names)}
+        self._sort_column = None # None - сортировка по ключу
+        self._sort_order = Qt.AscendingOrder
+        self._filter_sql = ""
+        self._filter_params = []
+        self._last_error = ""
+
+        # Каждая строка: [ключ, значения столбцов..., отображаемые значения связей..., значение сортировки]
+        self._rows = []
+        self._at_end = False
+        self._relation_columns = [col for col in self.column_names if col in self.relations]
+        self._relation_offset = 1 + len(self.column_names)
+
+    # --- Построение запроса ---
+
+    def _relation_alias(self, column):
+        return f"rel_{self._relation_columns.index(column)}"
+
+    def _from_clause(self):
+        sql = f"{self.table_name} t"
+        for column in self._relation_columns:
+            relation = self.relations[column]
+            table, key, _ = relation[:3]
+            alias = self._relation_alias(column)
+            conditions = [f"{alias}.{key} = t.{column}"]
+            extra_columns = relation[3] if len(relation) > 3 else {}
+            for local_column, foreign_column in extra_columns.items():
+                conditions.append(f"{alias}.{foreign_column} = t.{local_column}")
+            sql += f" LEFT JOIN {table} {alias} ON {' AND '.join(conditions)}"
+        return sql
+
+    def _sort_expression(self):
+        if self._sort_column is None:
+            return None
+        if self._sort_column in self.relations:
+            return f"{self._relation_alias(self._sort_column)}.{self.relations[self._sort_column][2]}"
+        return f"t.{self._sort_column}"
+
+    def _keyset_condition(self):
+        """Условие 'после последней загруженной строки' с учетом NULL (в SQLite NULL меньше любых значений)."""
+        if not self._rows:
+            return "", []
+        last_key = self._rows[-1][0]
+        key = f"t.{self.key_column}"
+        sort_expression = self._sort_expression()
+        ascending = self._sort_order == Qt.AscendingOrder
+        if sort_expression is None:
+            return (f"{key} > ?" if ascending else f"{key} < ?"), [last_key]
+
+        last_value = self._rows[-1][-1]
+        if ascending:
+            if last_value is None:
+                return f"(({sort_expression} IS NULL AND {key} > ?) OR {sort_expression} IS NOT NULL)", [last_key]
+            return f"({sort_expression} > ? OR ({sort_expression} = ? AND {key} > ?))", [last_value, last_value, last_key]
+        if last_value is None:
+            return f"({sort_expression} IS NULL AND {key} < ?)", [last_key]
+        return (f"({sort_expression} < ? OR ({sort_expression} = ? AND {key} < ?) OR {sort_expression} IS NULL)",
+                [last_value, last_value, last_key])
+
+    def _select_sql(self):
+        select_list = [f"t.{self.key_column}"] + [f"t.{col}" for col in self.column_names]
+        select_list += [f"{self._relation_alias(col)}.{self.relations[col][2]}" for col in self._relation_columns]
+        select_list.append(self._sort_expression() or f"t.{self.key_column}")
+        return f"SELECT {', '.join(select_list)} FROM {self._from_clause()}"
+
+    def _page_query(self):
+        conditions = []
+        params = []
+        if self._filter_sql:
+            conditions.append(f"({self._filter_sql})")
+            params.extend(self._filter_params)
+        keyset_sql, keyset_params = self._keyset_condition()
+        if keyset_sql:
+            conditions.append(keyset_sql)
+            params.extend(keyset_params)
+
+        sort_expression = self._sort_expression()
+        direction = "ASC" if self._sort_order == Qt.AscendingOrder else "DESC"
+        order_by = f"t.{self.key_column} {direction}"
+        if sort_expression is not None:
+            order_by = f"{sort_expression} {direction}, " + order_by
+
+        sql = self._select_sql()
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order_by} LIMIT {int(self.page_size)}"
+        return sql, params
+
+    def _read_rows(self, sql, params):
+        """Выполняет запрос и возвращает список строк или None при ошибке."""
+        query = QSqlQuery(self.db)
+        query.setForwardOnly(True)
+        query.prepare(sql)
+        for param in params:
+            query.addBindValue(param)
+        if not query.exec_():
+            self._last_error = query.lastError().text()
+            print(f"Ошибка загрузки данных таблицы '{self.table_name}':", self._last_error)
+            return None
+
+        width = self._relation_offset + len(self._relation_columns) + 1
+        rows = []
+        while query.next():
+            rows.append([None if query.isNull(i) else query.value(i) for i in range(width)])
+        return rows
+
+    def _read_page(self):
+        """Читает следующую страницу. Возвращает список строк или None при ошибке."""
+        sql, params = self._page_query()
+        return self._read_rows(sql, params)
+
+    def _fetch_row(self, key):
+        """Читает одну строку по ключу с учетом текущего фильтра. None - строки нет (или она не проходит фильтр)."""
+        sql = self._select_sql() + f" WHERE t.{self.key_column} = ?"
+        params = [key]
+        if self._filter_sql:
+            sql += f" AND ({self._filter_sql})"
+            params.extend(self._filter_params)
+        rows = self._read_rows(sql, params)
+        return rows[0] if rows else None
+
+    # --- Загрузка данных ---
+
+    def reload(self):
+        """Сбрасывает загруженные строки и читает первую страницу."""
+        self._last_error = ""
+        self.beginResetModel()
+        self._rows = []
+        self._at_end = False
+        rows = self._read_page()
+        if rows is not None:
+            self._rows = rows
+            self._at_end = len(rows) < self.page_size
+        else:
+            self._at_end = True
+        self.endResetModel()
+        return rows is not None
+
+    def last_error(self):
+        return self._last_error
+
+    def set_filter(self, filter_sql, params=None):
+        """Устанавливает условие WHERE (столбцы таблицы - через псевдоним 't.') и перезагружает модель."""
+        self._filter_sql = filter_sql or ""
+        self._filter_params = list(params or [])
+        return self.reload()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._at_end
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._at_end:
+            return
+        rows = self._read_page()
+        if rows is None:
+            self._at_end = True
+            return
+        if len(rows) < self.page_size:
+            self._at_end = True
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if 0 <= column < len(self.column_names):
+            self._sort_column = self.column_names[column]
+        else:
+            self._sort_column = None
+        self._sort_order = order
+        self.reload()
+
+    # --- Точечное обновление строк ---
+
+    def _row_order(self, values):
+        return (_sqlite_order_key(values[-1]), _sqlite_order_key(values[0]))
+
+    def _comes_before(self, values, other_values):
+        """True, если строка values стоит раньше other_values в текущей сортировке."""
+        if self._sort_order == Qt.AscendingOrder:
+            return self._row_order(values) < self._row_order(other_values)
+        return self._row_order(values) > self._row_order(other_values)
+
+    def _insert_position(self, values):
+        """Позиция строки среди загруженных (загруженные строки - всегда начало полного результата)."""
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self._comes_before(self._rows[middle], values):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def key_row(self, key):
+        """Номер загруженной строки с ключом key или -1."""
+        for row, values in enumerate(self._rows):
+            if values[0] == key:
+                return row
+        return -1
+
+    def _insert_values(self, values):
+        position = self._insert_position(values)
+        if position == len(self._rows) and not self._at_end:
+            return # Строка окажется на еще не загруженной странице и будет прочитана fetchMore
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, values)
+        self.endInsertRows()
+
+    def _remove_at(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self.endRemoveRows()
+
+    def insert_key(self, key):
+        """Добавляет в модель новую запись с ключом key (после INSERT)."""
+        if self.key_row(key) != -1:
+            return self.refresh_key(key)
+        values = self._fetch_row(key)
+        if values is not None:
+            self._insert_values(values)
+        return values is not None
+
+    def refresh_key(self, key):
+        """Перечитывает запись с ключом key (после UPDATE); при изменении сортируемого значения строка перемещается."""
+        row = self.key_row(key)
+        if row == -1:
+            return self.insert_key(key)
+        values = self._fetch_row(key)
+        if values is None:
+            self._remove_at(row) # Запись удалена или больше не проходит фильтр
+            return False
+
+        in_place = (row == 0 or self._comes_before(self._rows[row - 1], values)) and \
+                   (row == len(self._rows) - 1 or self._comes_before(values, self._rows[row + 1]))
+        if in_place:
+            self._rows[row] = values
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.column_names) - 1))
+        else:
+            self._remove_at(row)
+            self._insert_values(values)
+        return True
+
+    def remove_key(self, key):
+        """Убирает из модели запись с ключом key (после DELETE)."""
+        row = self.key_row(key)
+        if row != -1:
+            self._remove_at(row)
+
+    def refresh_row(self, row):
+        key = self.row_key(row)
+        if key is not None:
+            self.refresh_key(key)
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.column_names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._rows)):
+            return QVariant()
+        row = self._rows[index.row()]
+        column_name = self.column_names[index.column()]
+        if role == Qt.DisplayRole:
+            if column_name in self.relations:
+                value = row[self._relation_offset + self._relation_columns.index(column_name)]
+                if value is None: # Связанная запись не найдена - показываем сам ID
+                    value = row[1 + index.column()]
+            else:
+                value = row[1 + index.column()]
+            return QVariant() if value is None else value
+        if role == Qt.EditRole:
+            value = row[1 + index.column()]
+            return QVariant() if value is None else value
+        return QVariant()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if self.editable:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Редактирование ячейки прямо в таблице: UPDATE одного столбца и перечитывание строки."""
+        if not self.editable or role != Qt.EditRole or not index.isValid():
+            return False
+        success, error_text = self.update_record(index.row(), {self.column_names[index.column()]: value})
+        if not success:
+            self._last_error = error_text
+            print(f"Ошибка при сохранении изменения в таблице '{self.table_name}':", error_text)
+            self.write_failed.emit(error_text)
+        return success
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal and 0 <= section < len(self.column_names):
+            column_name = self.column_names[section]
+            return self.headers.get(column_name, column_name)
+        if orientation == Qt.Vertical:
+            return section + 1
+        return QVariant()
+
+    # --- Доступ к данным строк ---
+
+    def fieldIndex(self, column_name):
+        """Индекс столбца по имени (как QSqlTableModel.fieldIndex), -1 если столбца нет."""
+        return self._column_index.get(column_name, -1)
+
+    def row_key(self, row):
+        """Значение ключевого столбца (rowid) строки или None."""
+        if 0 <= row < len(self._rows):
+            return self._rows[row][0]
+        return None
+
+    def row_data(self, row):
+        """Возвращает словарь {столбец: значение} исходных данных строки (NULL -> '')."""
+        if not (0 <= row < len(self._rows)):
+            return {}
+        values = self._rows[row]
+        return {name: ('' if values[1 + i] is None else values[1 + i]) for i, name in enumerate(self.column_names)}
+
+    # --- Запись (изменения выполняются SQL-запросами и сразу применяются к загруженным строкам) ---
+
+    def insert_record(self, data):
+        """Добавляет запись из словаря data (лишние ключи игнорируются). Возвращает (success, новый_ключ или текст ошибки)."""
+        columns = [col for col in data if col in self._column_index]
+        query = QSqlQuery(self.db)
+        if columns:
+            query.prepare(f"INSERT INTO {self.table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})")
+            for col in columns:
+                query.addBindValue(data[col])
+        else:
+            query.prepare(f"INSERT INTO {self.table_name} DEFAULT VALUES")
+        if not query.exec_():
+            return False, query.lastError().text()
+        mark_tables_changed(self.table_name)
+        new_key = query.lastInsertId()
+        self.insert_key(new_key)
+        return True, new_key
+
+    def update_record(self, row, data):
+        """Обновляет запись в строке row значениями из data. Возвращает (success, текст ошибки)."""
+        key = self.row_key(row)
+        if key is None:
+            return False, f"Строка {row} не загружена."
+        columns = [col for col in data if col in self._column_index]
+        if not columns:
+            return True, ""
+        query = QSqlQuery(self.db)
+        query.prepare(f"UPDATE {self.table_name} SET {', '.join(f'{col} = ?' for col in columns)} WHERE {self.key_column} = ?")
+        for col in columns:
+            query.addBindValue(data[col])
+        query.addBindValue(key)
+        if not query.exec_():
+            return False, query.lastError().text()
+        mark_tables_changed(self.table_name)
+        self.refresh_key(key)
+        return True, ""
+
+    def delete_record(self, row):
+        """Удаляет запись в строке row. Возвращает (success, текст ошибки)."""
+        key = self.row_key(row)
+        if key is None:
+            return False, f"Строка {row} не загружена."
+        query = QSqlQuery(self.db)
+        query.prepare(f"DELETE FROM {self.table_name} WHERE {self.key_column} = ?")
+        query.addBindValue(key)
+        if not query.exec_():
+            return False, query.lastError().text()
+        mark_tables_changed(self.table_name)
+        self.remove_key(key)
+        return True, ""
@@ -0,0 +1,640 @@
+# File: report_model.py
+# Построение запроса отчета по инвентаризации (общий для ReportView и других генераторов отчетов)
+# и формирование отчета .docx/.pdf (выполняется в фоновом потоке, см. ReportView).
+# Результаты запросов кэшируются (report_cache) до изменения данных в таблицах отчета.
+import csv
+from collections import namedtuple
+
+from PyQt5.QtSql import QSqlQuery
+from PyQt5.QtCore import QDate, Qt, QAbstractTableModel, QModelIndex, QVariant
+
+from database import inventory_fts_available, get_table_versions
+from src.utils.inventory_search import build_text_filter
+from src.utils.csv_handler import CANCELLED_MESSAGE
+from src.utils.report_cache import report_cache, normalize_filters, database_file_stamp
+from src.utils.lookup_cache import get_lookup, get_subcategories, SUBCATEGORY_TABLE
+
+# Столбцы отчета: (SQL-выражение, заголовок)
+REPORT_COLUMNS = [
+    ("ui.inventory_number", "Инв. номер"),
+    ("ui.serial_number", "Сер. номер"),
+    ("ui.manufacturer", "Производитель"),
+    ("ui.model", "Модель"),
+    ("c.category", "Категория"),
+    ("sc.subcategory", "Подкатегория"),
+    ("ut.unit_type", "Тип единицы"),
+    ("ui.cabinet", "Кабинет"),
+    ("os.order_status", "Статус заказа"),
+    ("ui.date_order_buhgaltery", "Дата заказа"),
+    ("ui.date_issue", "Дата выдачи"),
+    ("ui.notice", "Примечание"),
+    ("uei.device_name", "Имя устройства"),
+    ("uei.ip", "IP"),
+    ("uei.mac", "MAC"),
+]
+
+REPORT_HEADERS = [header for _, header in REPORT_COLUMNS]
+
+# Таблицы, от которых зависит результат отчета (версия данных для кэша)
+REPORT_TABLES = ["Units_inventory", "Category", "Subcategory", "Unit_type", "Order_status", "Units_extended_info"]
+
+# Подкатегория идентифицируется парой (id_category, id_subcategory),
+# поэтому соединение идет по обоим столбцам (индекс ограничения UNIQUE (id_category, id_subcategory))
+REPORT_FROM_CLAUSE = """
+            FROM
+                Units_inventory ui
+            LEFT JOIN Category c ON ui.id_category = c.id_category
+            LEFT JOIN Subcategory sc ON ui.id_category = sc.id_category AND ui.id_subcategory = sc.id_subcategory
+            LEFT JOIN Unit_type ut ON ui.id_unit_type = ut.id_unit_type
+            LEFT JOIN Order_status os ON ui.id_order_status = os.id_order_status
+            LEFT JOIN Units_extended_info uei ON ui.id_unit_inventory = uei.id_unit_inventory -- Связь 1-к-1
+"""
+
+# Текстовые фильтры отчета (ключ фильтра = столбец Units_inventory)
+TEXT_FILTER_COLUMNS = ["cabinet", "manufacturer", "model", "serial_number", "inventory_number"]
+
+
+def build_report_where(filters, use_fts=True):
+    """
+    Строит условие WHERE по словарю фильтров:
+    id_category, id_subcategory, id_unit_type, id_order_status - точное совпадение (None - без фильтра);
+    cabinet, manufacturer, model, serial_number, inventory_number - поиск подстроки;
+    start_date, end_date - диапазон date_order_buhgaltery в формате ISO.
+    Возвращает кортеж (sql, params).
+    """
+    where_sql = " WHERE 1=1"
+    params = []
+
+    for column in ("id_category", "id_subcategory", "id_unit_type", "id_order_status"):
+        value = filters.get(column)
+        if value is not None:
+            where_sql += f" AND ui.{column} = ?"
+            params.append(value)
+
+    text_filters = {column: filters.get(column) for column in TEXT_FILTER_COLUMNS}
+    text_sql, text_params = build_text_filter(text_filters, use_fts=use_fts)
+    if text_sql:
+        where_sql += " AND " + text_sql
+        params.extend(text_params)
+
+    # Фильтр по дате заказа (date_order_buhgaltery)
+    start_date = filters.get("start_date")
+    end_date = filters.get("end_date")
+    if start_date and end_date:
+        where_sql += " AND ui.date_order_buhgaltery BETWEEN ? AND ?"
+        params.append(start_date)
+        params.append(end_date)
+
+    return where_sql, params
+
+
+def build_inventory_report_query(filters, db=None, page=None):
+    """
+    Возвращает (sql, params) запроса отчета по инвентаризации.
+    Если передано соединение db, текстовые фильтры используют FTS5, когда он доступен.
+    page - (limit, offset) для чтения одной страницы результата (предпросмотр).
+    """
+    use_fts = db is not None and inventory_fts_available(db)
+    where_sql, params = build_report_where(filters, use_fts=use_fts)
+    select_list = ",\n                ".join(expression for expression, _ in REPORT_COLUMNS)
+    # id_unit_inventory в конце делает порядок однозначным: страницы не пересекаются и не теряют строк
+    query_string = f"""
+            SELECT
+                {select_list}
+            {REPORT_FROM_CLAUSE}{where_sql}
+            ORDER BY ui.date_order_buhgaltery, ui.inventory_number, ui.id_unit_inventory"""
+    if page is not None:
+        query_string += "\n            LIMIT ? OFFSET ?"
+        params.extend(page)
+    return query_string, params
+
+
+REPORT_TITLE = "Отчет по инвентаризации"
+EMPTY_REPORT_TEXT = "Нет данных, соответствующих выбранным фильтрам."
+
+
+def _iter_report_rows(query, column_count):
+    """Строки результата запроса как списки значений (даты - в формате ISO)."""
+    column_range = range(column_count)
+    while query.next():
+        values = [query.value(i) for i in column_range]
+        yield [value.toString(Qt.ISODate) if isinstance(value, QDate) else value for value in values]
+
+
+def report_data_token(db_connection):
+    """
+    Версия данных отчета: счетчики записи таблиц отчета в этом процессе и отметка файлов базы
+    (запись из другого процесса). PRAGMA data_version здесь не подходит: ее значение имеет
+    смысл только в пределах одного соединения, а каждый отчет формируется в новом.
+    """
+    return get_table_versions(REPORT_TABLES), database_file_stamp(db_connection.databaseName())
+
+
+def _report_cache_key(db_connection, filters):
+    return db_connection.databaseName(), inventory_fts_available(db_connection), normalize_filters(filters)
+
+
+def open_report_rows(db_connection, filters):
+    """
+    Строки отчета по фильтрам: из кэша, если данные не менялись с прошлого запроса с теми же
+    фильтрами, иначе из однонаправленного запроса с сохранением результата в кэш.
+    Возвращает (итератор строк, запрос или None, текст ошибки или None); запрос нужно
+    завершить (finish) после чтения строк.
+    """
+    cache_key = _report_cache_key(db_connection, filters)
+    # Версия фиксируется до чтения: запись во время чтения сделает результат устаревшим
+    token = report_data_token(db_connection)
+    cached_rows = report_cache.get(cache_key, token)
+    if cached_rows is not None:
+        print("Отчет: результат запроса взят из кэша.")
+        return iter(cached_rows), None, None
+
+    query_string, query_params = build_inventory_report_query(filters, db_connection)
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    query.prepare(query_string)
+    for param in query_params:
+        query.addBindValue(param)
+    if not query.exec_():
+        return None, None, f"Ошибка при выполнении запроса к базе данных:\n{query.lastError().text()}"
+    rows = report_cache.record(cache_key, token, _iter_report_rows(query, len(REPORT_HEADERS)))
+    return rows, query, None
+
+
+def read_report_page(db_connection, filters, limit, offset):
+    """
+    Страница строк отчета (limit строк начиная с offset). Запрос завершается сразу после чтения,
+    поэтому между страницами соединение не держит транзакцию чтения.
+    Возвращает кортеж (строки, текст ошибки или None).
+    """
+    query_string, query_params = build_inventory_report_query(filters, db_connection, page=(limit, offset))
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    query.prepare(query_string)
+    for param in query_params:
+        query.addBindValue(param)
+    if not query.exec_():
+        return [], f"Ошибка при выполнении запроса к базе данных:\n{query.lastError().text()}"
+    rows = list(_iter_report_rows(query, len(REPORT_HEADERS)))
+    query.finish()
+    return rows, None
+
+
+def count_report_rows(db_connection, filters):
+    """
+    Количество строк отчета по фильтрам. Соединения отчета идут по уникальным ключам и не меняют
+    число строк, поэтому считается только Units_inventory (по индексам, без чтения связанных таблиц).
+    Возвращает число или None при ошибке.
+    """
+    where_sql, params = build_report_where(filters, use_fts=inventory_fts_available(db_connection))
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    query.prepare(f"SELECT COUNT(*) FROM Units_inventory ui{where_sql}")
+    for param in params:
+        query.addBindValue(param)
+    if not query.exec_() or not query.next():
+        print("Ошибка подсчета строк отчета:", query.lastError().text())
+        return None
+    count = query.value(0)
+    query.finish()
+    return count
+
+
+class ReportPreviewModel(QAbstractTableModel):
+    """
+    Предпросмотр отчета: строки того же запроса, что и в документе, читаются страницами
+    (LIMIT/OFFSET) по мере прокрутки (canFetchMore/fetchMore), поэтому первая страница
+    показывается сразу при любом размере результата. Каждая страница - отдельный запрос,
+    завершаемый после чтения: открытый запрос держал бы снимок WAL соединения интерфейса,
+    и справочники и счетчики на этом соединении видели бы устаревшие данные.
+    Общее число строк - отдельный COUNT. Если в кэше отчетов есть результат для фильтров,
+    строки берутся из него; результат, прочитанный до конца без изменения данных,
+    сохраняется в кэш, и документ по тем же фильтрам формируется без повторного запроса.
+    """
+
+    FETCH_SIZE = 200
+
+    def __init__(self, db_connection, parent=None):
+        super().__init__(parent)
+        self.db = db_connection
+        self._rows = []
+        self._filters = None
+        self._cached_rows = None # Итератор строк из кэша отчетов (вместо запросов страниц)
+        self._has_more = False
+        self._cache_key = None
+        self._token = None
+        self._total_count = None
+
+    def _close_cached_rows(self):
+        if self._cached_rows is not None and hasattr(self._cached_rows, "close"):
+            self._cached_rows.close()
+        self._cached_rows = None
+
+    def close(self):
+        """Прекращает чтение строк (показанные строки остаются)."""
+        self._close_cached_rows()
+        self._has_more = False
+
+    def set_filters(self, filters):
+        """Перечитывает предпросмотр для фильтров. Возвращает кортеж (success, message)."""
+        self.beginResetModel()
+        self.close()
+        self._rows = []
+        self._filters = dict(filters)
+        self._total_count = None
+        self._cache_key = _report_cache_key(self.db, filters)
+        self._token = report_data_token(self.db)
+        cached_rows = report_cache.get(self._cache_key, self._token)
+        if cached_rows is not None:
+            print("Предпросмотр: строки взяты из кэша отчетов.")
+            self._cached_rows = iter(cached_rows)
+        self._has_more = True
+        self._total_count = count_report_rows(self.db, filters)
+        rows, error = self._next_rows(self.FETCH_SIZE)
+        if error:
+            self.close()
+            self.endResetModel()
+            return False, error
+        self._rows = rows
+        self.endResetModel()
+        return True, ""
+
+    def _next_rows(self, limit):
+        """
+        Следующие до limit строк: из кэша или запросом страницы. В конце результата чтение
+        прекращается. Возвращает кортеж (строки, текст ошибки или None).
+        """
+        if self._cached_rows is not None:
+            rows = []
+            for values in self._cached_rows:
+                rows.append(values)
+                if len(rows) >= limit:
+                    break
+            else:
+                self.close()
+            return rows, None
+
+        rows, error = read_report_page(self.db, self._filters, limit, len(self._rows))
+        if error:
+            return [], error
+        if len(rows) < limit:
+            self.close()
+            self._store_in_cache(self._rows + rows)
+        return rows, None
+
+    def _store_in_cache(self, rows):
+        """Сохраняет полный результат в кэш, если данные не менялись, пока читались страницы."""
+        if report_data_token(self.db) != self._token:
+            return
+        for _ in report_cache.record(self._cache_key, self._token, iter(rows)):
+            pass
+
+    def total_count(self):
+        """Число строк отчета по текущим фильтрам (None - неизвестно)."""
+        return self._total_count
+
+    def loaded_count(self):
+        return len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        first = len(self._rows)
+        rows, error = self._next_rows(self.FETCH_SIZE)
+        if error:
+            print("Ошибка чтения строк предпросмотра:", error)
+            self.close()
+            return
+        if rows:
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(REPORT_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid() or not (0 <= index.row() < len(self._rows)):
+            return QVariant()
+        value = self._rows[index.row()][index.column()]
+        return QVariant() if value is None else value
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal and 0 <= section < len(REPORT_HEADERS):
+            return REPORT_HEADERS[section]
+        if orientation == Qt.Vertical:
+            return section + 1
+        return QVariant()
+
+
+def generate_inventory_report(db_connection, file_path, filters, filter_descriptions=(), progress_callback=None):
+    """
+    Формирует отчет по инвентаризации в .docx или, если file_path оканчивается на .pdf, в PDF:
+    строки читаются однонаправленным запросом (или из кэша, см. open_report_rows) и сразу пишутся
+    в файл (write_docx_table / write_pdf_table), без построения всего документа в памяти.
+    filter_descriptions - строки с описанием примененных фильтров для шапки отчета.
+    progress_callback(записано_строк) - как в export_data_to_csv.
+    Возвращает кортеж (success, message).
+    """
+    if file_path.lower().endswith(".pdf"):
+        from src.utils.pdf_writer import write_pdf_table as write_table
+    else:
+        try:
+            from src.utils.docx_writer import write_docx_table as write_table
+        except ImportError:
+            return False, "Библиотека 'python-docx' не установлена. Пожалуйста, установите ее (`pip install python-docx`)."
+
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
+
+    rows, query, error = open_report_rows(db_connection, filters)
+    if error:
+        return False, error
+
+    paragraphs = [f"Сформирован: {QDate.currentDate().toString(Qt.ISODate)}"]
+    paragraphs.append("Примененные фильтры: " + ("; ".join(filter_descriptions) if filter_descriptions else "нет"))
+    try:
+        row_count = write_table(file_path, REPORT_TITLE, paragraphs, REPORT_HEADERS, rows,
+                                progress_callback=progress_callback, empty_text=EMPTY_REPORT_TEXT)
+    except Exception as e:
+        return False, f"Произошла ошибка при создании или сохранении отчета:\n{e}"
+    finally:
+        if hasattr(rows, "close"):
+            rows.close() # Прерванное чтение не сохраняется в кэш
+        if query is not None:
+            query.finish()
+    if row_count is None:
+        return False, CANCELLED_MESSAGE
+    return True, f"Отчет успешно сохранен в:\n{file_path}\nСтрок в отчете: {row_count}"
+
+
+# --- Пакет документов по шаблонам (см. src/utils/document_batch.py) ---
+
+# Группировка документов: (SQL ключа группы, SQL названия группы, SQL должности и ФИО подписывающего)
+DOCUMENT_GROUPINGS = {
+    "employee": ("ui.id_employee", "e.fio", "e.post", "e.fio"),
+    "department": ("e.id_department", "COALESCE(d.department_fullname, e.id_department)", "NULL", "NULL"),
+    "cabinet": ("ui.cabinet", "'Кабинет ' || ui.cabinet", "NULL", "NULL"),
+}
+DOCUMENT_GROUPING_LABELS = {"employee": "По сотрудникам", "department": "По отделам", "cabinet": "По кабинетам"}
+
+# Столбцы таблицы документа (без "№ п/п") по шаблону
+DOCUMENT_TEMPLATE_COLUMNS = {
+    "transfer_sheet": [
+        "TRIM(COALESCE(sc.subcategory, c.category, '') || ' ' || COALESCE(ui.manufacturer, '') || ' ' || COALESCE(ui.model, ''))",
+        "ui.inventory_number", "ut.unit_type", "ui.unit_count"],
+    "cartridge_sheet": [
+        "TRIM(COALESCE(ui.manufacturer, '') || ' ' || COALESCE(ui.model, ''))",
+        "ui.inventory_number", "ui.cabinet", "COALESCE(d.department_shortname, d.department_fullname)", "NULL", "NULL"],
+}
+
+# Дополнительное условие отбора строк по шаблону: (SQL, параметры).
+# Картриджи есть только у принтеров и МФУ: категория или подкатегория определяется по наименованию
+# (LIKE в SQLite не учитывает регистр только для латиницы, поэтому "ринтер" - и "Принтер", и "принтер")
+CARTRIDGE_DEVICE_PATTERNS = ["%МФУ%", "%ринтер%"]
+DOCUMENT_TEMPLATE_CONDITIONS = {
+    "cartridge_sheet": (
+        "(" + " OR ".join(["c.category LIKE ?"] * len(CARTRIDGE_DEVICE_PATTERNS)
+                          + ["sc.subcategory LIKE ?"] * len(CARTRIDGE_DEVICE_PATTERNS)) + ")",
+        CARTRIDGE_DEVICE_PATTERNS * 2),
+}
+
+DOCUMENT_FROM_CLAUSE = REPORT_FROM_CLAUSE + """            LEFT JOIN Employee e ON ui.id_employee = e.id_employee
+            LEFT JOIN Departments d ON e.id_department = d.id_department
+"""
+
+
+def load_document_groups(db_connection, template_name, group_by, filters):
+    """
+    Читает строки документов одним запросом (фильтры - как в build_report_where, плюс условие
+    шаблона из DOCUMENT_TEMPLATE_CONDITIONS) и делит их на группы group_by (ключ DOCUMENT_GROUPINGS).
+    Записи без значения группы пропускаются.
+    Возвращает кортеж (список DocumentGroup, текст ошибки или None).
+    """
+    from src.utils.document_batch import DocumentGroup
+
+    key_sql, title_sql, post_sql, name_sql = DOCUMENT_GROUPINGS[group_by]
+    columns = DOCUMENT_TEMPLATE_COLUMNS[template_name]
+    where_sql, params = build_report_where(filters, use_fts=inventory_fts_available(db_connection))
+    if template_name in DOCUMENT_TEMPLATE_CONDITIONS:
+        condition_sql, condition_params = DOCUMENT_TEMPLATE_CONDITIONS[template_name]
+        where_sql += " AND " + condition_sql
+        params.extend(condition_params)
+    query_string = f"""
+            SELECT {key_sql}, {title_sql}, {post_sql}, {name_sql}, {', '.join(columns)}
+            {DOCUMENT_FROM_CLAUSE}{where_sql} AND {key_sql} IS NOT NULL AND {key_sql} <> ''
+            ORDER BY 2, 1, ui.inventory_number"""
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    query.prepare(query_string)
+    for param in params:
+        query.addBindValue(param)
+    if not query.exec_():
+        return [], f"Ошибка при выполнении запроса к базе данных:\n{query.lastError().text()}"
+
+    groups = []
+    current_key = object()
+    column_range = range(4, 4 + len(columns))
+    while query.next():
+        key = query.value(0)
+        if key != current_key:
+            current_key = key
+            groups.append(DocumentGroup(str(query.value(1) or key), query.value(2) or "", query.value(3) or "", []))
+        groups[-1].rows.append([query.value(i) for i in column_range])
+    query.finish()
+    return groups, None
+
+
+def generate_document_batch(db_connection, output_path, template_name, group_by, filters, progress_callback=None, workers=None):
+    """
+    Формирует по документу template_name (ключ DOCUMENT_TEMPLATES) на каждую группу group_by
+    в zip-архив (output_path с расширением .zip) или каталог output_path.
+    progress_callback(записано_документов) - как в export_data_to_csv.
+    Возвращает кортеж (success, message).
+    """
+    try:
+        from src.utils.document_batch import DOCUMENT_TEMPLATES, write_document_batch
+    except ImportError:
+        return False, "Библиотека 'python-docx' не установлена. Пожалуйста, установите ее (`pip install python-docx`)."
+
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
+
+    groups, error = load_document_groups(db_connection, template_name, group_by, filters)
+    if error:
+        return False, error
+    if not groups:
+        return False, EMPTY_REPORT_TEXT
+
+    template = DOCUMENT_TEMPLATES[template_name]
+    try:
+        count = write_document_batch(output_path, template, groups, progress_callback=progress_callback, workers=workers)
+    except Exception as e:
+        return False, f"Произошла ошибка при формировании документов:\n{e}"
+    if count is None:
+        return False, CANCELLED_MESSAGE
+    return True, f"Документы \"{template.title}\" сохранены в:\n{output_path}\nДокументов: {count}"
+
+
+# --- Сводные отчеты (количество по двум измерениям) ---
+# Группировка выполняется в SQLite по столбцам-идентификаторам Units_inventory без соединений
+# (фильтры отчета тоже относятся только к ui), наименования подставляются из справочников,
+# а небольшой результат разворачивается в таблицу (pivot) в Python.
+
+SummaryDimension = namedtuple("SummaryDimension", ["title", "columns", "lookup_table"])
+SummaryDimension.__doc__ = """Измерение сводного отчета: заголовок, SQL-выражения ключа группировки
+и справочник для наименований (None - значение ключа выводится как есть)."""
+
+SUMMARY_DIMENSIONS = {
+    "category": SummaryDimension("Категория", ["ui.id_category"], "Category"),
+    "subcategory": SummaryDimension("Подкатегория", ["ui.id_category", "ui.id_subcategory"], SUBCATEGORY_TABLE),
+    "unit_type": SummaryDimension("Тип единицы", ["ui.id_unit_type"], "Unit_type"),
+    "order_status": SummaryDimension("Статус заказа", ["ui.id_order_status"], "Order_status"),
+    "cabinet": SummaryDimension("Кабинет", ["ui.cabinet"], None),
+    "manufacturer": SummaryDimension("Производитель", ["ui.manufacturer"], None),
+    "employee": SummaryDimension("Сотрудник", ["ui.id_employee"], "Employee"),
+    "department": SummaryDimension(
+        "Отдел", ["(SELECT e.id_department FROM Employee e WHERE e.id_employee = ui.id_employee)"], "Departments"),
+}
+
+# Показатель: (заголовок, SQL-выражение)
+SUMMARY_MEASURES = {
+    "count": ("Количество записей", "COUNT(*)"),
+    "units": ("Количество единиц", "COALESCE(SUM(ui.unit_count), 0)"),
+}
+
+EMPTY_DIMENSION_LABEL = "(не указано)"
+TOTAL_LABEL = "Итого"
+
+SummaryTable = namedtuple("SummaryTable", ["title", "headers", "rows"])
+SummaryTable.__doc__ = """Развернутый сводный отчет: заголовки и строки (последние строка и столбец - итоги),
+готовые для write_docx_table / write_pdf_table / CSV."""
+
+
+def _dimension_labeler(db_connection, dimension):
+    """Функция, возвращающая наименование значения измерения по кортежу ключа."""
+    if dimension.lookup_table == SUBCATEGORY_TABLE:
+        subcategories = get_subcategories(db_connection)
+        return lambda key: subcategories.name(key[0], key[1]) or (key[1] if key[1] else "")
+    if dimension.lookup_table is not None:
+        lookup = get_lookup(db_connection, dimension.lookup_table)
+        return lambda key: lookup.name(key[0]) or ("" if key[0] is None else str(key[0]))
+    return lambda key: "" if key[0] is None else str(key[0]).strip()
+
+
+def _sorted_labels(labels):
+    return sorted(labels, key=lambda label: (label == EMPTY_DIMENSION_LABEL, label.casefold()))
+
+
+def build_summary_query(row_dimension, column_dimension, measure, filters, use_fts=True):
+    """Возвращает (sql, params) запроса GROUP BY по измерениям (column_dimension может быть None)."""
+    key_columns = list(SUMMARY_DIMENSIONS[row_dimension].columns)
+    if column_dimension is not None:
+        key_columns += SUMMARY_DIMENSIONS[column_dimension].columns
+    where_sql, params = build_report_where(filters or {}, use_fts=use_fts)
+    group_by = ", ".join(str(position) for position in range(1, len(key_columns) + 1))
+    query_string = f"""
+            SELECT {', '.join(key_columns)}, {SUMMARY_MEASURES[measure][1]}
+            FROM Units_inventory ui{where_sql}
+            GROUP BY {group_by}"""
+    return query_string, params
+
+
+def load_summary(db_connection, row_dimension, column_dimension=None, measure="count", filters=None):
+    """
+    Сводный отчет: значение measure (ключ SUMMARY_MEASURES) по строкам row_dimension и столбцам
+    column_dimension (ключи SUMMARY_DIMENSIONS; без столбцов - один столбец итогов).
+    Возвращает кортеж (SummaryTable или None, текст ошибки или None).
+    """
+    if db_connection is None or not db_connection.isOpen():
+        return None, "Ошибка: Соединение с базой данных не установлено или закрыто."
+    if column_dimension == row_dimension:
+        column_dimension = None
+
+    query_string, params = build_summary_query(row_dimension, column_dimension, measure, filters,
+                                               use_fts=inventory_fts_available(db_connection))
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    query.prepare(query_string)
+    for param in params:
+        query.addBindValue(param)
+    if not query.exec_():
+        return None, f"Ошибка при выполнении запроса к базе данных:\n{query.lastError().text()}"
+
+    row_dim = SUMMARY_DIMENSIONS[row_dimension]
+    column_dim = SUMMARY_DIMENSIONS[column_dimension] if column_dimension is not None else None
+    row_label = _dimension_labeler(db_connection, row_dim)
+    column_label = _dimension_labeler(db_connection, column_dim) if column_dim is not None else None
+    row_width = len(row_dim.columns)
+    column_width = len(column_dim.columns) if column_dim is not None else 0
+
+    # Ключи переводятся в наименования; разные ключи с одним наименованием суммируются
+    cells = {}
+    while query.next():
+        values = [query.value(i) for i in range(row_width + column_width + 1)]
+        row_name = row_label(tuple(values[:row_width])) or EMPTY_DIMENSION_LABEL
+        column_name = (column_label(tuple(values[row_width:row_width + column_width])) or EMPTY_DIMENSION_LABEL
+                       if column_label is not None else TOTAL_LABEL)
+        cells[(row_name, column_name)] = cells.get((row_name, column_name), 0) + (values[-1] or 0)
+    query.finish()
+
+    row_names = _sorted_labels({row_name for row_name, _ in cells})
+    measure_title = SUMMARY_MEASURES[measure][0]
+    if column_dim is None:
+        headers = [row_dim.title, measure_title]
+        rows = [[row_name, cells[(row_name, TOTAL_LABEL)]] for row_name in row_names]
+        rows.append([TOTAL_LABEL, sum(cells.values())])
+        return SummaryTable(f"{measure_title}: {row_dim.title.lower()}", headers, rows), None
+
+    column_names = _sorted_labels({column_name for _, column_name in cells})
+    headers = [f"{row_dim.title} / {column_dim.title}"] + column_names + [TOTAL_LABEL]
+    rows = []
+    column_totals = [0] * len(column_names)
+    for row_name in row_names:
+        values = [cells.get((row_name, column_name), 0) for column_name in column_names]
+        column_totals = [total + value for total, value in zip(column_totals, values)]
+        rows.append([row_name] + values + [sum(values)])
+    rows.append([TOTAL_LABEL] + column_totals + [sum(column_totals)])
+    title = f"{measure_title}: {row_dim.title.lower()} × {column_dim.title.lower()}"
+    return SummaryTable(title, headers, rows), None
+
+
+def generate_summary_report(db_connection, file_path, row_dimension, column_dimension=None, measure="count",
+                            filters=None, filter_descriptions=()):
+    """
+    Сохраняет сводный отчет (load_summary) в file_path: .csv (разделитель ';', как при экспорте),
+    .pdf или .docx (по расширению).
+    Возвращает кортеж (success, message).
+    """
+    summary, error = load_summary(db_connection, row_dimension, column_dimension, measure, filters)
+    if error:
+        return False, error
+
+    try:
+        if file_path.lower().endswith(".csv"):
+            with open(file_path, mode='w', encoding='utf-8-sig', newline='') as csv_file:
+                writer = csv.writer(csv_file, delimiter=';')
+                writer.writerow(summary.headers)
+                writer.writerows(summary.rows)
+        else:
+            if file_path.lower().endswith(".pdf"):
+                from src.utils.pdf_writer import write_pdf_table as write_table
+            else:
+                try:
+                    from src.utils.docx_writer import write_docx_table as write_table
+                except ImportError:
+                    return False, "Библиотека 'python-docx' не установлена. Пожалуйста, установите ее (`pip install python-docx`)."
+            paragraphs = [f"Сформирован: {QDate.currentDate().toString(Qt.ISODate)}"]
+            paragraphs.append("Примененные фильтры: " + ("; ".join(filter_descriptions) if filter_descriptions else "нет"))
+            write_table(file_path, summary.title, paragraphs, summary.headers, summary.rows)
+    except Exception as e:
+        return False, f"Произошла ошибка при сохранении сводного отчета:\n{e}"
+    return True, f"Сводный отчет сохранен в:\n{file_path}\nСтрок: {len(summary.rows) - 1}"
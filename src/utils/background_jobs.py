@@ -0,0 +1,126 @@
+# File: src/utils/background_jobs.py
+# Выполнение длительных операций с базой данных (импорт/экспорт CSV и т.п.) в отдельном потоке.
+import time
+import itertools
+
+from PyQt5.QtWidgets import QProgressDialog
+from PyQt5.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+
+from database import connect_db, close_db, remove_connection
+
+# Как часто (в секундах) фоновая задача сообщает о прогрессе в GUI
+PROGRESS_EMIT_INTERVAL = 0.2
+
+_connection_counter = itertools.count(1)
+# Ссылки на выполняющиеся задачи, чтобы их не удалил сборщик мусора
+_running_jobs = set()
+
+
+class DatabaseJob(QObject):
+    """
+    Задача, выполняемая в рабочем потоке со своим соединением с базой данных.
+    job_function(db, progress_callback) должна вернуть кортеж (success, message);
+    progress_callback(обработано_строк) возвращает False после запроса отмены.
+    """
+    progress = pyqtSignal(int, float) # Обработано строк, строк в секунду
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, db_name, job_function):
+        super().__init__()
+        self.db_name = db_name
+        self.job_function = job_function
+        self._cancel_requested = False
+        self._started_at = 0.0
+        self._last_emit = 0.0
+
+    def cancel(self):
+        # Флаг читается рабочим потоком между пакетами строк
+        self._cancel_requested = True
+
+    def _report_progress(self, processed):
+        now = time.monotonic()
+        if now - self._last_emit >= PROGRESS_EMIT_INTERVAL:
+            self._last_emit = now
+            elapsed = now - self._started_at
+            self.progress.emit(processed, processed / elapsed if elapsed > 0 else 0.0)
+        return not self._cancel_requested
+
+    @pyqtSlot()
+    def run(self):
+        self._started_at = time.monotonic()
+        connection_name = f"background_job_{next(_connection_counter)}"
+        db = connect_db(self.db_name, connection_name=connection_name)
+        if db is None:
+            remove_connection(connection_name)
+            self.finished.emit(False, f"Ошибка: Не удалось открыть базу данных {self.db_name} в фоновом потоке.")
+            return
+
+        try:
+            success, message = self.job_function(db, self._report_progress)
+        except Exception as e:
+            success, message = False, f"Произошла ошибка при выполнении фоновой операции: {e}"
+        finally:
+            close_db(db)
+            db = None # Соединение можно удалить только после освобождения всех ссылок
+            remove_connection(connection_name)
+
+        self.finished.emit(success, message)
+
+
+class BackgroundJobRunner(QObject):
+    """Запускает DatabaseJob в QThread и показывает окно прогресса с кнопкой отмены."""
+
+    def __init__(self, parent_widget, title, db_connection, job_function, on_finished):
+        super().__init__()
+        self.on_finished = on_finished
+
+        self.progress_dialog = QProgressDialog(f"{title}...", "Отмена", 0, 0, parent_widget)
+        self.progress_dialog.setWindowTitle(title)
+        self.progress_dialog.setWindowModality(Qt.WindowModal)
+        self.progress_dialog.setMinimumDuration(0)
+        self.progress_dialog.setAutoClose(False)
+        self.progress_dialog.setAutoReset(False)
+
+        self.thread = QThread()
+        self.job = DatabaseJob(db_connection.databaseName(), job_function)
+        self.job.moveToThread(self.thread)
+
+        self.thread.started.connect(self.job.run)
+        self.job.progress.connect(self._on_progress)
+        self.job.finished.connect(self._on_finished)
+        self.progress_dialog.canceled.connect(self._on_cancel)
+
+    def start(self):
+        _running_jobs.add(self)
+        self.progress_dialog.show()
+        self.thread.start()
+
+    @pyqtSlot(int, float)
+    def _on_progress(self, processed, rate):
+        self.progress_dialog.setLabelText(f"Обработано строк: {processed} ({rate:.0f} строк/с)")
+
+    @pyqtSlot()
+    def _on_cancel(self):
+        self.progress_dialog.setLabelText("Отмена операции, откат изменений...")
+        self.job.cancel()
+
+    @pyqtSlot(bool, str)
+    def _on_finished(self, success, message):
+        self.thread.quit()
+        self.thread.wait()
+        # closeEvent диалога испускает canceled - задача уже завершена, отмена не нужна
+        self.progress_dialog.canceled.disconnect(self._on_cancel)
+        self.progress_dialog.close()
+        _running_jobs.discard(self)
+        if self.on_finished is not None:
+            self.on_finished(success, message)
+
+
+def run_database_job(parent_widget, title, db_connection, job_function, on_finished):
+    """
+    Выполняет job_function(db, progress_callback) в фоновом потоке с отдельным соединением.
+    По завершении on_finished(success, message) вызывается в потоке GUI.
+    """
+    runner = BackgroundJobRunner(parent_widget, title, db_connection, job_function, on_finished)
+    runner.start()
+    return runner
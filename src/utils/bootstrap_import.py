@@ -0,0 +1,194 @@
+# File: src/utils/bootstrap_import.py
+# Первичная загрузка базы из каталога выгрузок (public/import): справочники, сотрудники,
+# заметки и инвентаризация импортируются одной транзакцией в порядке зависимостей внешних
+# ключей (database.sort_tables_by_dependencies). Индексы и полнотекстовый индекс на время
+# загрузки удаляются и строятся один раз после нее.
+import os
+from collections import namedtuple
+
+from PyQt5.QtSql import QSqlQuery
+
+from database import (get_table_info, get_id_column_digits, sort_tables_by_dependencies, mark_tables_changed,
+                      drop_table_indexes, create_table_indexes, inventory_fts_available, drop_inventory_fts_triggers,
+                      create_inventory_fts_triggers, rebuild_inventory_fts)
+from src.utils.csv_handler import DEFAULT_BATCH_SIZE, CANCELLED_MESSAGE, _exec_batch
+from src.utils.parallel_csv import PARALLEL_MIN_FILE_SIZE, default_worker_count, parse_csv_files
+from src.utils.multi_table_import import import_multi_table_csv, UNITS_INVENTORY_IMPORT, MAX_REPORTED_ERRORS
+
+DEFAULT_IMPORT_DIR = os.path.join("public", "import")
+
+BootstrapFile = namedtuple("BootstrapFile", ["file_name", "table_name", "column_names", "column_digits", "spec"],
+                           defaults=(None, None, None))
+BootstrapFile.__doc__ = """Файл каталога первичной загрузки.
+column_names - столбцы table_name в порядке столбцов файла (None - все столбцы схемы; заголовки
+выгрузок не всегда совпадают со схемой), column_digits - как в import_data_from_csv
+(None - по схеме, get_id_column_digits).
+Файл с данными нескольких таблиц описывается spec (ImportSpec из multi_table_import)."""
+
+BOOTSTRAP_FILES = [
+    BootstrapFile("Category.csv", "Category"),
+    # В заголовке выгрузки первый столбец ошибочно назван id_subcategory, фактически это категория
+    BootstrapFile("Subcategory.csv", "Subcategory", ["id_category", "id_subcategory", "subcategory"]),
+    BootstrapFile("UnitType.csv", "Unit_type"),
+    BootstrapFile("OrderStatus.csv", "Order_status"),
+    BootstrapFile("Department.csv", "Departments"),
+    BootstrapFile("GroupDC.csv", "GroupDC"),
+    BootstrapFile("Users.csv", "Employee"),
+    BootstrapFile("Note.csv", "Note"),
+    BootstrapFile("UnitsInventory.csv", "Units_inventory", spec=UNITS_INVENTORY_IMPORT),
+]
+
+
+def _file_tables(bootstrap_file):
+    if bootstrap_file.spec is not None:
+        return [target.table_name for target in bootstrap_file.spec.targets]
+    return [bootstrap_file.table_name]
+
+
+def _load_existing_key_tuples(db_connection, table_name, key_columns):
+    keys = set()
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    if query.exec_(f"SELECT {', '.join(key_columns)} FROM {table_name}"):
+        while query.next():
+            keys.add(tuple(str(query.value(i)) for i in range(len(key_columns))))
+    else:
+        print(f"Ошибка при загрузке ключей {table_name}({', '.join(key_columns)}):", query.lastError().text())
+    return keys
+
+
+def _insert_block(db_connection, table_info, column_names, block, batch_size):
+    """
+    Вставляет разобранный файл (ParsedBlock), пропуская строки, уникальный ключ которых уже есть
+    в базе или выше в файле. Пустые значения записываются как NULL.
+    Возвращает (добавлено, пропущено, текст ошибки или None).
+    """
+    key_positions = [[column_names.index(col) for col in key] for key in table_info.unique_keys
+                     if all(col in column_names for col in key)]
+    known_keys = [_load_existing_key_tuples(db_connection, table_info.name, [column_names[p] for p in positions])
+                  for positions in key_positions]
+
+    keep = []
+    for row_index in range(len(block.row_numbers)):
+        row_keys = [tuple(block.columns[p][row_index] for p in positions) for positions in key_positions]
+        if any(all(key) and key in known for key, known in zip(row_keys, known_keys)):
+            continue
+        for key, known in zip(row_keys, known_keys):
+            if all(key):
+                known.add(key)
+        keep.append(row_index)
+    columns = [[column[i] or None for i in keep] for column in block.columns]
+
+    query = QSqlQuery(db_connection)
+    query.prepare(f"INSERT INTO {table_info.name} ({', '.join(column_names)}) VALUES ({', '.join(['?'] * len(column_names))})")
+    for start in range(0, len(keep), batch_size):
+        end = min(start + batch_size, len(keep))
+        if not _exec_batch(query, [column[start:end] for column in columns]):
+            return 0, 0, (f"Ошибка при вставке в таблицу '{table_info.name}' из строк "
+                          f"{block.row_numbers[keep[start]]}-{block.row_numbers[keep[end - 1]]}: {query.lastError().text()}")
+    return len(keep), len(block.row_numbers) - len(keep), None
+
+
+def bootstrap_import(db_connection, import_dir=DEFAULT_IMPORT_DIR, files=None, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None, workers=None):
+    """
+    Загружает все файлы каталога import_dir, описанные в files (по умолчанию BOOTSTRAP_FILES),
+    в одной транзакции: при любой ошибке база остается без изменений. Таблицы заполняются
+    в порядке зависимостей внешних ключей; независимые файлы разбираются заранее, большие -
+    одновременно в нескольких процессах (workers - как в open_parsed_csv). Индексы из
+    DATABASE_INDEXES и триггеры полнотекстового поиска снимаются на время загрузки и
+    создаются заново после нее. Отсутствующие файлы пропускаются.
+    progress_callback(обработано_строк) - как в import_data_from_csv.
+    Возвращает кортеж (success, message).
+    """
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
+
+    files = BOOTSTRAP_FILES if files is None else files
+    present_files = [f for f in files if os.path.isfile(os.path.join(import_dir, f.file_name))]
+    missing_files = [f.file_name for f in files if f not in present_files]
+    if not present_files:
+        return False, f"Ошибка: В каталоге '{import_dir}' нет файлов для загрузки."
+
+    table_order = sort_tables_by_dependencies([table for f in present_files for table in _file_tables(f)])
+    present_files.sort(key=lambda f: table_order.index(f.table_name))
+    batch_size = max(1, int(batch_size or 1))
+
+    # Разбор всех простых файлов до начала транзакции
+    simple_files = [f for f in present_files if f.spec is None]
+    tasks = []
+    for f in simple_files:
+        table_info = get_table_info(f.table_name)
+        if table_info is None:
+            return False, f"Ошибка: Таблица '{f.table_name}' не найдена в схеме базы данных."
+        tasks.append((os.path.join(import_dir, f.file_name), f.column_names or table_info.column_names,
+                      get_id_column_digits(f.table_name) if f.column_digits is None else f.column_digits))
+    if workers is None and default_worker_count() > 1 and \
+            sum(os.path.getsize(task[0]) for task in tasks) >= PARALLEL_MIN_FILE_SIZE:
+        workers = default_worker_count()
+    try:
+        parsed_files = dict(zip((f.file_name for f in simple_files), parse_csv_files(tasks, workers)))
+    except Exception as e:
+        return False, f"Произошла ошибка при чтении файлов: {e}"
+
+    summary_lines = [f"Первичная загрузка из каталога '{import_dir}' завершена."]
+    errors = []
+    processed_count = 0
+    fts_enabled = "Units_inventory" in table_order and inventory_fts_available(db_connection)
+
+    def fail(message):
+        db_connection.rollback()
+        return False, message
+
+    try:
+        db_connection.transaction()
+        # Индексы строятся один раз после загрузки, а не поддерживаются на каждую вставку
+        if fts_enabled and not drop_inventory_fts_triggers(db_connection):
+            return fail("Ошибка при подготовке базы данных к загрузке (триггеры полнотекстового поиска).")
+        if not all(drop_table_indexes(db_connection, table) for table in table_order):
+            return fail("Ошибка при подготовке базы данных к загрузке (удаление индексов).")
+
+        for f in present_files:
+            file_path = os.path.join(import_dir, f.file_name)
+            if f.spec is not None:
+                # Триггеры и полнотекстовый индекс обслуживаются здесь, а не в описании импорта
+                spec = f.spec._replace(before_import=None, after_import=None)
+                offset = processed_count
+                success, message = import_multi_table_csv(
+                    db_connection, file_path, spec, batch_size,
+                    progress_callback=None if progress_callback is None else lambda count: progress_callback(offset + count),
+                    use_transaction=False)
+                if not success:
+                    return fail(f"{f.file_name}: {message}")
+                summary_lines.append(f"{f.file_name}:\n{message}")
+                continue
+
+            block = parsed_files[f.file_name]
+            column_names = tasks[simple_files.index(f)][1]
+            errors.extend(f"{f.file_name}, строка {row_num}: {error}" for row_num, error in block.errors)
+            inserted, skipped, error = _insert_block(db_connection, get_table_info(f.table_name), column_names, block, batch_size)
+            if error:
+                return fail(f"{f.file_name}: {error}")
+            summary_lines.append(f"{f.file_name} -> {f.table_name}: добавлено {inserted}, пропущено (существующие) {skipped}")
+            processed_count += block.last_row - 1
+            if progress_callback is not None and progress_callback(processed_count) is False:
+                return fail(CANCELLED_MESSAGE)
+
+        if not all(create_table_indexes(db_connection, table) for table in table_order):
+            return fail("Ошибка при создании индексов после загрузки.")
+        if fts_enabled and not (create_inventory_fts_triggers(db_connection) and rebuild_inventory_fts(db_connection)):
+            return fail("Ошибка при перестроении полнотекстового индекса после загрузки.")
+
+        if not db_connection.commit():
+            return fail(f"Ошибка при завершении транзакции: {db_connection.lastError().text()}")
+        mark_tables_changed(*table_order)
+    except Exception as e:
+        return fail(f"Произошла ошибка при загрузке данных: {e}")
+
+    if missing_files:
+        summary_lines.append(f"Нет в каталоге (пропущены): {', '.join(missing_files)}")
+    if errors:
+        summary_lines.append(f"Ошибки ({len(errors)}):")
+        summary_lines += errors[:MAX_REPORTED_ERRORS]
+        if len(errors) > MAX_REPORTED_ERRORS:
+            summary_lines.append(f"... и еще {len(errors) - MAX_REPORTED_ERRORS}")
+    return True, "\n".join(summary_lines)
@@ -1,16 +1,299 @@
 # extension/csv_handler.py
+import os
 import csv
+import gzip
+import lzma
+import itertools
+from collections import namedtuple
+from contextlib import contextmanager
 from PyQt5.QtSql import QSqlDatabase, QSqlQuery, QSqlError
 from PyQt5.QtCore import QVariant, QDate, QTime, QDateTime # Добавляем типы данных Qt
 
+from database import mark_tables_changed, get_column_names, get_table_info
+from src.utils.lookup_cache import LOOKUP_TABLES, SUBCATEGORY_TABLE, get_lookup, get_subcategories
+from src.utils.parallel_csv import (PARALLEL_MIN_FILE_SIZE, ParsedBlock, normalize_csv_row, parse_rows_to_block, split_csv_file,
+                                    read_csv_header, default_worker_count, iter_parsed_blocks_parallel)
+
+# Размер пакета строк, передаваемого в QSqlQuery.execBatch за один вызов
+DEFAULT_BATCH_SIZE = 1000
+# Через сколько строк вызывается progress_callback
+PROGRESS_INTERVAL = 1000
+
+# Буфер записи файла экспорта (строки пишутся порциями по PROGRESS_INTERVAL)
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# Фильтр диалога сохранения: сжатие выбирается по расширению файла
+EXPORT_FILE_FILTER = "CSV файлы (*.csv);;CSV, сжатый gzip (*.csv.gz);;CSV, сжатый xz (*.csv.xz);;Все файлы (*)"
+
+CANCELLED_MESSAGE = "Операция отменена пользователем. Изменения не сохранены."
+
+
+def _key_columns(unique_column):
+    """Столбцы ключа уникальности: имя столбца или последовательность имен (составной ключ)."""
+    if not unique_column:
+        return ()
+    return (unique_column,) if isinstance(unique_column, str) else tuple(unique_column)
+
+
+def load_existing_keys(db_connection, table_name, column_name):
+    """
+    Загружает все непустые значения столбца в множество (для проверки уникальности без запроса на строку).
+    Для составного ключа (column_name - последовательность столбцов) значения - кортежи строк.
+    """
+    columns = _key_columns(column_name)
+    keys = set()
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    not_null = " AND ".join(f"{col} IS NOT NULL" for col in columns)
+    if query.exec_(f"SELECT {', '.join(columns)} FROM {table_name} WHERE {not_null}"):
+        while query.next():
+            if len(columns) == 1:
+                keys.add(str(query.value(0)))
+            else:
+                keys.add(tuple(str(query.value(i)) for i in range(len(columns))))
+    else:
+        print(f"Ошибка при загрузке существующих значений {table_name}({', '.join(columns)}):", query.lastError().text())
+    return keys
+
+
+def _exec_batch(query, column_buffers):
+    """Привязывает списки значений по столбцам и выполняет пакетную вставку."""
+    for values in column_buffers:
+        query.addBindValue(values)
+    return query.execBatch()
+
+
+# Столбцы-ссылки, которые в файле можно указывать наименованием вместо ID:
+# столбец -> (справочник, столбец ID, столбцы наименований; первый заполняется при добавлении)
+NAME_REFERENCES = {
+    "id_department": ("Departments", "id_department", ("department_fullname", "department_shortname")),
+    "id_category": ("Category", "id_category", ("category",)),
+    "id_order_status": ("Order_status", "id_order_status", ("order_status",)),
+    "id_unit_type": ("Unit_type", "id_unit_type", ("unit_type",)),
+}
+
+
+class NameResolver:
+    """
+    Замена наименований справочника на ID по словарю, загруженному одним запросом за импорт.
+    Значения из одних цифр считаются ID (дополняются нулями до digits или длины ключа справочника)
+    и принимаются, только если такой ID есть в справочнике; наименования сравниваются без учета
+    регистра. При create_missing ненайденные наименования добавляются в справочник одним пакетом
+    на блок строк.
+    """
+
+    def __init__(self, db_connection, column_name, digits=None, create_missing=False):
+        self.db = db_connection
+        self.column_name = column_name
+        self.ref_table, self.ref_key, self.name_columns = NAME_REFERENCES[column_name]
+        self.digits = digits
+        self.create_missing = create_missing
+        self.created_count = 0
+        ref_info = get_table_info(self.ref_table)
+        self.autoincrement = ref_info.autoincrement_column == self.ref_key
+        self.id_length = digits or ref_info.max_length(self.ref_key)
+        self.ids = {}
+        self.known_ids = set() # Все ID справочника в строковом виде
+        self._load()
+
+    def _load(self):
+        query = QSqlQuery(self.db)
+        query.setForwardOnly(True)
+        if not query.exec_(f"SELECT {self.ref_key}, {', '.join(self.name_columns)} FROM {self.ref_table}"):
+            raise RuntimeError(f"не удалось загрузить справочник {self.ref_table}: {query.lastError().text()}")
+        self.ids = {}
+        self.known_ids = set()
+        while query.next():
+            self.known_ids.add(str(query.value(0)))
+            for i in range(1, len(self.name_columns) + 1):
+                name = query.value(i)
+                if name:
+                    self.ids.setdefault(str(name).strip().casefold(), query.value(0))
+
+    def _next_ids(self, count):
+        # ID справочников без автоинкремента - числа, дополненные нулями (01, 02, ...)
+        used = [int(item_id) for item_id in self.known_ids if item_id.isdigit()]
+        first = max(used, default=0) + 1
+        new_ids = [str(number).zfill(self.id_length or 0) for number in range(first, first + count)]
+        if self.id_length and len(new_ids[-1]) > self.id_length:
+            raise RuntimeError(f"в справочнике {self.ref_table} нет свободных ID для {count} новых записей")
+        return new_ids
+
+    def _create(self, names):
+        """Добавляет наименования в справочник одним пакетом (в текущей транзакции импорта)."""
+        query = QSqlQuery(self.db)
+        if self.autoincrement:
+            query.prepare(f"INSERT INTO {self.ref_table} ({self.name_columns[0]}) VALUES (?)")
+            success = _exec_batch(query, [names])
+        else:
+            query.prepare(f"INSERT INTO {self.ref_table} ({self.ref_key}, {self.name_columns[0]}) VALUES (?, ?)")
+            success = _exec_batch(query, [self._next_ids(len(names)), names])
+        if not success:
+            raise RuntimeError(f"не удалось добавить записи в справочник {self.ref_table}: {query.lastError().text()}")
+        self.created_count += len(names)
+        self._load() # Новые ID (в том числе автоинкрементные) одним запросом
+
+    def lookup(self, value):
+        """ID для значения файла (ID или наименование) или None, если такого ID или наименования нет."""
+        if value.isdigit():
+            item_id = str(int(value)).zfill(self.id_length or 0)
+            return item_id if item_id in self.known_ids else None
+        return self.ids.get(value.casefold())
+
+    def resolve_values(self, values):
+        """Заменяет значения столбца на ID. Возвращает (значения, {позиция: текст ошибки})."""
+        if self.create_missing:
+            missing = {}
+            for value in values:
+                if value and not value.isdigit() and value.casefold() not in self.ids:
+                    missing.setdefault(value.casefold(), value)
+            if missing:
+                self._create(list(missing.values()))
+        resolved = []
+        errors = {}
+        for position, value in enumerate(values):
+            item_id = self.lookup(value) if value else value
+            if item_id is None:
+                errors[position] = f"столбец '{self.column_name}': '{value}' не найдено в {self.ref_table}"
+            resolved.append(item_id)
+        return resolved, errors
+
+
+def create_name_resolvers(db_connection, table_name, column_names, column_digits, create_missing=False):
+    """
+    Создает NameResolver для столбцов-ссылок файла (NAME_REFERENCES; собственный ключ таблицы не
+    заменяется). Возвращает ({позиция столбца: NameResolver}, column_digits для разбора без этих столбцов).
+    """
+    resolvers = {index: NameResolver(db_connection, col, column_digits.get(col), create_missing)
+                 for index, col in enumerate(column_names)
+                 if col in NAME_REFERENCES and NAME_REFERENCES[col][0] != table_name}
+    resolved_columns = {column_names[index] for index in resolvers}
+    return resolvers, {col: digits for col, digits in column_digits.items() if col not in resolved_columns}
+
+
+def _resolve_block_names(block, resolvers):
+    """Заменяет наименования на ID в ParsedBlock; строки с ненайденными наименованиями убираются."""
+    if not resolvers:
+        return block, []
+    columns = list(block.columns)
+    row_errors = {}
+    for index, resolver in resolvers.items():
+        columns[index], errors = resolver.resolve_values(columns[index])
+        for position, error in errors.items():
+            row_errors.setdefault(position, []).append(error)
+    block = block._replace(columns=columns)
+    if not row_errors:
+        return block, []
+    errors = [(block.row_numbers[position], "; ".join(texts) + ". Строка пропущена.") for position, texts in sorted(row_errors.items())]
+    return _keep_block_rows(block, [i for i in range(len(block.row_numbers)) if i not in row_errors]), errors
+
+
+def _created_lookups_summary(resolvers):
+    created = [f"{r.ref_table}: {r.created_count}" for r in resolvers.values() if r.created_count]
+    return f"\nДобавлено в справочники: {', '.join(created)}" if created else ""
+
+
+def _keep_block_rows(block, keep):
+    """ParsedBlock только со строками на позициях keep."""
+    return block._replace(row_numbers=[block.row_numbers[i] for i in keep],
+                          columns=[[column[i] for i in keep] for column in block.columns])
+
+
+def _parse_csv_blocks(reader, column_names, column_digits, block_size):
+    """Последовательный разбор в текущем потоке блоками по block_size строк (ParsedBlock)."""
+    first_row_num = 2 # 1 - заголовок
+    while True:
+        rows = list(itertools.islice(reader, block_size))
+        if not rows:
+            return
+        yield parse_rows_to_block(rows, first_row_num, column_names, column_digits)
+        first_row_num += len(rows)
+
+
+@contextmanager
+def open_parsed_csv(file_path, column_names, column_digits, workers=None, block_size=PROGRESS_INTERVAL):
+    """
+    Открывает CSV и возвращает (заголовок или None, итератор ParsedBlock).
+    workers=None - файлы от PARALLEL_MIN_FILE_SIZE разбираются в нескольких процессах, если есть
+    свободные ядра; workers=1 - всегда в текущем потоке; workers>1 - параллельно указанным числом процессов.
+    """
+    if workers is None and default_worker_count() > 1 and os.path.getsize(file_path) >= PARALLEL_MIN_FILE_SIZE:
+        workers = default_worker_count()
+    if workers is not None and workers > 1:
+        header_bytes, chunks = split_csv_file(file_path)
+        parsed_blocks = iter_parsed_blocks_parallel(file_path, chunks, column_names, column_digits, workers)
+        try:
+            yield (read_csv_header(header_bytes) if header_bytes else None), parsed_blocks
+        finally:
+            parsed_blocks.close() # Завершает процессы, если чтение прервано
+    else:
+        with open(file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=';')
+            yield next(reader, None), _parse_csv_blocks(reader, column_names, column_digits, block_size)
+
+
+def _drop_existing_keys(block, key_indexes, existing_keys):
+    """
+    Убирает из блока строки, значение ключа (столбцы key_indexes) которых уже есть в existing_keys
+    (в базе или выше в файле). Возвращает (блок, количество пропущенных строк); ключи с пустыми
+    значениями не проверяются.
+    """
+    if len(key_indexes) == 1:
+        values = block.columns[key_indexes[0]]
+    else:
+        values = [key if all(key) else None for key in zip(*(block.columns[index] for index in key_indexes))]
+    keep = []
+    for position, value in enumerate(values):
+        if value:
+            if value in existing_keys:
+                continue
+            existing_keys.add(value)
+        keep.append(position)
+    skipped = len(block.row_numbers) - len(keep)
+    if not skipped:
+        return block, 0
+    return _keep_block_rows(block, keep), skipped
+
+
 # Добавляем новый параметр column_digits
-def import_data_from_csv(db_connection, file_path, table_name, column_names=None, column_digits=None, unique_column=None):
+def import_data_from_csv(db_connection, file_path, table_name, column_names=None, column_digits=None, unique_column=None, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None, merge=False, workers=None, dry_run=False, resolve_names=False, create_missing=False):
+    """
+    Импортирует строки CSV (разделитель ';', первая строка - заголовок) в таблицу.
+    Строки накапливаются по столбцам и вставляются через execBatch пакетами по batch_size
+    внутри одной транзакции. Уникальность unique_column (столбец или кортеж столбцов составного
+    ключа) проверяется по множеству значений, загруженному один раз перед импортом.
+    progress_callback(обработано_строк) вызывается после каждого разобранного блока строк;
+    если он возвращает False, транзакция откатывается и импорт прерывается.
+    Разбор и проверка строк больших файлов выполняются в нескольких процессах (см. open_parsed_csv,
+    параметр workers), запись в базу - пакетами в текущем потоке; номера строк в ошибках - исходные.
+    При merge=True существующие записи обновляются (см. merge_data_from_csv).
+    При dry_run=True база не изменяется: файл только проверяется (validate_csv_file),
+    полный список ошибок сохраняется рядом с файлом (validation_report_path).
+    При resolve_names=True столбцы-ссылки из NAME_REFERENCES можно указывать наименованием
+    (см. NameResolver); create_missing=True добавляет ненайденные наименования в справочники.
+    """
+    if dry_run:
+        success, message, _ = validate_csv_file(db_connection, file_path, table_name, column_names, column_digits,
+                                                unique_column, progress_callback, report_path=validation_report_path(file_path),
+                                                resolve_names=resolve_names, create_missing=create_missing)
+        return success, message
+    if merge:
+        return merge_data_from_csv(db_connection, file_path, table_name, column_names, column_digits,
+                                   key_column=unique_column, batch_size=batch_size, progress_callback=progress_callback,
+                                   resolve_names=resolve_names, create_missing=create_missing)
     if db_connection is None or not db_connection.isOpen():
         return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
 
     imported_count = 0
     skipped_count = 0
     errors = []
+    in_transaction = False
+    batch_size = max(1, int(batch_size or 1))
+
+    # По умолчанию импортируются все столбцы таблицы в порядке схемы
+    if column_names is None:
+        column_names = get_column_names(table_name)
+    if not column_names:
+        return False, f"Ошибка: Таблица '{table_name}' не найдена в схеме базы данных."
 
     # Убеждаемся, что column_digits является словарем, если передан
     if column_digits is None:
@@ -20,101 +303,76 @@ def import_data_from_csv(db_connection, file_path, table_name, column_names=None
         column_digits = {} # Сбрасываем, чтобы избежать ошибок
 
     try:
-        with open(file_path, mode='r', encoding='utf-8-sig') as csvfile:
-            reader = csv.reader(csvfile, delimiter=';')
-
-            try:
-                header = next(reader)
-                print(f"Заголовок CSV для {table_name}: {header}")
-            except StopIteration:
+        # Справочники для замены наименований загружаются один раз; разбор идет без дополнения нулями этих столбцов
+        resolvers, parse_digits = create_name_resolvers(db_connection, table_name, column_names, column_digits, create_missing) \
+            if resolve_names else ({}, column_digits)
+        with open_parsed_csv(file_path, column_names, parse_digits, workers) as (header, parsed_blocks):
+            if header is None:
                  return False, "Ошибка: CSV файл пуст."
+            print(f"Заголовок CSV для {table_name}: {header}")
+
+            # Существующие значения уникального столбца загружаются один раз
+            unique_col_indexes = []
+            existing_keys = set()
+            key_columns = _key_columns(unique_column)
+            if key_columns and all(col in column_names for col in key_columns):
+                 unique_col_indexes = [column_names.index(col) for col in key_columns]
+                 existing_keys = load_existing_keys(db_connection, table_name, key_columns)
 
             db_connection.transaction()
+            in_transaction = True
             placeholders = ', '.join(['?'] * len(column_names))
             insert_sql = f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES ({placeholders})"
             query = QSqlQuery(db_connection)
             query.prepare(insert_sql)
 
-            # Подготовленный запрос для проверки уникальности, если unique_column указан
-            check_query = None
-            unique_col_index = -1
-            if unique_column and unique_column in column_names:
-                 unique_col_index = column_names.index(unique_column)
-                 check_sql = f"SELECT COUNT(*) FROM {table_name} WHERE {unique_column} = ?"
-                 check_query = QSqlQuery(db_connection)
-                 check_query.prepare(check_sql)
+            # Буферы значений по столбцам для execBatch и номера строк в них
+            column_buffers = [[] for _ in column_names]
+            buffer_rows = []
 
-            for row_num, row in enumerate(reader, start=2): # Начинаем с 2, т.к. 1 - заголовок
-                if not row or all(not cell.strip() for cell in row): # Пропускаем пустые строки
-                    continue
+            for block in parsed_blocks:
+                if progress_callback is not None and progress_callback(block.last_row - 1) is False:
+                    db_connection.rollback()
+                    return False, CANCELLED_MESSAGE
 
-                # Проверяем, что количество столбцов в строке соответствует ожидаемому
-                if len(row) != len(column_names):
-                    errors.append(f"Строка {row_num}: Неверное количество столбцов ({len(row)} вместо {len(column_names)}). Пропущена.")
-                    continue
+                errors.extend(f"Строка {row_num}: {error}" for row_num, error in block.errors)
+                block, resolve_errors = _resolve_block_names(block, resolvers)
+                errors.extend(f"Строка {row_num}: {error}" for row_num, error in resolve_errors)
 
-                processed_row_data = []
-                row_has_error = False
-
-                # --- Обработка и форматирование данных строки ---
-                for i, cell_value in enumerate(row):
-                    col_name = column_names[i]
-                    stripped_value = cell_value.strip()
-                    formatted_value = stripped_value # По умолчанию используем исходное значение
-
-                    # Проверяем, нужно ли форматировать этот столбец
-                    if col_name in column_digits:
-                        num_digits = column_digits[col_name]
-                        if stripped_value: # Форматируем только непустые значения
-                            try:
-                                # Пытаемся преобразовать в число и отформатировать
-                                int_value = int(stripped_value)
-                                formatted_value = str(int_value).zfill(num_digits)
-                            except ValueError:
-                                # Если не удалось преобразовать в число, это ошибка для этого столбца
-                                errors.append(f"Строка {row_num}, столбец '{col_name}': Значение '{stripped_value}' не является числом для форматирования. Строка пропущена.")
-                                row_has_error = True
-                                break # Пропускаем всю строку при ошибке форматирования
-
-                    processed_row_data.append(formatted_value)
-
-                if row_has_error:
-                    continue # Пропускаем строку, если была ошибка форматирования
-
-                # Проверка уникальности, если требуется
-                if check_query and unique_col_index != -1:
-                    # Используем уже обработанное (отформатированное) значение для проверки уникальности
-                    unique_value = processed_row_data[unique_col_index]
-                    if unique_value: # Проверяем только если значение не пустое
-                        check_query.addBindValue(unique_value)
-                        if check_query.exec_() and check_query.next() and check_query.value(0) > 0:
-                            skipped_count += 1
-                            # errors.append(f"Строка {row_num}: Запись с {unique_column} '{unique_value}' уже существует. Пропущена.")
-                            continue # Пропускаем, если запись уже есть
-                    # else:
-                         # Если unique_column пустой, можно решить, что делать: пропустить или вставить с NULL
-                         # Сейчас просто продолжаем, если unique_column пустой, и он не является PK NOT NULL
-
-
-                # Добавляем обработанные данные строки в подготовленный запрос
-                for value in processed_row_data:
-                    query.addBindValue(value) # Добавляем каждое обработанное значение
-                
-                print("Обработанные значения:", ', '.join(str(v) for v in processed_row_data))
-                
-                # Выполняем запрос
-                if query.exec_():
-                    imported_count += 1
-                else:
-                    errors.append(f"Строка {row_num}: Ошибка базы данных при вставке ('{db_connection.lastError().text()}'). Пропущена.")
-                    # Если произошла ошибка вставки, можно откатить транзакцию и прервать импорт
-                    db_connection.rollback()
-                    return False, f"Ошибка при вставке данных из строки {row_num}: {db_connection.lastError().text()}"
+                # Проверка уникальности (значение уже отформатировано); дубликаты внутри файла тоже пропускаются
+                if unique_col_indexes:
+                    block, skipped = _drop_existing_keys(block, unique_col_indexes, existing_keys)
+                    skipped_count += skipped
+
+                for buffer, values in zip(column_buffers, block.columns):
+                    buffer.extend(values)
+                buffer_rows.extend(block.row_numbers)
 
+                # Полные пакеты вставляются через execBatch, остаток ждет следующего блока
+                batch_start = 0
+                while len(buffer_rows) - batch_start >= batch_size:
+                    batch_end = batch_start + batch_size
+                    if not _exec_batch(query, [buffer[batch_start:batch_end] for buffer in column_buffers]):
+                        db_connection.rollback()
+                        return False, f"Ошибка при вставке данных из строк {buffer_rows[batch_start]}-{buffer_rows[batch_end - 1]}: {query.lastError().text()}"
+                    imported_count += batch_size
+                    batch_start = batch_end
+                if batch_start:
+                    column_buffers = [buffer[batch_start:] for buffer in column_buffers]
+                    buffer_rows = buffer_rows[batch_start:]
+
+            # Вставляем оставшийся неполный пакет
+            if buffer_rows:
+                if not _exec_batch(query, column_buffers):
+                    db_connection.rollback()
+                    return False, f"Ошибка при вставке данных из строк {buffer_rows[0]}-{buffer_rows[-1]}: {query.lastError().text()}"
+                imported_count += len(buffer_rows)
 
             # Завершаем транзакцию
+            in_transaction = False
             if db_connection.commit():
                  print("Транзакция импорта завершена успешно.")
+                 mark_tables_changed(table_name, *(r.ref_table for r in resolvers.values() if r.created_count))
             else:
                  db_connection.rollback()
                  return False, f"Ошибка при завершении транзакции: {db_connection.lastError().text()}"
@@ -124,40 +382,482 @@ def import_data_from_csv(db_connection, file_path, table_name, column_names=None
         return False, f"Ошибка: Файл не найден по пути {file_path}"
     except Exception as e:
         # Откатываем транзакцию в случае любой другой ошибки
-        if db_connection.transaction(): # Проверяем, активна ли транзакция
+        if in_transaction:
              db_connection.rollback()
         return False, f"Произошла ошибка при чтении или обработке файла: {e}"
 
     summary = f"Импорт завершен для таблицы '{table_name}'.\nУспешно импортировано: {imported_count}\nПропущено (существующие ID): {skipped_count}"
+    summary += _created_lookups_summary(resolvers)
     if errors:
         summary += f"\nОшибки:\n" + "\n".join(errors)
 
     return True, summary
 
 
-def export_data_to_csv(db_connection, file_path, table_name, column_names):
+# --- Проверка файла без записи в базу ---
+
+ValidationIssue = namedtuple("ValidationIssue", ["row", "column", "reason"])
+ValidationIssue.__doc__ = """Ошибка в CSV-файле: номер строки (1 - заголовок), столбец (None - вся строка) и причина."""
+
+# Сколько ошибок проверки включается в текст сообщения (полный список - в отчете)
+MAX_REPORTED_ISSUES = 50
+
+
+def validation_report_path(file_path):
+    """Путь отчета об ошибках проверки рядом с проверяемым файлом."""
+    return f"{os.path.splitext(file_path)[0]}_errors.csv"
+
+
+def _is_integer(value):
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _load_reference_keys(db_connection, foreign_key):
+    """
+    Множество допустимых значений внешнего ключа (кортежи строк). Справочники берутся
+    из кэша lookup_cache, остальные таблицы читаются одним запросом.
+    """
+    ref_table, ref_columns = foreign_key.ref_table, tuple(foreign_key.ref_columns)
+    if ref_table == SUBCATEGORY_TABLE and ref_columns == ("id_category", "id_subcategory"):
+        return {(str(category_id), str(subcategory_id)) for category_id, subcategory_id in get_subcategories(db_connection).pair_to_name}
+    if ref_table in LOOKUP_TABLES and ref_columns == (LOOKUP_TABLES[ref_table][0],):
+        return {(str(item_id),) for item_id in get_lookup(db_connection, ref_table).id_to_name}
+    keys = set()
+    query = QSqlQuery(db_connection)
+    query.setForwardOnly(True)
+    if query.exec_(f"SELECT {', '.join(ref_columns)} FROM {ref_table}"):
+        while query.next():
+            keys.add(tuple(str(query.value(i)) for i in range(len(ref_columns))))
+    else:
+        print(f"Ошибка при загрузке значений {ref_table}({', '.join(ref_columns)}):", query.lastError().text())
+    return keys
+
+
+def write_validation_report(issues, report_path):
+    """Сохраняет список ValidationIssue в CSV (разделитель ';')."""
+    with open(report_path, mode='w', encoding='utf-8-sig', newline='') as report_file:
+        writer = csv.writer(report_file, delimiter=';')
+        writer.writerow(["Строка", "Столбец", "Ошибка"])
+        writer.writerows((issue.row, issue.column or '', issue.reason) for issue in issues)
+
+
+def validate_csv_file(db_connection, file_path, table_name, column_names=None, column_digits=None, unique_column=None, progress_callback=None, report_path=None, resolve_names=False, create_missing=False):
+    """
+    Проверяет CSV-файл за один проход, ничего не записывая в базу: количество столбцов,
+    числовой формат столбцов column_digits и целочисленных столбцов, длину значений по VARCHAR(n)
+    из схемы, наличие значений внешних ключей в связанных таблицах и повторы ключей
+    (unique_column и уникальные ключи схемы) внутри файла.
+    Возвращает кортеж (success, message, issues): success - ошибок нет, issues - список ValidationIssue.
+    Если указан report_path и ошибки найдены, полный список сохраняется туда (write_validation_report).
+    resolve_names/create_missing - как в import_data_from_csv (наименования проверяются, но не добавляются).
+    """
+    issues = []
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто.", issues
+
+    table_info = get_table_info(table_name)
+    if table_info is None:
+        return False, f"Ошибка: Таблица '{table_name}' не найдена в схеме базы данных.", issues
+    if column_names is None:
+        column_names = table_info.column_names
+    column_digits = column_digits if isinstance(column_digits, dict) else {}
+    missing_columns = [col for col in column_names if table_info.column(col) is None]
+    if missing_columns:
+        return False, f"Ошибка: Столбец '{missing_columns[0]}' отсутствует в таблице '{table_name}'.", issues
+    try:
+        resolvers, column_digits = create_name_resolvers(db_connection, table_name, column_names, column_digits) \
+            if resolve_names else ({}, column_digits)
+    except RuntimeError as e:
+        return False, f"Ошибка: {e}", issues
+
+    # Проверки по столбцам: (позиция, столбец, число цифр, максимальная длина, только целые числа);
+    # столбцы, заданные наименованиями, проверяются по справочнику
+    column_checks = []
+    for index, col in enumerate(column_names):
+        if index in resolvers:
+            continue
+        column_info = table_info.column(col)
+        column_checks.append((index, col, column_digits.get(col), column_info.max_length,
+                              column_info.sql_type == "INTEGER" and col not in column_digits))
+
+    # Внешние ключи, все столбцы которых есть в файле, и допустимые значения для них
+    foreign_keys = [(fk, [column_names.index(col) for col in fk.columns], _load_reference_keys(db_connection, fk))
+                    for fk in table_info.foreign_keys if all(col in column_names for col in fk.columns)]
+    # Ключи, повтор которых внутри файла - ошибка: {позиции столбцов: {значение: первая строка}}
+    key_sets = [tuple(key) for key in table_info.unique_keys if all(col in column_names for col in key)]
+    unique_key = _key_columns(unique_column)
+    if unique_key and all(col in column_names for col in unique_key) and unique_key not in key_sets:
+        key_sets.append(unique_key)
+    seen_keys = {tuple(column_names.index(col) for col in key): {} for key in key_sets}
+
+    checked_count = 0
+    try:
+        with open(file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=';')
+            if next(reader, None) is None:
+                return False, "Ошибка: CSV файл пуст.", issues
+
+            for row_num, row in enumerate(reader, start=2):
+                if progress_callback is not None and row_num % PROGRESS_INTERVAL == 0 and progress_callback(row_num - 1) is False:
+                    return False, CANCELLED_MESSAGE, issues
+                if not row or all(not cell.strip() for cell in row):
+                    continue
+                checked_count += 1
+                if len(row) != len(column_names):
+                    issues.append(ValidationIssue(row_num, None, f"Неверное количество столбцов ({len(row)} вместо {len(column_names)})"))
+                    continue
+
+                # Значения приводятся к виду, в котором их запишет импорт
+                values = [cell.strip() for cell in row]
+                bad_columns = set()
+                for index, col, digits, max_length, integer_only in column_checks:
+                    value = values[index]
+                    if not value:
+                        continue
+                    if digits:
+                        if not _is_integer(value):
+                            issues.append(ValidationIssue(row_num, col, f"Значение '{value}' не является числом"))
+                            bad_columns.add(index)
+                            continue
+                        value = values[index] = str(int(value)).zfill(digits)
+                    elif integer_only and not _is_integer(value):
+                        issues.append(ValidationIssue(row_num, col, f"Значение '{value}' не является целым числом"))
+                        bad_columns.add(index)
+                        continue
+                    if max_length is not None and len(value) > max_length:
+                        issues.append(ValidationIssue(row_num, col, f"Длина значения {len(value)} превышает допустимую ({max_length})"))
+                        bad_columns.add(index)
+                for index, resolver in resolvers.items():
+                    value = values[index]
+                    item_id = resolver.lookup(value) if value else value
+                    if item_id is None:
+                        if not create_missing:
+                            issues.append(ValidationIssue(row_num, resolver.column_name, f"Наименование '{value}' не найдено в {resolver.ref_table}"))
+                        bad_columns.add(index) # Новое наименование получит ID при импорте
+                    else:
+                        values[index] = str(item_id)
+
+                for fk, positions, reference_keys in foreign_keys:
+                    if bad_columns.intersection(positions):
+                        continue
+                    key = tuple(values[position] for position in positions)
+                    if key not in reference_keys:
+                        issues.append(ValidationIssue(row_num, ", ".join(fk.columns),
+                                                      f"Значение '{', '.join(key)}' не найдено в {fk.ref_table}({', '.join(fk.ref_columns)})"))
+
+                for positions, seen in seen_keys.items():
+                    key = tuple(values[position] for position in positions)
+                    if not all(key) or bad_columns.intersection(positions):
+                        continue # Пустой ключ (например, автоинкремент) не проверяется
+                    first_row = seen.setdefault(key, row_num)
+                    if first_row != row_num:
+                        issues.append(ValidationIssue(row_num, ", ".join(column_names[position] for position in positions),
+                                                      f"Значение '{', '.join(key)}' повторяет строку {first_row}"))
+
+        if issues and report_path:
+            write_validation_report(issues, report_path)
+
+    except FileNotFoundError:
+        return False, f"Ошибка: Файл не найден по пути {file_path}", issues
+    except Exception as e:
+        return False, f"Произошла ошибка при проверке файла: {e}", issues
+
+    summary = f"Проверка файла для таблицы '{table_name}' завершена (база данных не изменялась).\nПроверено строк: {checked_count}\nНайдено ошибок: {len(issues)}"
+    if issues:
+        summary += "\nОшибки:\n" + "\n".join(
+            f"Строка {issue.row}" + (f", столбец '{issue.column}'" if issue.column else "") + f": {issue.reason}"
+            for issue in issues[:MAX_REPORTED_ISSUES])
+        if len(issues) > MAX_REPORTED_ISSUES:
+            summary += f"\n... и еще {len(issues) - MAX_REPORTED_ISSUES}"
+        if report_path:
+            summary += f"\nПолный отчет: {report_path}"
+    return not issues, summary, issues
+
+
+def _stage_table_name(table_name):
+    return f"temp.import_stage_{table_name.lower()}"
+
+
+def _merge_changed_condition(target, source, data_columns):
+    """
+    Условие "строка изменилась" для слияния. Пустая строка и NULL считаются одним значением:
+    обычный импорт пишет пустые ячейки как '', а первичная загрузка и импорт инвентаризации - как NULL.
+    """
+    def values(alias):
+        return ", ".join(f"NULLIF({alias}.{col}, '')" for col in data_columns)
+    return f"({values(target)}) IS NOT ({values(source)})"
+
+
+def _count_merge_changes(db_connection, stage_table, table_name, key_column, data_columns, latest_rows_sql):
+    """Считает (новые, измененные, без изменений) строки промежуточной таблицы относительно целевой."""
+    changed = _merge_changed_condition("t", "s", data_columns) if data_columns else "0"
+    query = QSqlQuery(db_connection)
+    if not query.exec_(f"SELECT COUNT(*) - COUNT(t.{key_column}), "
+                       f"COALESCE(SUM(t.{key_column} IS NOT NULL AND {changed}), 0), "
+                       f"COALESCE(SUM(t.{key_column} IS NOT NULL AND NOT {changed}), 0) "
+                       f"FROM {stage_table} s LEFT JOIN {table_name} t ON t.{key_column} = s.{key_column} "
+                       f"WHERE s._row_num IN ({latest_rows_sql})") or not query.next():
+        return None
+    return int(query.value(0)), int(query.value(1)), int(query.value(2))
+
+
+def merge_data_from_csv(db_connection, file_path, table_name, column_names=None, column_digits=None, key_column=None, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None, resolve_names=False, create_missing=False):
+    """
+    Импорт в режиме слияния: новые записи добавляются, существующие (по key_column) обновляются.
+    Файл загружается во временную таблицу, затем изменения применяются одним запросом
+    INSERT ... ON CONFLICT (key_column) DO UPDATE, который обновляет только строки с отличающимся
+    содержимым - записи без изменений не переписываются. Если ключ встречается в файле
+    несколько раз, используется последняя строка. key_column должен быть уникальным по схеме
+    (PRIMARY KEY или UNIQUE); по умолчанию - первичный ключ таблицы.
+    resolve_names/create_missing - как в import_data_from_csv.
+    Возвращает кортеж (success, message) с количеством добавленных, обновленных и неизмененных записей.
+    """
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
+
+    table_info = get_table_info(table_name)
+    if table_info is None:
+        return False, f"Ошибка: Таблица '{table_name}' не найдена в схеме базы данных."
+    if column_names is None:
+        column_names = table_info.column_names
+    if key_column is None:
+        key_column = table_info.primary_key
+    if key_column not in column_names or (key_column,) not in table_info.unique_keys:
+        return False, f"Ошибка: Для обновления записей таблицы '{table_name}' нужен уникальный столбец, присутствующий в файле."
+    if not isinstance(column_digits, dict):
+        column_digits = {}
+
+    data_columns = [col for col in column_names if col != key_column]
+    stage_table = _stage_table_name(table_name)
+    # Столбцы промежуточной таблицы получают типы из схемы, чтобы сравнение шло с той же приведенной формой
+    stage_definitions = []
+    for col in column_names:
+        column_info = table_info.column(col)
+        stage_definitions.append(f"{col} {column_info.sql_type if column_info else ''}".strip())
+    stage_definitions.append("_row_num INTEGER")
+    # Для повторяющихся ключей берется последняя строка файла; строки без ключа добавляются как новые
+    latest_rows_sql = (f"SELECT MAX(_row_num) FROM {stage_table} WHERE {key_column} IS NOT NULL GROUP BY {key_column} "
+                       f"UNION ALL SELECT _row_num FROM {stage_table} WHERE {key_column} IS NULL")
+
+    errors = []
+    in_transaction = False
+    batch_size = max(1, int(batch_size or 1))
+    query = QSqlQuery(db_connection)
+
+    def stage_buffers(column_buffers):
+        """Заменяет наименования на ID и загружает строки буфера во временную таблицу; возвращает число строк."""
+        block, resolve_errors = _resolve_block_names(ParsedBlock(column_buffers[-1], column_buffers[:-1], [], None), resolvers)
+        errors.extend(f"Строка {row_num}: {error}" for row_num, error in resolve_errors)
+        if block.row_numbers and not _exec_batch(query, block.columns + [block.row_numbers]):
+            return None
+        return len(block.row_numbers)
+
+    try:
+        resolvers, parse_digits = create_name_resolvers(db_connection, table_name, column_names, column_digits, create_missing) \
+            if resolve_names else ({}, column_digits)
+        with open(file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=';')
+            try:
+                header = next(reader)
+                print(f"Заголовок CSV для {table_name} (слияние по {key_column}): {header}")
+            except StopIteration:
+                return False, "Ошибка: CSV файл пуст."
+
+            db_connection.transaction()
+            in_transaction = True
+            if not query.exec_(f"DROP TABLE IF EXISTS {stage_table}") or \
+               not query.exec_(f"CREATE TEMP TABLE {stage_table.split('.', 1)[1]} ({', '.join(stage_definitions)})"):
+                db_connection.rollback()
+                return False, f"Ошибка при создании временной таблицы: {query.lastError().text()}"
+
+            key_index = column_names.index(key_column)
+            query.prepare(f"INSERT INTO {stage_table} ({', '.join(column_names)}, _row_num) "
+                          f"VALUES ({', '.join(['?'] * (len(column_names) + 1))})")
+            column_buffers = [[] for _ in range(len(column_names) + 1)]
+            staged_count = 0
+
+            for row_num, row in enumerate(reader, start=2): # Начинаем с 2, т.к. 1 - заголовок
+                if progress_callback is not None and row_num % PROGRESS_INTERVAL == 0:
+                    if progress_callback(row_num - 1) is False:
+                        db_connection.rollback()
+                        return False, CANCELLED_MESSAGE
+
+                if not row or all(not cell.strip() for cell in row): # Пропускаем пустые строки
+                    continue
+
+                processed_row_data, error = normalize_csv_row(row, column_names, parse_digits)
+                if error:
+                    errors.append(f"Строка {row_num}: {error}")
+                    continue
+                if not processed_row_data[key_index]:
+                    processed_row_data[key_index] = None # Пустой ключ - новая запись
+
+                for buffer, value in zip(column_buffers, processed_row_data + [row_num]):
+                    buffer.append(value)
+                if len(column_buffers[0]) >= batch_size:
+                    staged = stage_buffers(column_buffers)
+                    if staged is None:
+                        db_connection.rollback()
+                        return False, f"Ошибка при загрузке строк до {row_num} во временную таблицу: {query.lastError().text()}"
+                    staged_count += staged
+                    column_buffers = [[] for _ in range(len(column_names) + 1)]
+
+            if column_buffers[0]:
+                staged = stage_buffers(column_buffers)
+                if staged is None:
+                    db_connection.rollback()
+                    return False, f"Ошибка при загрузке строк во временную таблицу: {query.lastError().text()}"
+                staged_count += staged
+
+            counts = _count_merge_changes(db_connection, stage_table, table_name, key_column, data_columns, latest_rows_sql)
+            if counts is None:
+                db_connection.rollback()
+                return False, "Ошибка при сравнении данных файла с таблицей."
+            inserted_count, updated_count, unchanged_count = counts
+
+            # Одно множественное слияние; WHERE в DO UPDATE пропускает строки без изменений
+            if data_columns:
+                conflict_action = (f"DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in data_columns)} "
+                                   f"WHERE {_merge_changed_condition(table_name, 'excluded', data_columns)}")
+            else:
+                conflict_action = "DO NOTHING"
+            merge_sql = (f"INSERT INTO {table_name} ({', '.join(column_names)}) "
+                         f"SELECT {', '.join(column_names)} FROM {stage_table} WHERE _row_num IN ({latest_rows_sql}) "
+                         f"ORDER BY _row_num ON CONFLICT ({key_column}) {conflict_action}")
+            if not query.exec_(merge_sql):
+                db_connection.rollback()
+                return False, f"Ошибка при применении изменений: {query.lastError().text()}"
+            query.exec_(f"DROP TABLE IF EXISTS {stage_table}")
+
+            in_transaction = False
+            if db_connection.commit():
+                print("Транзакция импорта (слияние) завершена успешно.")
+                # Версия таблицы меняется только при реальных изменениях: открытые списки не перечитываются зря
+                if inserted_count or updated_count:
+                    mark_tables_changed(table_name)
+                mark_tables_changed(*(r.ref_table for r in resolvers.values() if r.created_count))
+            else:
+                db_connection.rollback()
+                return False, f"Ошибка при завершении транзакции: {db_connection.lastError().text()}"
+
+    except FileNotFoundError:
+        return False, f"Ошибка: Файл не найден по пути {file_path}"
+    except Exception as e:
+        if in_transaction:
+            db_connection.rollback()
+        return False, f"Произошла ошибка при чтении или обработке файла: {e}"
+
+    summary = (f"Импорт (обновление) завершен для таблицы '{table_name}'.\n"
+               f"Строк в файле: {staged_count}\nДобавлено: {inserted_count}\n"
+               f"Обновлено: {updated_count}\nБез изменений: {unchanged_count}")
+    summary += _created_lookups_summary(resolvers)
+    if errors:
+        summary += f"\nОшибки:\n" + "\n".join(errors)
+    return True, summary
+
+
+def open_export_file(file_path, compression=None):
+    """
+    Открывает файл экспорта на запись (текст UTF-8 с BOM) с буферизацией.
+    compression: None - по расширению (.gz -> gzip, .xz -> xz, иначе без сжатия), "gzip", "xz" или "none".
+    """
+    if compression is None:
+        lower_path = file_path.lower()
+        compression = "gzip" if lower_path.endswith(".gz") else "xz" if lower_path.endswith(".xz") else "none"
+    if compression == "gzip":
+        return gzip.open(file_path, mode='wt', encoding='utf-8-sig', newline='', compresslevel=6)
+    if compression == "xz":
+        return lzma.open(file_path, mode='wt', encoding='utf-8-sig', newline='')
+    return open(file_path, mode='w', encoding='utf-8-sig', newline='', buffering=EXPORT_BUFFER_SIZE)
+
+
+def build_export_query(table_name, column_names, relations=None):
+    """
+    Строит SELECT для экспорта: столбцы таблицы (псевдоним t) и наименования связанных записей
+    через LEFT JOIN сразу после столбца-ссылки. relations - в формате PagedSqlTableModel:
+    {столбец: (таблица, ключ, столбец наименования или кортеж столбцов[, {местный столбец: столбец таблицы}])}.
+    Возвращает (sql, заголовок).
+    """
+    select_columns = []
+    header = []
+    joins = []
+    for col in column_names:
+        select_columns.append(f"t.{col}")
+        header.append(col)
+        relation = (relations or {}).get(col)
+        if relation is None:
+            continue
+        ref_table, ref_key, display_columns = relation[:3]
+        extra_keys = relation[3] if len(relation) > 3 else {}
+        alias = f"rel_{len(joins)}"
+        conditions = [f"{alias}.{ref_key} = t.{col}"] + [f"{alias}.{foreign} = t.{local}" for local, foreign in extra_keys.items()]
+        joins.append(f"LEFT JOIN {ref_table} {alias} ON {' AND '.join(conditions)}")
+        if isinstance(display_columns, str):
+            display_columns = (display_columns,)
+        for display_column in display_columns:
+            select_columns.append(f"{alias}.{display_column}")
+            header.append(display_column)
+    sql = f"SELECT {', '.join(select_columns)} FROM {table_name} t"
+    if joins:
+        sql += " " + " ".join(joins)
+    return sql, header
+
+
+def export_data_to_csv(db_connection, file_path, table_name, column_names=None, progress_callback=None, relations=None, compression=None):
     """
     Экспортирует данные из указанной таблицы в CSV-файл.
     Разделитель - точка с запятой (;).
+    Строки читаются однонаправленным запросом и пишутся порциями, поэтому расход памяти
+    не зависит от размера таблицы. relations добавляет наименования связанных записей
+    (см. build_export_query); compression - сжатие gzip/xz (см. open_export_file).
+    progress_callback(экспортировано_строк) вызывается каждые PROGRESS_INTERVAL строк;
+    если он возвращает False, экспорт прерывается и частично записанный файл удаляется.
     """
     if db_connection is None or not db_connection.isOpen():
         return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
 
+    if column_names is None:
+        column_names = get_column_names(table_name)
+    if not column_names:
+        return False, f"Ошибка: Таблица '{table_name}' не найдена в схеме базы данных."
+
     try:
         query = QSqlQuery(db_connection)
-        select_sql = f"SELECT {', '.join(column_names)} FROM {table_name}"
+        query.setForwardOnly(True) # Без кэширования уже прочитанных строк в QtSql
+        select_sql, header = build_export_query(table_name, column_names, relations)
         if not query.exec_(select_sql):
             return False, f"Ошибка при выполнении запроса к базе данных: {query.lastError().text()}"
 
-        with open(file_path, mode='w', encoding='utf-8-sig', newline='') as csvfile:
+        cancelled = False
+        column_range = range(len(header))
+        exported_count = 0
+        with open_export_file(file_path, compression) as csvfile:
             writer = csv.writer(csvfile, delimiter=';')
-            writer.writerow(column_names)
-            exported_count = 0
+            writer.writerow(header)
+            rows = []
             while query.next():
-                # Получаем значения, преобразуем в строку, обрабатываем None
-                row_data = [str(query.value(i)) if query.value(i) is not None else '' for i in range(len(column_names))]
-                writer.writerow(row_data)
-                exported_count += 1
+                # Каждое значение читается один раз; NULL -> пустая строка
+                values = [query.value(i) for i in column_range]
+                rows.append(['' if value is None else value for value in values])
+                if len(rows) >= PROGRESS_INTERVAL:
+                    writer.writerows(rows)
+                    exported_count += len(rows)
+                    rows = []
+                    if progress_callback is not None and progress_callback(exported_count) is False:
+                        cancelled = True
+                        break
+            if rows:
+                writer.writerows(rows)
+                exported_count += len(rows)
+        query.finish()
+
+        if cancelled:
+            os.remove(file_path)
+            return False, CANCELLED_MESSAGE
 
         summary = f"Экспорт завершен для таблицы '{table_name}'.\nЭкспортировано записей: {exported_count}"
         return True, summary
@@ -0,0 +1,229 @@
+# File: src/utils/document_batch.py
+# Пакетное формирование документов по шаблонам (заявка на выдачу основных средств, служебная
+# записка на замену картриджа): один документ на сотрудника, отдел или кабинет.
+# Шаблоны public/templates/*.doc хранятся в двоичном формате Word 97, который python-docx
+# не открывает, поэтому их разметка воспроизведена здесь: оболочка документа строится
+# python-docx один раз на процесс, а каждый документ получается подстановкой значений
+# и строк таблицы в готовый XML (как в docx_writer). Документы собираются в отдельных
+# процессах и записываются в zip-архив или каталог.
+# Модуль не импортирует Qt: его загружают дочерние процессы.
+import io
+import os
+import re
+import zipfile
+import multiprocessing
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+from src.utils.docx_writer import DOCUMENT_XML, COMPRESS_LEVEL, split_table_shell, table_row_xml
+from src.utils.parallel_csv import default_worker_count
+
+# Меньше документов быстрее собрать в одном процессе (запуск процессов не окупается)
+PARALLEL_MIN_DOCUMENTS = 200
+# Документов в одной задаче дочернего процесса
+DOCUMENTS_PER_TASK = 50
+
+# Подписи, повторяющие шаблоны public/templates
+APPROVER_LINES = ["СОГЛАСОВАНО:", "Заместитель председателя", "Счетной палаты",
+                  "Донецкой Народной Республики", "_____________________ О.Б. Чаус"]
+IT_HEAD_POST = "Начальник отдела ИТ-обеспечения"
+IT_HEAD_NAME = "С.Г. Яковлев"
+IT_HEAD_ADDRESSEE = ["Начальнику отдела ИТ-обеспечения", "аппарата Счетной палаты",
+                     "Донецкой Народной Республики", "Яковлеву С.Г."]
+SIGNATURE_CAPTIONS = "(Дата)                    (Должность)                    (Подпись)                    (Фамилия, инициалы)"
+
+DocumentTemplate = namedtuple("DocumentTemplate", ["name", "title", "file_prefix", "headers", "numbered"])
+DocumentTemplate.__doc__ = """Шаблон документа пакета.
+headers - заголовки таблицы; numbered - первый столбец таблицы "№ п/п" заполняется номером строки
+(строки данных передаются без него)."""
+
+DOCUMENT_TEMPLATES = {
+    "transfer_sheet": DocumentTemplate(
+        "transfer_sheet", "Заявка на выдачу со склада основных средств", "Заявка",
+        ["№ п/п", "Наименование", "Инвентарный / индивидуальный номер", "Ед.изм.", "Кол-во"], True),
+    "cartridge_sheet": DocumentTemplate(
+        "cartridge_sheet", "Служебная записка на замену картриджа", "Замена_картриджа",
+        ["Модель принтера (МФУ)", "Инв. №", "№ каб.", "Отдел", "Дата последней замены",
+         "Кол-во распечатанных копий"], False),
+}
+
+DocumentGroup = namedtuple("DocumentGroup", ["title", "signer_post", "signer_name", "rows"])
+DocumentGroup.__doc__ = """Данные одного документа: получатель/группа (title), подписывающий
+(должность и ФИО, могут быть пустыми) и строки таблицы."""
+
+# Поля, подставляемые в оболочку документа
+PLACEHOLDERS = ("group", "signer_post", "signer_name", "date")
+
+
+def _placeholder(name):
+    return "{{" + name + "}}"
+
+
+def _build_template_shell(template):
+    """Документ python-docx с разметкой шаблона, полями {{...}} и таблицей из строки заголовков."""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+
+    document = Document()
+    if template.name == "transfer_sheet":
+        for line in APPROVER_LINES:
+            document.add_paragraph(line).alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        heading = document.add_paragraph()
+        heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        heading.add_run(template.title).bold = True
+        document.add_paragraph("Получатель: " + _placeholder("group"))
+    else:
+        for line in IT_HEAD_ADDRESSEE:
+            document.add_paragraph(line).alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        heading = document.add_paragraph()
+        heading.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        heading.add_run("СЛУЖЕБНАЯ ЗАПИСКА").bold = True
+        document.add_paragraph("От: " + _placeholder("group"))
+        document.add_paragraph("Прошу заменить тонер-картридж в следующих принтерах (МФУ):")
+
+    table = document.add_table(rows=1, cols=len(template.headers))
+    table.style = 'Table Grid'
+    header_row = table.rows[0]
+    header_row._tr.get_or_add_trPr().append(OxmlElement('w:tblHeader'))
+    for cell, header_text in zip(header_row.cells, template.headers):
+        cell.paragraphs[0].add_run(header_text).bold = True
+
+    if template.name == "transfer_sheet":
+        document.add_paragraph(f"{IT_HEAD_POST}          _____________________          {IT_HEAD_NAME}")
+        document.add_paragraph(_placeholder("date"))
+    else:
+        document.add_paragraph(f"{_placeholder('date')}    {_placeholder('signer_post')}    "
+                               f"_____________    {_placeholder('signer_name')}")
+        document.add_paragraph(SIGNATURE_CAPTIONS)
+        document.add_paragraph("Замена картриджа произведена:")
+        document.add_paragraph(f"__.__.____    {IT_HEAD_POST}    _____________    {IT_HEAD_NAME}")
+        document.add_paragraph(SIGNATURE_CAPTIONS)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer
+
+
+# Разобранные оболочки шаблонов в текущем процессе: {имя шаблона: (элементы архива, начало XML, конец XML)}
+_shells = {}
+
+
+def _template_parts(template):
+    if template.name not in _shells:
+        _shells[template.name] = split_table_shell(_build_template_shell(template))
+    return _shells[template.name]
+
+
+def _fill_placeholders(xml, values):
+    for name in PLACEHOLDERS:
+        xml = xml.replace(_placeholder(name), escape(values.get(name) or ""))
+    return xml
+
+
+def render_document(template, group, date_text):
+    """Собирает документ .docx для одной группы; возвращает содержимое файла (bytes)."""
+    members, head, tail = _template_parts(template)
+    values = {"group": group.title, "signer_post": group.signer_post, "signer_name": group.signer_name,
+              "date": date_text}
+    if template.numbered:
+        rows_xml = "".join(table_row_xml([number] + list(row)) for number, row in enumerate(group.rows, start=1))
+    else:
+        rows_xml = "".join(table_row_xml(row) for row in group.rows)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as target:
+        for item, data in members:
+            target.writestr(item, data)
+        target.writestr(DOCUMENT_XML, (_fill_placeholders(head, values) + rows_xml +
+                                       _fill_placeholders(tail, values)).encode("utf-8"))
+    return buffer.getvalue()
+
+
+def _render_task(task):
+    """Собирает несколько документов в дочернем процессе; возвращает список содержимого файлов."""
+    template_name, groups, date_text = task
+    template = DOCUMENT_TEMPLATES[template_name]
+    return [render_document(template, group, date_text) for group in groups]
+
+
+def _iter_rendered(template, groups, date_text, workers):
+    """Содержимое документов в порядке групп; при workers > 1 документы собираются в пуле процессов."""
+    if not workers or workers <= 1 or len(groups) < PARALLEL_MIN_DOCUMENTS:
+        for group in groups:
+            yield render_document(template, group, date_text)
+        return
+    tasks = [(template.name, groups[start:start + DOCUMENTS_PER_TASK], date_text)
+             for start in range(0, len(groups), DOCUMENTS_PER_TASK)]
+    # spawn: дочерние процессы не наследуют состояние Qt и соединения с базой
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(workers, len(tasks))) as pool:
+        for documents in pool.imap(_render_task, tasks):
+            yield from documents
+
+
+_INVALID_FILE_NAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def document_file_names(template, groups):
+    """Имена файлов документов (уникальные, без недопустимых в Windows символов)."""
+    names = []
+    used = set()
+    for group in groups:
+        base = f"{template.file_prefix}_{_INVALID_FILE_NAME_CHARS.sub('_', group.title).strip(' ._') or 'без_названия'}"
+        name = base + ".docx"
+        counter = 2
+        while name.casefold() in used:
+            name = f"{base}_{counter}.docx"
+            counter += 1
+        used.add(name.casefold())
+        names.append(name)
+    return names
+
+
+def write_document_batch(output_path, template, groups, date_text="__.__.____ г.", progress_callback=None, workers=None):
+    """
+    Формирует по документу template (DocumentTemplate) на каждую группу (DocumentGroup).
+    Если output_path оканчивается на .zip, документы записываются в этот архив, иначе - в каталог
+    output_path (создается при необходимости).
+    progress_callback(записано_документов) - False прерывает запись, записанные файлы удаляются.
+    workers - число процессов (по умолчанию - по числу ядер; пул используется только для
+    PARALLEL_MIN_DOCUMENTS документов и больше).
+    Возвращает количество документов или None, если запись отменена.
+    """
+    if workers is None:
+        workers = default_worker_count()
+    file_names = document_file_names(template, groups)
+    to_zip = output_path.lower().endswith(".zip")
+    written_paths = []
+    count = 0
+    cancelled = False
+    archive = None
+    rendered = _iter_rendered(template, groups, date_text, workers)
+    try:
+        if to_zip:
+            # Документы .docx уже сжаты, повторное сжатие в архиве не нужно
+            archive = zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED)
+        else:
+            os.makedirs(output_path, exist_ok=True)
+        for file_name, content in zip(file_names, rendered):
+            if archive is not None:
+                archive.writestr(file_name, content)
+            else:
+                path = os.path.join(output_path, file_name)
+                with open(path, "wb") as document_file:
+                    document_file.write(content)
+                written_paths.append(path)
+            count += 1
+            if progress_callback is not None and progress_callback(count) is False:
+                cancelled = True
+                break
+    finally:
+        rendered.close() # Завершает пул процессов, если запись прервана
+        if archive is not None:
+            archive.close()
+
+    if cancelled:
+        for path in [output_path] if to_zip else written_paths:
+            os.remove(path)
+        return None
+    return count
@@ -0,0 +1,122 @@
+# File: src/utils/docx_writer.py
+# Потоковая запись больших таблиц в .docx. python-docx строит только "оболочку" документа
+# (заголовок, абзацы, строка заголовков таблицы), а строки данных дописываются в word/document.xml
+# готовым XML прямо в zip-архив. Объектная модель python-docx для каждой ячейки не создается,
+# поэтому время растет линейно, а память не зависит от числа строк.
+import io
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.oxml import OxmlElement
+
+DOCUMENT_XML = "word/document.xml"
+# Сколько строк таблицы собирается в одну запись в архив (и между вызовами progress_callback)
+ROWS_PER_CHUNK = 1000
+# Быстрое сжатие: XML таблицы хорошо сжимается и на минимальном уровне
+COMPRESS_LEVEL = 1
+
+# Символы, недопустимые в XML 1.0 (управляющие, кроме табуляции и переводов строк)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+_EMPTY_CELL = "<w:tc><w:p/></w:tc>"
+_LINE_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+
+
+def _cell_xml(value):
+    if value is None or value == "":
+        return _EMPTY_CELL
+    text = escape(str(value))
+    if _INVALID_XML_CHARS.search(text):
+        text = _INVALID_XML_CHARS.sub("", text)
+    if "\n" in text:
+        text = text.replace("\n", _LINE_BREAK)
+    return f'<w:tc><w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>'
+
+
+def table_row_xml(values):
+    """XML строки таблицы (w:tr) для списка значений; None - пустая ячейка."""
+    return "<w:tr>" + "".join(_cell_xml(value) for value in values) + "</w:tr>"
+
+
+def _paragraph_xml(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{escape(_INVALID_XML_CHARS.sub("", text))}</w:t></w:r></w:p>'
+
+
+def _build_shell(title, paragraphs, headers):
+    """Документ python-docx с заголовком, абзацами и таблицей из одной строки заголовков."""
+    document = Document()
+    document.add_heading(title, 0)
+    for text in paragraphs:
+        document.add_paragraph(text)
+    table = document.add_table(rows=1, cols=len(headers))
+    table.style = 'Table Grid'
+    header_row = table.rows[0]
+    # Строка заголовков повторяется на каждой странице
+    row_properties = header_row._tr.get_or_add_trPr()
+    row_properties.append(OxmlElement('w:tblHeader'))
+    for cell, header_text in zip(header_row.cells, headers):
+        cell.paragraphs[0].add_run(header_text).bold = True
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer
+
+
+def split_table_shell(shell):
+    """
+    Делит документ-оболочку (путь или файловый объект .docx) по концу последней таблицы
+    для дописывания строк. Возвращает (прочие элементы архива [(ZipInfo, данные)],
+    XML документа до "</w:tbl>", XML документа начиная с "</w:tbl>").
+    """
+    members = []
+    document_xml = None
+    with zipfile.ZipFile(shell) as source:
+        for item in source.infolist():
+            if item.filename == DOCUMENT_XML:
+                document_xml = source.read(item.filename).decode("utf-8")
+            else:
+                members.append((item, source.read(item.filename)))
+    table_end = document_xml.rindex("</w:tbl>")
+    return members, document_xml[:table_end], document_xml[table_end:]
+
+
+def write_docx_table(file_path, title, paragraphs, headers, rows, progress_callback=None, empty_text=None):
+    """
+    Сохраняет документ с заголовком title, абзацами paragraphs и таблицей headers/rows в file_path.
+    rows - итератор списков значений (читается один раз, по мере записи). Если строк нет и задан
+    empty_text, после таблицы добавляется абзац с этим текстом.
+    progress_callback(записано_строк) вызывается каждые ROWS_PER_CHUNK строк; если он возвращает
+    False, запись прерывается, частично записанный файл удаляется.
+    Возвращает количество строк или None, если запись отменена.
+    """
+    members, head, tail = split_table_shell(_build_shell(title, paragraphs, headers))
+    row_count = 0
+    cancelled = False
+    with zipfile.ZipFile(file_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as target:
+        for item, data in members:
+            target.writestr(item, data)
+        with target.open(DOCUMENT_XML, "w", force_zip64=True) as stream:
+            stream.write(head.encode("utf-8"))
+            chunk = []
+            for values in rows:
+                chunk.append(table_row_xml(values))
+                if len(chunk) >= ROWS_PER_CHUNK:
+                    stream.write("".join(chunk).encode("utf-8"))
+                    row_count += len(chunk)
+                    chunk = []
+                    if progress_callback is not None and progress_callback(row_count) is False:
+                        cancelled = True
+                        break
+            if chunk:
+                stream.write("".join(chunk).encode("utf-8"))
+                row_count += len(chunk)
+            if row_count == 0 and empty_text:
+                tail = tail.replace("</w:tbl>", "</w:tbl>" + _paragraph_xml(empty_text), 1)
+            stream.write(tail.encode("utf-8"))
+    if cancelled:
+        os.remove(file_path)
+        return None
+    return row_count
@@ -0,0 +1,93 @@
+# File: src/utils/inventory_search.py
+# Поиск по инвентаризации через теневую таблицу FTS5 (см. INVENTORY_FTS_TABLE в database.py).
+from PyQt5.QtSql import QSqlQuery
+
+from database import INVENTORY_FTS_TABLE, INVENTORY_FTS_COLUMNS, inventory_fts_available
+
+# Токенизатор trigram находит только подстроки длиной от 3 символов;
+# более короткие значения фильтруются через LIKE.
+MIN_FTS_TERM_LENGTH = 3
+
+FTS_SEARCH_COLUMNS = INVENTORY_FTS_COLUMNS["Units_inventory"] + INVENTORY_FTS_COLUMNS["Units_extended_info"]
+
+
+def _quote_fts_phrase(text):
+    """Экранирует строку как фразу FTS5 (кавычки внутри удваиваются)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_fts_match(text, column=None):
+    """
+    Строит выражение MATCH для поиска подстроки text (во всех столбцах или в column).
+    Возвращает None, если значение слишком короткое для индекса.
+    """
+    text = (text or "").strip()
+    if len(text) < MIN_FTS_TERM_LENGTH:
+        return None
+    phrase = _quote_fts_phrase(text)
+    if column is not None:
+        return f"{column} : {phrase}"
+    return phrase
+
+
+def build_text_filter(column_filters, id_expression="ui.id_unit_inventory", use_fts=True):
+    """
+    Строит условие WHERE для набора фильтров вида {столбец: подстрока}.
+    Фильтры, которые может обслужить FTS5, объединяются в один MATCH-подзапрос,
+    остальные (короткие значения или FTS5 недоступен) - через LIKE.
+    Возвращает кортеж (sql, params); sql пустой, если фильтров нет.
+    """
+    clauses = []
+    params = []
+    match_parts = []
+    alias = id_expression.split(".")[0] + "." if "." in id_expression else ""
+
+    for column, text in column_filters.items():
+        text = (text or "").strip()
+        if not text:
+            continue
+        match_expression = build_fts_match(text, column) if use_fts and column in FTS_SEARCH_COLUMNS else None
+        if match_expression is not None:
+            match_parts.append(match_expression)
+        else:
+            clauses.append(f"{alias}{column} LIKE ?")
+            params.append(f"%{text}%")
+
+    if match_parts:
+        clauses.insert(0, f"{id_expression} IN (SELECT rowid FROM {INVENTORY_FTS_TABLE} WHERE {INVENTORY_FTS_TABLE} MATCH ?)")
+        params.insert(0, " AND ".join(match_parts))
+
+    return " AND ".join(clauses), params
+
+
+def search_inventory(db, text, limit=100, columns=None):
+    """
+    Ранжированный поиск по инвентаризации.
+    Возвращает список кортежей (id_unit_inventory, rank), лучшие совпадения первыми
+    (rank - значение bm25, чем меньше, тем релевантнее).
+    """
+    if db is None or not db.isOpen() or not inventory_fts_available(db):
+        return []
+
+    if columns:
+        parts = [build_fts_match(text, column) for column in columns if column in FTS_SEARCH_COLUMNS]
+        parts = [part for part in parts if part is not None]
+        match_expression = " OR ".join(parts) if parts else None
+    else:
+        match_expression = build_fts_match(text)
+    if match_expression is None:
+        return []
+
+    query = QSqlQuery(db)
+    query.setForwardOnly(True)
+    query.prepare(f"SELECT rowid, rank FROM {INVENTORY_FTS_TABLE} WHERE {INVENTORY_FTS_TABLE} MATCH ? ORDER BY rank LIMIT ?")
+    query.addBindValue(match_expression)
+    query.addBindValue(limit)
+    if not query.exec_():
+        print("Ошибка полнотекстового поиска:", query.lastError().text())
+        return []
+
+    results = []
+    while query.next():
+        results.append((query.value(0), query.value(1)))
+    return results
@@ -0,0 +1,142 @@
+# File: src/utils/lookup_cache.py
+# Общий кэш справочников (категории, подкатегории, типы единиц, статусы, отделы)
+# для диалогов и комбобоксов. Каждый справочник читается из базы один раз и
+# перечитывается только после записи в его таблицу (см. mark_tables_changed в database.py).
+from PyQt5.QtSql import QSqlQuery
+
+from database import get_table_versions, on_connection_removed
+
+# Справочник: (столбец ID, столбец наименования)
+LOOKUP_TABLES = {
+    "Category": ("id_category", "category"),
+    "Unit_type": ("id_unit_type", "unit_type"),
+    "Order_status": ("id_order_status", "order_status"),
+    "Departments": ("id_department", "department_fullname"),
+    "GroupDC": ("id_group_dc", "group_dc"),
+    "Employee": ("id_employee", "fio"),
+}
+
+SUBCATEGORY_TABLE = "Subcategory"
+
+# Кэш по имени соединения: {(соединение, таблица): (версия таблицы, данные)}.
+# Записи соединения удаляются вместе с ним (фоновые задачи каждый раз открывают новое соединение)
+_cache = {}
+
+
+class Lookup:
+    """Справочник в памяти: список (id, наименование) по алфавиту и словари id <-> наименование."""
+
+    def __init__(self, items):
+        self.items = items
+        self.id_to_name = {item_id: name for item_id, name in items}
+        self.name_to_id = {name: item_id for item_id, name in items}
+
+    def name(self, item_id, default=""):
+        return self.id_to_name.get(item_id, default)
+
+    def id(self, name, default=None):
+        return self.name_to_id.get(name, default)
+
+
+class SubcategoryLookup:
+    """Подкатегории, сгруппированные по категории; подкатегория определяется парой (id_category, id_subcategory)."""
+
+    def __init__(self, rows):
+        self.all_items = []
+        self.by_category = {}
+        self.pair_to_name = {}
+        self.name_to_pair = {}
+        for category_id, subcategory_id, name in rows:
+            self.all_items.append((subcategory_id, name))
+            self.by_category.setdefault(category_id, []).append((subcategory_id, name))
+            self.pair_to_name[(category_id, subcategory_id)] = name
+            self.name_to_pair.setdefault((category_id, name), (category_id, subcategory_id))
+
+    def items(self, category_id=None):
+        """Список (id_subcategory, наименование) для категории или всех подкатегорий."""
+        if category_id is None:
+            return self.all_items
+        return self.by_category.get(category_id, [])
+
+    def name(self, category_id, subcategory_id, default=""):
+        return self.pair_to_name.get((category_id, subcategory_id), default)
+
+    def id(self, category_id, name, default=None):
+        pair = self.name_to_pair.get((category_id, name))
+        return pair[1] if pair else default
+
+
+def _load_rows(db, sql, column_count):
+    query = QSqlQuery(db)
+    query.setForwardOnly(True)
+    rows = []
+    if not query.exec_(sql):
+        print("Ошибка загрузки справочника:", query.lastError().text())
+        return rows
+    while query.next():
+        rows.append(tuple(query.value(i) for i in range(column_count)))
+    return rows
+
+
+def _cached(db, table_name, loader):
+    key = (db.connectionName(), table_name)
+    version = get_table_versions([table_name])
+    entry = _cache.get(key)
+    if entry is None or entry[0] != version:
+        entry = (version, loader())
+        _cache[key] = entry
+    return entry[1]
+
+
+def get_lookup(db, table_name):
+    """Возвращает справочник Lookup для таблицы из LOOKUP_TABLES."""
+    id_column, name_column = LOOKUP_TABLES[table_name]
+    sql = f"SELECT {id_column}, {name_column} FROM {table_name} ORDER BY {name_column}"
+    return _cached(db, table_name, lambda: Lookup(_load_rows(db, sql, 2)))
+
+
+def get_subcategories(db):
+    """Возвращает SubcategoryLookup (все подкатегории, сгруппированные по категориям)."""
+    sql = f"SELECT id_category, id_subcategory, subcategory FROM {SUBCATEGORY_TABLE} ORDER BY subcategory"
+    return _cached(db, SUBCATEGORY_TABLE, lambda: SubcategoryLookup(_load_rows(db, sql, 3)))
+
+
+def invalidate_lookups(table_names=None):
+    """Сбрасывает кэш (для всех или указанных таблиц), например после изменения базы другим процессом."""
+    for key in list(_cache):
+        if table_names is None or key[1] in table_names:
+            _cache.pop(key, None)
+
+
+def _forget_connection(connection_name):
+    """Удаляет справочники удаляемого соединения."""
+    for key in list(_cache):
+        if key[0] == connection_name:
+            _cache.pop(key, None)
+
+
+on_connection_removed(_forget_connection)
+
+
+# --- Комбобоксы ---
+
+def populate_combo(combo_box, items, placeholder):
+    """Заполняет комбобокс элементами (id, наименование) с первым пунктом-заглушкой (данные None)."""
+    combo_box.blockSignals(True)
+    combo_box.clear()
+    combo_box.addItem(placeholder, None)
+    for item_id, item_name in items:
+        combo_box.addItem(item_name, item_id)
+    combo_box.blockSignals(False)
+    # Позиции для select_combo_item без перебора элементов
+    combo_box.lookup_positions = {item_id: position for position, (item_id, _) in enumerate(items, start=1)}
+
+
+def select_combo_item(combo_box, item_id):
+    """Выбирает элемент комбобокса по ID; если ID не найден - пункт-заглушку."""
+    positions = getattr(combo_box, "lookup_positions", None)
+    if positions is not None:
+        combo_box.setCurrentIndex(positions.get(item_id, 0) if item_id is not None else 0)
+    else:
+        index = combo_box.findData(item_id) if item_id is not None else 0
+        combo_box.setCurrentIndex(max(index, 0))
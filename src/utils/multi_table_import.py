@@ -0,0 +1,374 @@
+# File: src/utils/multi_table_import.py
+# Импорт CSV, каждая строка которого содержит данные нескольких таблиц (например, полная
+# выгрузка инвентаризации: Units_inventory + Units_extended_info + закрепленный сотрудник).
+# Файл читается один раз; строка раскладывается по таблицам согласно описанию ImportSpec,
+# значения приводятся к типам из схемы (database.SCHEMA), внешние ключи проверяются по
+# справочникам в памяти, а вставка идет пакетами через execBatch в одной транзакции.
+import csv
+from collections import namedtuple
+from datetime import datetime
+
+from PyQt5.QtSql import QSqlQuery
+
+from database import (get_table_info, mark_tables_changed, inventory_fts_available,
+                      drop_inventory_fts_triggers, create_inventory_fts_triggers, rebuild_inventory_fts)
+from src.utils.csv_handler import DEFAULT_BATCH_SIZE, PROGRESS_INTERVAL, CANCELLED_MESSAGE, load_existing_keys
+
+# Сколько ошибок/предупреждений по строкам попадает в итоговое сообщение
+MAX_REPORTED_ERRORS = 50
+
+# Форматы дат во входных файлах (выгрузки Excel используют ДД.ММ.ГГГГ)
+DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d")
+
+ImportTarget = namedtuple("ImportTarget", ["table_name", "columns", "optional", "defaults"], defaults=(False, None))
+ImportTarget.__doc__ = """Таблица назначения импорта.
+columns - {заголовок CSV: столбец таблицы}; optional - строка записывается, только если
+заполнено хотя бы одно поле кроме ключа; defaults - {столбец: значение} для пустых полей."""
+
+ImportSpec = namedtuple("ImportSpec", ["name", "key_column", "targets", "name_lookups", "before_import", "after_import"],
+                        defaults=(None, None, None))
+ImportSpec.__doc__ = """Описание импорта из одного CSV в несколько таблиц.
+key_column - общий ключ строки (первичный ключ первой таблицы); targets - таблицы в порядке
+вставки (родительские раньше дочерних); name_lookups - {столбец: (заголовок CSV, таблица, столбец наименования)}
+для поиска ID по наименованию, если ID не указан или не найден; before_import/after_import(db) -
+действия внутри транзакции до и после вставки (например, отключение триггеров)."""
+
+
+def _suspend_inventory_fts(db):
+    # Построчные триггеры FTS заменяются одной перестройкой индекса после загрузки
+    return drop_inventory_fts_triggers(db) if inventory_fts_available(db) else True
+
+
+def _resume_inventory_fts(db):
+    if not inventory_fts_available(db):
+        return True
+    return create_inventory_fts_triggers(db) and rebuild_inventory_fts(db)
+
+
+# Полная выгрузка инвентаризации (public/import/UnitsInventory.csv)
+UNITS_INVENTORY_IMPORT = ImportSpec(
+    name="Инвентаризация",
+    key_column="id_unit_inventory",
+    targets=[
+        ImportTarget("Units_inventory", {
+            "id_unit_inventory": "id_unit_inventory",
+            "id_user": "id_employee",
+            "cabinet": "cabinet",
+            "id_category": "id_category",
+            "id_subcategory": "id_subcategory",
+            "manufacturer": "manufacturer",
+            "model": "model",
+            "series": "series",
+            "serial_number": "serial_number",
+            "inventory_number": "inventory_number",
+            "date_order_buhgaltery": "date_order_buhgaltery",
+            "id_order_status": "id_order_status",
+            "date_issue": "date_issue",
+            "notice": "notice",
+        }, defaults={"unit_count": 1}),
+        ImportTarget("Units_extended_info", {
+            "id_unit_inventory": "id_unit_inventory",
+            "device_name": "device_name",
+            "ip": "ip",
+            "mac": "mac",
+            "admin_login": "admin_login",
+            "admin_password": "admin_password",
+            "user_login": "user_login",
+            "user_password": "user_password",
+        }, optional=True),
+    ],
+    name_lookups={"id_employee": ("ФИО", "Employee", "fio")},
+    before_import=_suspend_inventory_fts,
+    after_import=_resume_inventory_fts,
+)
+
+
+def _strip_quotes(value):
+    # ID в выгрузках Excel бывают обернуты в кавычки: """15010001""" -> "15010001" после csv.reader
+    return value.strip().strip('"').strip()
+
+
+def convert_value(column_info, raw_value):
+    """
+    Приводит текст ячейки к типу столбца из схемы.
+    Возвращает (значение, None) или (None, текст ошибки); пустая ячейка дает NULL (None).
+    """
+    value = raw_value.strip()
+    if column_info.sql_type == "INTEGER" or column_info.foreign_key or column_info.primary_key:
+        value = _strip_quotes(value)
+    if not value:
+        return None, None
+
+    if column_info.sql_type == "INTEGER":
+        try:
+            return int(value), None
+        except ValueError:
+            return None, f"столбец '{column_info.name}': '{value}' не является целым числом"
+    if column_info.sql_type == "DATE":
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).date().isoformat(), None
+            except ValueError:
+                continue
+        return None, f"столбец '{column_info.name}': не удалось распознать дату '{value}'"
+    # Строковые ID справочников хранятся дополненными нулями до длины VARCHAR(n): 1 -> "01"
+    if column_info.foreign_key and column_info.max_length and value.isdigit():
+        return value.zfill(column_info.max_length), None
+    return value, None
+
+
+class _ForeignKeyCheck:
+    """Множество существующих значений внешнего ключа (один или несколько столбцов) в памяти."""
+
+    def __init__(self, db, foreign_key):
+        self.columns = foreign_key.columns
+        self.ref_table = foreign_key.ref_table
+        self.keys = set()
+        query = QSqlQuery(db)
+        query.setForwardOnly(True)
+        if query.exec_(f"SELECT {', '.join(foreign_key.ref_columns)} FROM {foreign_key.ref_table}"):
+            while query.next():
+                self.keys.add(tuple(str(query.value(i)) for i in range(len(self.columns))))
+        else:
+            print(f"Ошибка загрузки значений {foreign_key.ref_table}:", query.lastError().text())
+
+    def apply(self, values):
+        """Проверяет ссылку; несуществующее значение заменяется на NULL. Возвращает текст предупреждения или None."""
+        key = tuple(values.get(col) for col in self.columns)
+        if any(part is None for part in key) or tuple(str(part) for part in key) in self.keys:
+            return None
+        # Для составного ключа обнуляется последний (уточняющий) столбец, например id_subcategory
+        column = self.columns[-1]
+        values[column] = None
+        return f"столбец '{column}': значение {'/'.join(str(part) for part in key)} не найдено в {self.ref_table}, записано пустое значение"
+
+
+def _load_name_index(db, table_name, key_column, name_column):
+    names = {}
+    query = QSqlQuery(db)
+    query.setForwardOnly(True)
+    if query.exec_(f"SELECT {key_column}, {name_column} FROM {table_name} WHERE {name_column} IS NOT NULL"):
+        while query.next():
+            names.setdefault(str(query.value(1)).strip().lower(), query.value(0))
+    else:
+        print(f"Ошибка загрузки наименований {table_name}:", query.lastError().text())
+    return names
+
+
+class _TargetBuffer:
+    """Подготовленный INSERT и буферы значений по столбцам для одной таблицы назначения."""
+
+    def __init__(self, db, target, table_info, header_index):
+        self.target = target
+        self.table_info = table_info
+        self.defaults = target.defaults or {}
+        # (индекс в строке CSV, описание столбца) для столбцов из файла
+        self.sources = [(header_index[header], table_info.column(column)) for header, column in target.columns.items()]
+        mapped_columns = [column.name for _, column in self.sources]
+        self.column_names = mapped_columns + [col for col in self.defaults if col not in mapped_columns]
+        self.foreign_keys = []
+        self.query = QSqlQuery(db)
+        self.query.prepare(f"INSERT INTO {table_info.name} ({', '.join(self.column_names)}) "
+                           f"VALUES ({', '.join(['?'] * len(self.column_names))})")
+        self.buffers = [[] for _ in self.column_names]
+        self.inserted = 0
+
+    def is_known(self, column, value):
+        """Есть ли значение одностолбцового внешнего ключа в справочнике (без проверки - считается известным)."""
+        if value is None:
+            return False
+        check = next((check for check in self.foreign_keys if check.columns == (column,)), None)
+        return check is None or (str(value),) in check.keys
+
+    def append(self, values):
+        for buffer, column in zip(self.buffers, self.column_names):
+            buffer.append(values.get(column))
+
+    def flush(self):
+        if not self.buffers[0]:
+            return True
+        for values in self.buffers:
+            self.query.addBindValue(values)
+        if not self.query.execBatch():
+            return False
+        self.inserted += len(self.buffers[0])
+        self.buffers = [[] for _ in self.column_names]
+        return True
+
+
+def _row_values(target_buffer, row):
+    """Значения одной таблицы из строки CSV: ({столбец: значение}, [ошибки])."""
+    values = {}
+    errors = []
+    for csv_index, column_info in target_buffer.sources:
+        value, error = convert_value(column_info, row[csv_index])
+        if error:
+            errors.append(error)
+        values[column_info.name] = value
+    for column, default in target_buffer.defaults.items():
+        if values.get(column) is None:
+            values[column] = default
+    return values, errors
+
+
+def import_multi_table_csv(db_connection, file_path, spec, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None, use_transaction=True):
+    """
+    Импортирует CSV (разделитель ';', первая строка - заголовок) в несколько таблиц по описанию spec.
+    Строки с уже существующим ключом пропускаются; ссылки на несуществующие записи
+    справочников заменяются на NULL с предупреждением. Все таблицы пишутся в одной транзакции.
+    progress_callback(обработано_строк) вызывается каждые PROGRESS_INTERVAL строк;
+    если он возвращает False, транзакция откатывается и импорт прерывается.
+    При use_transaction=False транзакцию открывает и завершает вызывающий код (например, общая
+    транзакция первичной загрузки): здесь она не начинается, не фиксируется и не откатывается,
+    а при ошибке возвращается (False, сообщение).
+    Возвращает кортеж (success, message).
+    """
+    if db_connection is None or not db_connection.isOpen():
+        return False, "Ошибка: Соединение с базой данных не установлено или закрыто."
+
+    batch_size = max(1, int(batch_size or 1))
+    skipped_count = 0
+    processed_count = 0
+    errors = []
+    in_transaction = False
+    target_tables = [target.table_name for target in spec.targets]
+
+    def rollback():
+        if use_transaction:
+            db_connection.rollback()
+
+    try:
+        with open(file_path, mode='r', encoding='utf-8-sig', newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=';')
+            try:
+                header = [name.strip() for name in next(reader)]
+            except StopIteration:
+                return False, "Ошибка: CSV файл пуст."
+            print(f"Заголовок CSV для импорта '{spec.name}': {header}")
+
+            header_index = {name: i for i, name in enumerate(header)}
+            required_headers = {name for target in spec.targets for name in target.columns}
+            required_headers.update(lookup[0] for lookup in (spec.name_lookups or {}).values())
+            missing_headers = sorted(required_headers - set(header_index))
+            if missing_headers:
+                return False, f"Ошибка: В файле нет столбцов: {', '.join(missing_headers)}"
+
+            targets = []
+            for target in spec.targets:
+                table_info = get_table_info(target.table_name)
+                if table_info is None:
+                    return False, f"Ошибка: Таблица '{target.table_name}' не найдена в схеме базы данных."
+                targets.append(_TargetBuffer(db_connection, target, table_info, header_index))
+
+            # Справочники загружаются один раз; ссылки между импортируемыми таблицами не проверяются
+            for target_buffer in targets:
+                target_buffer.foreign_keys = [
+                    _ForeignKeyCheck(db_connection, foreign_key) for foreign_key in target_buffer.table_info.foreign_keys
+                    if foreign_key.ref_table not in target_tables and set(foreign_key.columns) <= set(target_buffer.column_names)]
+            name_indexes = {column: (header_index[name_header], _load_name_index(db_connection, table_name,
+                                                                                get_table_info(table_name).primary_key, name_column))
+                            for column, (name_header, table_name, name_column) in (spec.name_lookups or {}).items()}
+
+            existing_keys = load_existing_keys(db_connection, target_tables[0], spec.key_column)
+
+            if use_transaction:
+                db_connection.transaction()
+            in_transaction = True
+            if spec.before_import is not None and not spec.before_import(db_connection):
+                rollback()
+                return False, "Ошибка при подготовке базы данных к импорту."
+
+            expected_length = len(header)
+            batch_first_row = None
+            for row_num, row in enumerate(reader, start=2): # Начинаем с 2, т.к. 1 - заголовок
+                if progress_callback is not None and row_num % PROGRESS_INTERVAL == 0:
+                    if progress_callback(row_num - 1) is False:
+                        rollback()
+                        return False, CANCELLED_MESSAGE
+
+                if not row or all(not cell.strip() for cell in row): # Пропускаем пустые строки
+                    continue
+                processed_count += 1
+                if len(row) != expected_length:
+                    errors.append(f"Строка {row_num}: Неверное количество столбцов ({len(row)} вместо {expected_length}). Пропущена.")
+                    continue
+
+                row_tables = []
+                row_errors = []
+                for target_buffer in targets:
+                    values, value_errors = _row_values(target_buffer, row)
+                    row_errors.extend(value_errors)
+                    row_tables.append(values)
+                if row_errors:
+                    errors.append(f"Строка {row_num}: {'; '.join(row_errors)}. Пропущена.")
+                    continue
+
+                key = row_tables[0].get(spec.key_column)
+                if key is None:
+                    errors.append(f"Строка {row_num}: Не указан {spec.key_column}. Пропущена.")
+                    continue
+                if str(key) in existing_keys:
+                    skipped_count += 1
+                    continue
+                existing_keys.add(str(key))
+
+                for target_buffer, values in zip(targets, row_tables):
+                    if target_buffer.target.optional and all(
+                            value is None for column, value in values.items() if column != spec.key_column):
+                        continue
+                    # ID по наименованию (например, сотрудник по ФИО), если ID не указан или не найден
+                    for column, (name_index, names) in name_indexes.items():
+                        name = row[name_index].strip().lower()
+                        if column in values and name and not target_buffer.is_known(column, values[column]):
+                            values[column] = names.get(name, values[column])
+                    for check in target_buffer.foreign_keys:
+                        warning = check.apply(values)
+                        if warning:
+                            errors.append(f"Строка {row_num}: {warning}.")
+                    target_buffer.append(values)
+                if batch_first_row is None:
+                    batch_first_row = row_num
+
+                if len(targets[0].buffers[0]) >= batch_size:
+                    failed = next((t for t in targets if not t.flush()), None)
+                    if failed is not None:
+                        rollback()
+                        return False, (f"Ошибка при вставке в таблицу '{failed.table_info.name}' из строк "
+                                       f"{batch_first_row}-{row_num}: {failed.query.lastError().text()}")
+                    batch_first_row = None
+
+            # Вставляем оставшиеся неполные пакеты (родительские таблицы раньше дочерних)
+            failed = next((t for t in targets if not t.flush()), None)
+            if failed is not None:
+                rollback()
+                return False, f"Ошибка при вставке в таблицу '{failed.table_info.name}': {failed.query.lastError().text()}"
+
+            if spec.after_import is not None and not spec.after_import(db_connection):
+                rollback()
+                return False, "Ошибка при завершении импорта (обновление индексов)."
+
+            in_transaction = False
+            if use_transaction:
+                if db_connection.commit():
+                    print(f"Транзакция импорта '{spec.name}' завершена успешно.")
+                    mark_tables_changed(*target_tables)
+                else:
+                    db_connection.rollback()
+                    return False, f"Ошибка при завершении транзакции: {db_connection.lastError().text()}"
+
+    except FileNotFoundError:
+        return False, f"Ошибка: Файл не найден по пути {file_path}"
+    except Exception as e:
+        if in_transaction:
+            rollback()
+        return False, f"Произошла ошибка при чтении или обработке файла: {e}"
+
+    summary_lines = [f"Импорт завершен: {spec.name}.", f"Обработано строк: {processed_count}"]
+    summary_lines += [f"{t.table_info.name}: добавлено {t.inserted}" for t in targets]
+    summary_lines.append(f"Пропущено (существующие ID): {skipped_count}")
+    if errors:
+        summary_lines.append(f"Ошибки и предупреждения ({len(errors)}):")
+        summary_lines += errors[:MAX_REPORTED_ERRORS]
+        if len(errors) > MAX_REPORTED_ERRORS:
+            summary_lines.append(f"... и еще {len(errors) - MAX_REPORTED_ERRORS}")
+    return True, "\n".join(summary_lines)
@@ -0,0 +1,230 @@
+# File: src/utils/parallel_csv.py
+# Параллельный разбор больших CSV: файл отображается в память (mmap) и делится на блоки
+# по границам строк, блоки разбираются и проверяются в отдельных процессах, а результаты
+# возвращаются в исходном порядке, чтобы запись в SQLite шла из одного потока.
+# Модуль не импортирует Qt: его загружают дочерние процессы.
+import os
+import io
+import csv
+import mmap
+import itertools
+import multiprocessing
+from collections import namedtuple
+
+# Размер блока, отдаваемого одному процессу
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+# Файлы меньше этого размера быстрее разобрать в одном процессе (запуск процессов не окупается)
+PARALLEL_MIN_FILE_SIZE = 16 * 1024 * 1024
+# Строк в блоке при последовательном разборе остатка файла (см. iter_parsed_blocks_parallel)
+SEQUENTIAL_BLOCK_ROWS = 10000
+# Метка, дописываемая после текста блока: если блок оборвался внутри поля в кавычках,
+# метка попадет в это поле, а не станет отдельной записью
+_CHUNK_END_MARK = "\ue000"
+
+
+ParsedBlock = namedtuple("ParsedBlock", ["row_numbers", "columns", "errors", "last_row"])
+ParsedBlock.__doc__ = """Разобранный блок строк CSV в виде столбцов (как их принимает execBatch).
+row_numbers - номера корректных строк в файле; columns - списки значений по столбцам;
+errors - [(номер строки, текст ошибки)]; last_row - номер последней строки блока."""
+
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 1) - 1) # Одно ядро остается потоку записи в базу
+
+
+def normalize_csv_row(row, column_names, column_digits):
+    """
+    Очищает и форматирует значения одной строки CSV.
+    Возвращает кортеж (значения, None) или (None, текст ошибки без номера строки).
+    """
+    if len(row) != len(column_names):
+        return None, f"Неверное количество столбцов ({len(row)} вместо {len(column_names)}). Пропущена."
+
+    processed_row_data = []
+    for col_name, cell_value in zip(column_names, row):
+        stripped_value = cell_value.strip()
+        formatted_value = stripped_value # По умолчанию используем исходное значение
+
+        # Проверяем, нужно ли форматировать этот столбец
+        if col_name in column_digits and stripped_value: # Форматируем только непустые значения
+            try:
+                # Пытаемся преобразовать в число и отформатировать
+                formatted_value = str(int(stripped_value)).zfill(column_digits[col_name])
+            except ValueError:
+                # Если не удалось преобразовать в число, это ошибка для этого столбца
+                return None, f"столбец '{col_name}': Значение '{stripped_value}' не является числом для форматирования. Строка пропущена."
+
+        processed_row_data.append(formatted_value)
+    return processed_row_data, None
+
+
+def parse_rows_to_block(rows, first_row_num, column_names, column_digits):
+    """Разбирает строки CSV (списки ячеек), пронумерованные начиная с first_row_num, в ParsedBlock."""
+    row_numbers = []
+    columns = [[] for _ in column_names]
+    errors = []
+    row_num = first_row_num - 1
+    for row_num, row in enumerate(rows, start=first_row_num):
+        if not row or all(not cell.strip() for cell in row): # Пустые строки пропускаются, но учитываются в нумерации
+            continue
+        values, error = normalize_csv_row(row, column_names, column_digits)
+        if error:
+            errors.append((row_num, error))
+            continue
+        row_numbers.append(row_num)
+        for column, value in zip(columns, values):
+            column.append(value)
+    return ParsedBlock(row_numbers, columns, errors, row_num)
+
+
+def _next_record_end(mm, position, quote_parity):
+    """
+    Ищет конец записи CSV начиная с position: перевод строки, перед которым число кавычек
+    от начала блока четное (перевод строки внутри поля в кавычках не является границей).
+    Непарная кавычка в поле без кавычек (например, 24" в модели монитора) сбивает четность;
+    такие границы отсеивает проверка в _parse_chunk.
+    Возвращает (позиция после перевода строки, четность) или (None, четность), если файл кончился.
+    """
+    while True:
+        newline = mm.find(b"\n", position)
+        if newline == -1:
+            return None, quote_parity
+        quote_parity ^= mm[position:newline].count(b'"') & 1
+        position = newline + 1
+        if not quote_parity:
+            return position, quote_parity
+
+
+def split_csv_file(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Делит файл на заголовок и блоки данных по границам записей.
+    Возвращает (header_bytes, [(начало, конец), ...]); пустой файл дает (b"", []).
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return b"", []
+    with open(file_path, "rb") as csv_file, mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end, _ = _next_record_end(mm, 0, 0)
+        if header_end is None:
+            return mm[:], []
+        header = mm[:header_end]
+
+        chunks = []
+        start = header_end
+        while start < file_size:
+            target = start + chunk_size
+            if target >= file_size:
+                chunks.append((start, file_size))
+                break
+            # Четность кавычек считается от начала блока, который всегда начинается с новой записи
+            parity = mm[start:target].count(b'"') & 1
+            end, _ = _next_record_end(mm, target, parity)
+            if end is None:
+                end = file_size
+            chunks.append((start, end))
+            start = end
+    return header, chunks
+
+
+def _parse_chunk(task):
+    """
+    Разбирает один блок файла в дочернем процессе; номера строк - от начала блока (с 1).
+    Возвращает None, если блок закончился внутри поля в кавычках, т.е. его граница
+    выбрана неверно и конец блока (и следующие блоки) нужно разбирать заново.
+    """
+    file_path, start, end, column_names, column_digits = task
+    with open(file_path, "rb") as csv_file:
+        csv_file.seek(start)
+        text = csv_file.read(end - start).decode("utf-8")
+    if text and not text.endswith("\n"):
+        text += "\n" # Последняя строка файла без перевода строки
+    reader = csv.reader(io.StringIO(text + _CHUNK_END_MARK, newline=""), delimiter=";")
+    last_row = []
+
+    def rows_before_mark():
+        # Строки отдаются с задержкой на одну, последняя (метка) остается в last_row
+        previous = next(reader)
+        for row in reader:
+            yield previous
+            previous = row
+        last_row.append(previous)
+
+    block = parse_rows_to_block(rows_before_mark(), 1, column_names, column_digits)
+    return block if last_row == [[_CHUNK_END_MARK]] else None
+
+
+def _iter_blocks_sequential(file_path, start, column_names, column_digits):
+    """ParsedBlock по SEQUENTIAL_BLOCK_ROWS строк от позиции start до конца файла (в текущем процессе)."""
+    with open(file_path, "rb") as raw_file:
+        raw_file.seek(start)
+        reader = csv.reader(io.TextIOWrapper(raw_file, encoding="utf-8", newline=""), delimiter=";")
+        first_row_num = 1
+        while True:
+            rows = list(itertools.islice(reader, SEQUENTIAL_BLOCK_ROWS))
+            if not rows:
+                return
+            yield parse_rows_to_block(rows, first_row_num, column_names, column_digits)
+            first_row_num += len(rows)
+
+
+def read_csv_header(header_bytes):
+    """Разбирает строку заголовка (с учетом BOM)."""
+    rows = list(csv.reader(io.StringIO(header_bytes.decode("utf-8-sig"), newline=""), delimiter=";"))
+    return rows[0] if rows else None
+
+
+def iter_parsed_blocks_parallel(file_path, chunks, column_names, column_digits, workers=None):
+    """
+    Генератор ParsedBlock в исходном порядке блоков файла. Номера строк пересчитываются
+    в сквозные так же, как при последовательном разборе (1 - заголовок).
+    Если граница блока оказалась внутри поля в кавычках (см. _next_record_end), файл от начала
+    этого блока разбирается в текущем процессе - результат совпадает с последовательным разбором.
+    При закрытии генератора (например, при отмене импорта) процессы завершаются.
+    """
+    tasks = [(file_path, start, end, column_names, column_digits) for start, end in chunks]
+    # spawn: дочерние процессы не наследуют состояние Qt и соединения с базой
+    context = multiprocessing.get_context("spawn")
+    rows_before = 1
+    sequential_start = None
+    with context.Pool(workers or default_worker_count()) as pool:
+        for (start, _), block in zip(chunks, pool.imap(_parse_chunk, tasks)):
+            if block is None:
+                sequential_start = start
+                break
+            yield _renumber_block(block, rows_before)
+            rows_before += block.last_row
+
+    if sequential_start is not None:
+        print(f"Граница блока файла '{file_path}' пришлась на поле в кавычках, остаток файла разбирается в одном процессе.")
+        for block in _iter_blocks_sequential(file_path, sequential_start, column_names, column_digits):
+            yield _renumber_block(block, rows_before)
+            rows_before += block.last_row
+
+
+def _renumber_block(block, rows_before):
+    """Переводит номера строк блока (от 1) в номера строк файла."""
+    return ParsedBlock([rows_before + row_num for row_num in block.row_numbers], block.columns,
+                       [(rows_before + row_num, error) for row_num, error in block.errors],
+                       rows_before + block.last_row)
+
+
+def _parse_file(task):
+    """Разбирает CSV-файл целиком (без заголовка) в ParsedBlock; строки нумеруются с 2."""
+    file_path, column_names, column_digits = task
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as csv_file:
+        reader = csv.reader(csv_file, delimiter=";")
+        next(reader, None)
+        return parse_rows_to_block(reader, 2, column_names, column_digits)
+
+
+def parse_csv_files(tasks, workers=None):
+    """
+    Разбирает несколько независимых CSV-файлов; задача - (путь, столбцы, column_digits).
+    При workers > 1 файлы разбираются одновременно в отдельных процессах.
+    Возвращает список ParsedBlock в порядке задач.
+    """
+    if not workers or workers <= 1 or len(tasks) <= 1:
+        return [_parse_file(task) for task in tasks]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(workers, len(tasks))) as pool:
+        return pool.map(_parse_file, tasks)
@@ -0,0 +1,220 @@
+# File: src/utils/pdf_writer.py
+# Потоковая запись больших таблиц в PDF через QPdfWriter/QPainter. Строки рисуются сразу по мере
+# чтения, страница за страницей; заголовки таблицы повторяются на каждой странице. Документ
+# целиком в памяти не строится (в отличие от QTextDocument), поэтому память не зависит от числа строк.
+# Для шрифтов нужен QGuiApplication (без дисплея - с QT_QPA_PLATFORM=offscreen).
+import os
+
+from PyQt5.QtCore import Qt, QRectF, QPointF, QLineF
+from PyQt5.QtGui import QPdfWriter, QPainter, QFont, QFontMetricsF, QPageSize, QPageLayout, QPen
+
+# Сколько строк рисуется между вызовами progress_callback
+ROWS_PER_CHUNK = 1000
+PDF_RESOLUTION = 300
+FONT_FAMILY = "DejaVu Sans" # Есть кириллица; при отсутствии Qt подберет замену
+TITLE_POINT_SIZE = 14
+TEXT_POINT_SIZE = 9
+TABLE_POINT_SIZE = 7
+CELL_PADDING = 0.2 # Отступ текста в ячейке, доля высоты строки шрифта
+MAX_CELL_LINES = 6 # Длинные значения переносятся не более чем на столько строк, остальное обрезается
+LINE_CACHE_SIZE = 10000 # Сколько значений столбца запоминается при расчете высоты строк
+
+_TEXT_FLAGS = Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap
+
+
+class _TablePainter:
+    """
+    Рисует таблицу постранично: переход на новую страницу, заголовки, номер страницы.
+    Сетка рисуется одной горизонтальной линией на строку и вертикальными линиями один раз
+    на страницу, текст в одну строку - от базовой линии, без разметки в прямоугольнике.
+    """
+
+    def __init__(self, writer, painter, headers, column_widths, page_rect):
+        self.writer = writer
+        self.painter = painter
+        self.headers = headers
+        self.page_rect = page_rect
+        self.page_number = 1
+
+        self.font = QFont(FONT_FAMILY)
+        self.font.setPointSizeF(TABLE_POINT_SIZE)
+        self.header_font = QFont(self.font)
+        self.header_font.setBold(True)
+        self.metrics = QFontMetricsF(self.font, writer)
+        self.header_metrics = QFontMetricsF(self.header_font, writer)
+        self.line_height = self.metrics.lineSpacing()
+        self.padding = self.line_height * CELL_PADDING
+        self.footer_height = self.line_height * 2
+
+        total = sum(column_widths)
+        self.column_x = []
+        self.column_widths = []
+        x = page_rect.left()
+        for width in column_widths:
+            pixel_width = page_rect.width() * width / total
+            self.column_x.append(x)
+            self.column_widths.append(pixel_width)
+            x += pixel_width
+        self.right = x
+        self.text_widths = [width - 2 * self.padding for width in self.column_widths]
+        # Число строк текста по значению для каждого столбца (значения часто повторяются)
+        self._line_counts = [{} for _ in column_widths]
+        self.y = page_rect.top()
+        self.table_top = self.y
+
+    def _bottom(self):
+        return self.page_rect.bottom() - self.footer_height
+
+    def _cell_lines(self, metrics, text, column):
+        """Сколько строк займет текст в столбце (быстрый путь - текст помещается в одну строку)."""
+        if "\n" not in text and metrics.horizontalAdvance(text) <= self.text_widths[column]:
+            return 1
+        rect = metrics.boundingRect(QRectF(0, 0, self.text_widths[column], self.line_height * MAX_CELL_LINES),
+                                    _TEXT_FLAGS, text)
+        return max(1, min(MAX_CELL_LINES, round(rect.height() / self.line_height)))
+
+    def _draw_row(self, texts, font, metrics):
+        line_counts = []
+        for column, text in enumerate(texts):
+            if not text:
+                line_counts.append(1)
+                continue
+            cache = self._line_counts[column]
+            lines = cache.get(text)
+            if lines is None:
+                if len(cache) >= LINE_CACHE_SIZE:
+                    cache.clear()
+                lines = cache[text] = self._cell_lines(metrics, text, column)
+            line_counts.append(lines)
+        height = max(line_counts) * self.line_height + 2 * self.padding
+        if self.y + height > self._bottom():
+            self.new_page()
+
+        painter = self.painter
+        painter.setFont(font)
+        top = self.y + self.padding
+        baseline = top + metrics.ascent()
+        for column, text in enumerate(texts):
+            if not text:
+                continue
+            x = self.column_x[column] + self.padding
+            if line_counts[column] == 1:
+                painter.drawText(QPointF(x, baseline), text)
+            else:
+                painter.drawText(QRectF(x, top, self.text_widths[column], height - 2 * self.padding), _TEXT_FLAGS, text)
+        self.y += height
+        painter.drawLine(QLineF(self.column_x[0], self.y, self.right, self.y))
+
+    def draw_header(self):
+        self.table_top = self.y
+        self.painter.drawLine(QLineF(self.column_x[0], self.y, self.right, self.y))
+        self._draw_row(self.headers, self.header_font, self.header_metrics)
+
+    def draw_row(self, values):
+        self._draw_row(["" if value is None else str(value) for value in values], self.font, self.metrics)
+
+    def _finish_page(self):
+        for x in self.column_x + [self.right]:
+            self.painter.drawLine(QLineF(x, self.table_top, x, self.y))
+        self.painter.setFont(self.font)
+        footer = QRectF(self.page_rect.left(), self._bottom() + self.line_height * 0.5,
+                        self.page_rect.width(), self.line_height)
+        self.painter.drawText(footer, Qt.AlignRight | Qt.AlignVCenter, f"Страница {self.page_number}")
+
+    def new_page(self):
+        self._finish_page()
+        self.writer.newPage()
+        self.page_number += 1
+        self.y = self.page_rect.top()
+        self.draw_header()
+
+    def finish(self):
+        self._finish_page()
+
+
+def _column_widths(headers, sample_rows):
+    """Относительные ширины столбцов по длине заголовков (самого длинного слова) и значений первых строк."""
+    widths = [max(max(len(word) for word in header.split()) + 2, 4) for header in headers]
+    for row in sample_rows:
+        for column, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            widths[column] = max(widths[column], min(length, 40))
+    return widths
+
+
+def write_pdf_table(file_path, title, paragraphs, headers, rows, progress_callback=None, empty_text=None):
+    """
+    Сохраняет PDF (A4, альбомная ориентация) с заголовком title, абзацами paragraphs и таблицей
+    headers/rows в file_path. Параметры и результат - как у write_docx_table: rows читается один
+    раз по мере рисования, progress_callback(записано_строк) вызывается каждые ROWS_PER_CHUNK
+    строк (False прерывает запись и удаляет файл). Возвращает количество строк или None при отмене.
+    """
+    rows = iter(rows)
+    # Ширины столбцов оцениваются по первой порции строк
+    first_rows = []
+    for values in rows:
+        first_rows.append(values)
+        if len(first_rows) >= ROWS_PER_CHUNK:
+            break
+
+    writer = QPdfWriter(file_path)
+    writer.setResolution(PDF_RESOLUTION)
+    writer.setPageSize(QPageSize(QPageSize.A4))
+    writer.setPageOrientation(QPageLayout.Landscape)
+    writer.setTitle(title)
+    page_rect = QRectF(writer.pageLayout().paintRectPixels(writer.resolution()))
+    page_rect.moveTo(0, 0) # Координаты QPainter отсчитываются от области печати
+
+    painter = QPainter()
+    if not painter.begin(writer):
+        raise OSError(f"Не удалось открыть файл '{file_path}' для записи PDF.")
+    row_count = 0
+    cancelled = False
+    try:
+        painter.setPen(QPen(Qt.black, 0)) # Линии минимальной толщины
+
+        title_font = QFont(FONT_FAMILY)
+        title_font.setPointSizeF(TITLE_POINT_SIZE)
+        title_font.setBold(True)
+        text_font = QFont(FONT_FAMILY)
+        text_font.setPointSizeF(TEXT_POINT_SIZE)
+        y = 0.0
+        for text, font in [(title, title_font)] + [(paragraph, text_font) for paragraph in paragraphs]:
+            painter.setFont(font)
+            rect = painter.boundingRect(QRectF(0, y, page_rect.width(), page_rect.height()), _TEXT_FLAGS, text)
+            painter.drawText(rect, _TEXT_FLAGS, text)
+            y = rect.bottom() + QFontMetricsF(font, writer).lineSpacing() * 0.5
+
+        table = _TablePainter(writer, painter, headers, _column_widths(headers, first_rows), page_rect)
+        table.y = y
+        table.draw_header()
+
+        for values in first_rows:
+            table.draw_row(values)
+        row_count = len(first_rows)
+        chunk_count = 0
+        if row_count >= ROWS_PER_CHUNK and progress_callback is not None and progress_callback(row_count) is False:
+            cancelled = True
+        if not cancelled:
+            for values in rows:
+                table.draw_row(values)
+                row_count += 1
+                chunk_count += 1
+                if chunk_count >= ROWS_PER_CHUNK:
+                    chunk_count = 0
+                    if progress_callback is not None and progress_callback(row_count) is False:
+                        cancelled = True
+                        break
+
+        if row_count == 0 and empty_text:
+            painter.setFont(text_font)
+            painter.drawText(QRectF(0, table.y + table.line_height, page_rect.width(), table.line_height * 2),
+                             _TEXT_FLAGS, empty_text)
+        table.finish()
+    finally:
+        painter.end()
+
+    if cancelled:
+        os.remove(file_path)
+        return None
+    return row_count
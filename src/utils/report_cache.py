@@ -0,0 +1,254 @@
+# File: src/utils/report_cache.py
+# Кэш результатов запросов отчетов. Повторное формирование отчета с теми же фильтрами
+# (например, после правки оформления) не выполняет запрос заново, пока данные не изменились.
+# Небольшие результаты хранятся в памяти (LRU по общему числу строк), большие и вытесненные
+# из памяти - при заданном каталоге cache_dir в config.ini - на диске, порциями pickle.
+# Модуль не импортирует Qt: ключ и версию данных вычисляет вызывающий код (см. report_model).
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+import configparser
+from collections import OrderedDict
+
+from database import CONFIG_FILE
+
+# Сколько строк всех результатов одновременно держится в памяти
+REPORT_CACHE_MAX_ROWS = 100000
+# Сколько результатов хранится на диске (старые файлы удаляются)
+REPORT_CACHE_DISK_ENTRIES = 16
+# Строк в одной порции pickle в файле кэша
+SPILL_CHUNK_ROWS = 5000
+CACHE_FILE_SUFFIX = ".report-cache"
+
+
+def load_report_cache_dir():
+    """Каталог кэша отчетов на диске из config.ini ([reports] cache_dir) или None."""
+    config = configparser.ConfigParser()
+    if config.read(CONFIG_FILE, encoding="utf-8"):
+        cache_dir = config.get("reports", "cache_dir", fallback="").strip()
+        if cache_dir:
+            return cache_dir
+    return None
+
+
+def normalize_filters(filters):
+    """Фильтры отчета в виде кортежа, не зависящего от порядка ключей и пустых значений."""
+    normalized = []
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        normalized.append((name, value))
+    return tuple(sorted(normalized))
+
+
+def database_file_stamp(database_path):
+    """
+    Отметка файлов базы (время изменения и размер основного файла и журнала WAL).
+    Меняется после записи из любого соединения, в том числе из другого процесса.
+    """
+    stamp = []
+    for path in (database_path, database_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class ReportCache:
+    """
+    Результаты отчетов по ключу; каждая запись хранит версию данных (token), с которой
+    она получена, и при несовпадении версии считается устаревшей.
+    Доступ защищен блокировкой: отчеты формируются в фоновых потоках.
+    """
+
+    def __init__(self, max_rows=REPORT_CACHE_MAX_ROWS, cache_dir=None, disk_entries=REPORT_CACHE_DISK_ENTRIES):
+        self.max_rows = max_rows
+        self.cache_dir = cache_dir
+        self.disk_entries = disk_entries
+        self._entries = OrderedDict() # {ключ: (token, строки)}, последние использованные - в конце
+        self._row_count = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._row_count = 0
+        for path in self._disk_files():
+            self._remove_file(path)
+
+    def get(self, key, token):
+        """Строки результата (итерируемый объект) или None, если записи нет или она устарела."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == token:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                self._drop(key)
+        return self._read_disk(key, token)
+
+    def record(self, key, token, rows):
+        """
+        Генератор, передающий строки rows дальше и сохраняющий их в кэш. Результат
+        сохраняется, только если строки прочитаны до конца (отмена не оставляет в кэше
+        неполный результат).
+        """
+        memory_rows = []
+        spill_file = None
+        spill_chunk = []
+        try:
+            for row in rows:
+                yield row
+                if memory_rows is not None:
+                    memory_rows.append(row)
+                    if len(memory_rows) > self.max_rows:
+                        # Слишком большой результат пишется на диск, а без кэша на диске не сохраняется
+                        if self.cache_dir:
+                            try:
+                                spill_file = self._open_spill_file(key, token)
+                                spill_chunk = memory_rows
+                            except OSError as e:
+                                print(f"Предупреждение: Не удалось создать файл кэша отчета: {e}")
+                        memory_rows = None
+                elif spill_file is not None:
+                    spill_chunk.append(row)
+                if spill_file is not None and len(spill_chunk) >= SPILL_CHUNK_ROWS:
+                    pickle.dump(spill_chunk, spill_file, pickle.HIGHEST_PROTOCOL)
+                    spill_chunk = []
+
+            if memory_rows is not None:
+                self.put(key, token, memory_rows)
+            elif spill_file is not None:
+                if spill_chunk:
+                    pickle.dump(spill_chunk, spill_file, pickle.HIGHEST_PROTOCOL)
+                spill_file.close()
+                os.replace(spill_file.name, self._disk_path(key))
+                spill_file = None
+                self._touch(self._disk_path(key))
+                self._prune_disk()
+        finally:
+            if spill_file is not None:
+                spill_file.close()
+                self._remove_file(spill_file.name)
+
+    def put(self, key, token, rows):
+        """Сохраняет результат в памяти; вытесненные записи переносятся на диск (если он задан)."""
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (token, rows)
+            self._row_count += len(rows)
+            while self._row_count > self.max_rows and len(self._entries) > 1:
+                old_key, (old_token, old_rows) = self._entries.popitem(last=False)
+                self._row_count -= len(old_rows)
+                evicted.append((old_key, old_token, old_rows))
+        for old_key, old_token, old_rows in evicted:
+            self._write_disk(old_key, old_token, old_rows)
+
+    def _drop(self, key):
+        token, rows = self._entries.pop(key)
+        self._row_count -= len(rows)
+
+    # --- Кэш на диске ---
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_FILE_SUFFIX)
+
+    def _disk_files(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith(CACHE_FILE_SUFFIX)]
+
+    @staticmethod
+    def _touch(path):
+        """
+        Время изменения файла служит отметкой последнего использования. Задается явно с точностью
+        до наносекунд: время, которое ставит сама файловая система, огрубляется, и файлы, записанные
+        подряд, получали бы одинаковую отметку.
+        """
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _open_spill_file(self, key, token):
+        """Временный файл в каталоге кэша; первая порция - (ключ, token)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        handle, path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(handle)
+        spill_file = open(path, "wb")
+        pickle.dump((key, token), spill_file, pickle.HIGHEST_PROTOCOL)
+        return spill_file
+
+    def _write_disk(self, key, token, rows):
+        if not self.cache_dir:
+            return
+        spill_file = None
+        try:
+            spill_file = self._open_spill_file(key, token)
+            for start in range(0, len(rows), SPILL_CHUNK_ROWS):
+                pickle.dump(rows[start:start + SPILL_CHUNK_ROWS], spill_file, pickle.HIGHEST_PROTOCOL)
+            spill_file.close()
+            os.replace(spill_file.name, self._disk_path(key))
+            spill_file = None
+            self._touch(self._disk_path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"Предупреждение: Не удалось сохранить результат отчета в кэш на диске: {e}")
+        finally:
+            if spill_file is not None:
+                spill_file.close()
+                self._remove_file(spill_file.name)
+
+    def _prune_disk(self):
+        files = sorted(self._disk_files(), key=lambda path: os.stat(path).st_mtime_ns, reverse=True)
+        for path in files[self.disk_entries:]:
+            self._remove_file(path)
+
+    def _read_disk(self, key, token):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            cache_file = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            stored_key, stored_token = pickle.load(cache_file)
+        except Exception:
+            stored_key = stored_token = None
+        if stored_key != key or stored_token != token:
+            cache_file.close()
+            self._remove_file(path)
+            return None
+        self._touch(path)
+        return self._iter_disk_rows(cache_file)
+
+    @staticmethod
+    def _iter_disk_rows(cache_file):
+        with cache_file:
+            while True:
+                try:
+                    chunk = pickle.load(cache_file)
+                except EOFError:
+                    return
+                yield from chunk
+
+
+# Общий кэш процесса (отчеты формируются в разных потоках с разными соединениями)
+report_cache = ReportCache(cache_dir=load_report_cache_dir())
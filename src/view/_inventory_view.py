@@ -3,12 +3,21 @@ import sys
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTableView, QPushButton,
                              QHBoxLayout, QLineEdit, QLabel, QDialog,
                              QDialogButtonBox, QMessageBox, QComboBox,
-                             QFormLayout, QDateEdit, QTextEdit) # Добавляем QTextEdit
-from PyQt5.QtSql import QSqlTableModel, QSqlQuery, QSqlDatabase, QSqlRelation, QSqlRelationalTableModel, QSqlError # Используем QSqlRelationalTableModel
+                             QFormLayout, QDateEdit, QTextEdit, QFileDialog) # Добавляем QTextEdit
+from PyQt5.QtSql import QSqlQuery
 from PyQt5.QtCore import Qt, QModelIndex, QDate, QVariant # Добавляем QVariant
 
 # Импортируем схему базы данных
-from database import DATABASE_SCHEMA
+from database import get_column_names, INVENTORY_FTS_TABLE, INVENTORY_FTS_COLUMNS, inventory_fts_available, mark_tables_changed
+from src.utils.inventory_search import build_fts_match
+from src.model.paged_sql_model import PagedSqlTableModel
+from src.utils.background_jobs import run_database_job
+from src.utils.multi_table_import import import_multi_table_csv, UNITS_INVENTORY_IMPORT
+from src.utils.csv_handler import export_data_to_csv, EXPORT_FILE_FILTER
+from src.utils.lookup_cache import get_lookup, get_subcategories, populate_combo, select_combo_item
+
+# Поля диалога, которые сохраняются в Units_extended_info
+EXTENDED_INFO_COLUMNS = frozenset(get_column_names("Units_extended_info"))
 
 # --- Диалог для добавления/редактирования объекта инвентаризации ---
 class InventoryItemDialog(QDialog):
@@ -41,6 +50,7 @@ class InventoryItemDialog(QDialog):
         self.subcategory_combo = QComboBox() # Будет зависеть от категории
         self.unit_type_combo = QComboBox()
         self.order_status_combo = QComboBox()
+        self.employee_combo = QComboBox()
 
         # Поля из Units_extended_info
         self.device_name_input = QLineEdit()
@@ -67,6 +77,7 @@ class InventoryItemDialog(QDialog):
         self.layout.addRow("Подкатегория:", self.subcategory_combo)
         self.layout.addRow("Тип единицы:", self.unit_type_combo)
         self.layout.addRow("Статус заказа:", self.order_status_combo)
+        self.layout.addRow("Сотрудник:", self.employee_combo)
 
         self.layout.addRow(QLabel("<b>Расширенная информация:</b>")) # Разделитель
 
@@ -115,6 +126,7 @@ class InventoryItemDialog(QDialog):
             self._select_combo_item(self.subcategory_combo, self.item_data.get('id_subcategory'))
             self._select_combo_item(self.unit_type_combo, self.item_data.get('id_unit_type'))
             self._select_combo_item(self.order_status_combo, self.item_data.get('id_order_status'))
+            self._select_combo_item(self.employee_combo, self.item_data.get('id_employee'))
 
             # Заполняем поля расширенной информации
             self.device_name_input.setText(str(self.item_data.get('device_name', '')))
@@ -132,24 +144,15 @@ class InventoryItemDialog(QDialog):
         self.layout.addWidget(self.button_box)
 
     def _populate_combos(self):
-        """Заполняет все QComboBox данными из справочных таблиц."""
-        self._populate_category_combo()
-        self._populate_unit_type_combo()
-        self._populate_order_status_combo()
+        """Заполняет все QComboBox данными из кэша справочников (без запросов к базе при повторном открытии)."""
+        populate_combo(self.category_combo, get_lookup(self.db, "Category").items, "Выберите категорию")
+        populate_combo(self.unit_type_combo, get_lookup(self.db, "Unit_type").items, "Выберите тип единицы")
+        populate_combo(self.order_status_combo, get_lookup(self.db, "Order_status").items, "Выберите статус")
+        populate_combo(self.employee_combo, get_lookup(self.db, "Employee").items, "Не закреплен")
         # Подкатегории заполняются при выборе категории или изначально все
         self._populate_subcategory_combo()
 
 
-    def _populate_category_combo(self):
-        """Заполняет QComboBox категориями."""
-        self.category_combo.clear()
-        self.category_combo.addItem("Выберите категорию", None)
-        query = QSqlQuery("SELECT id_category, category FROM Category ORDER BY category", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.category_combo.addItem(item_name, item_id)
-
     def _update_subcategory_combo(self, index):
         """Обновляет QComboBox подкатегориями в зависимости от выбранной категории."""
         category_id = self.category_combo.itemData(index)
@@ -158,60 +161,12 @@ class InventoryItemDialog(QDialog):
 
     def _populate_subcategory_combo(self, category_id=None):
         """Заполняет QComboBox подкатегориями, опционально фильтруя по категории."""
-        self.subcategory_combo.clear()
-        self.subcategory_combo.addItem("Выберите подкатегорию", None)
-        query = QSqlQuery(self.db)
-        sql = "SELECT id_subcategory, subcategory FROM Subcategory"
-        params = []
-        if category_id is not None:
-             sql += " WHERE id_category = ?"
-             params.append(category_id)
-        sql += " ORDER BY subcategory"
-
-        query.prepare(sql)
-        for param in params:
-             query.addBindValue(param)
+        populate_combo(self.subcategory_combo, get_subcategories(self.db).items(category_id), "Выберите подкатегорию")
 
-        if query.exec_():
-            while query.next():
-                item_id = query.value(0)
-                item_name = query.value(1)
-                self.subcategory_combo.addItem(item_name, item_id)
-        else:
-            print("Ошибка при загрузке подкатегорий:", query.lastError().text())
-
-
-    def _populate_unit_type_combo(self):
-        """Заполняет QComboBox типами единиц."""
-        self.unit_type_combo.clear()
-        self.unit_type_combo.addItem("Выберите тип единицы", None)
-        query = QSqlQuery("SELECT id_unit_type, unit_type FROM Unit_type ORDER BY unit_type", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.unit_type_combo.addItem(item_name, item_id)
-
-    def _populate_order_status_combo(self):
-        """Заполняет QComboBox статусами заказов."""
-        self.order_status_combo.clear()
-        self.order_status_combo.addItem("Выберите статус", None)
-        query = QSqlQuery("SELECT id_order_status, order_status FROM Order_status ORDER BY order_status", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.order_status_combo.addItem(item_name, item_id)
 
     def _select_combo_item(self, combo_box, item_id):
         """Выбирает элемент в комбобоксе по его UserData (ID)."""
-        if item_id is None:
-            combo_box.setCurrentIndex(0) # Выбираем "Выберите..." или "Все..."
-            return
-        for i in range(combo_box.count()):
-            if combo_box.itemData(i) == item_id:
-                combo_box.setCurrentIndex(i)
-                return
-        # Если ID не найден, оставляем выбранным первый элемент (None)
-        combo_box.setCurrentIndex(0)
+        select_combo_item(combo_box, item_id)
 
 
     def get_data(self):
@@ -233,6 +188,7 @@ class InventoryItemDialog(QDialog):
             'id_subcategory': self.subcategory_combo.currentData(),
             'id_unit_type': self.unit_type_combo.currentData(),
             'id_order_status': self.order_status_combo.currentData(),
+            'id_employee': self.employee_combo.currentData(),
 
             # Units_extended_info fields
             'device_name': self.device_name_input.text().strip(),
@@ -288,34 +244,21 @@ class InventoryView(QWidget):
         # --- Настройки модели и таблицы ---
         self.table_name = "Units_inventory" # Основная таблица
 
-        # Используем QSqlRelationalTableModel для отображения связанных данных
-        self.model = QSqlRelationalTableModel(self, self.db)
-        self.model.setTable(self.table_name)
+        # Постраничная модель: строки читаются порциями по мере прокрутки (keyset-пагинация),
+        # названия связанных записей подставляются через LEFT JOIN, поэтому объекты
+        # без категории/типа/статуса не пропадают из списка
+        col_names_in_schema = get_column_names(self.table_name)
 
-        # Устанавливаем связи для столбцов внешних ключей
-        # Получаем индексы столбцов из схемы БД
-        col_names_in_schema = [col.split()[0] for col in DATABASE_SCHEMA.get(self.table_name, []) if not col.strip().startswith("FOREIGN KEY")]
-
-        relation_columns = {
+        self.relation_columns = relation_columns = {
             "id_category": ("Category", "id_category", "category"),
-            "id_subcategory": ("Subcategory", "id_subcategory", "subcategory"),
+            # Подкатегория идентифицируется парой (id_category, id_subcategory)
+            "id_subcategory": ("Subcategory", "id_subcategory", "subcategory", {"id_category": "id_category"}),
             "id_unit_type": ("Unit_type", "id_unit_type", "unit_type"),
             "id_order_status": ("Order_status", "id_order_status", "order_status"),
+            "id_employee": ("Employee", "id_employee", "fio"),
         }
 
-        for col_name, relation_info in relation_columns.items():
-            if col_name in col_names_in_schema:
-                col_index = col_names_in_schema.index(col_name)
-                self.model.setRelation(col_index, QSqlRelation(*relation_info))
-            else:
-                print(f"Предупреждение: Столбец '{col_name}' не найден в схеме {self.table_name}.")
-
-
-        self.model.setEditStrategy(QSqlTableModel.OnManualSubmit) # Изменения сохраняем вручную
-        self.model.select() # Загрузить данные из таблицы
-
-        # Устанавливаем заголовки столбцов (соответствуют порядку в SELECT запросе или модели)
-        # Используем названия столбцов из схемы для определения порядка
+        # Заголовки столбцов
         header_labels = {
             "id_unit_inventory": "ID",
             "inventory_number": "Инв. номер",
@@ -331,16 +274,31 @@ class InventoryView(QWidget):
             "id_subcategory": "Подкатегория", # Будет отображаться имя
             "id_unit_type": "Тип единицы", # Будет отображаться имя
             "id_order_status": "Статус заказа", # Будет отображаться имя
+            "id_employee": "Сотрудник", # Будет отображаться ФИО
             # Поля из Units_extended_info не отображаются напрямую в этой модели
         }
 
-        # Устанавливаем заголовки в модели
-        for i, col_name in enumerate(col_names_in_schema):
-             if col_name in header_labels:
-                self.model.setHeaderData(i, Qt.Horizontal, header_labels[col_name])
-             else:
-                self.model.setHeaderData(i, Qt.Horizontal, col_name) # Используем имя столбца по умолчанию
+        self.model = PagedSqlTableModel(self.db, self.table_name, col_names_in_schema,
+                                        relations=relation_columns, headers=header_labels,
+                                        key_column="id_unit_inventory", parent=self)
+        if not self.model.reload():
+            print("Ошибка загрузки объектов инвентаризации:", self.model.last_error())
+
+
+        # --- Строка поиска ---
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск: инв./сер. номер, производитель, модель, кабинет, примечание, имя устройства, IP...")
+        search_button = QPushButton("Найти")
+        reset_search_button = QPushButton("Сбросить")
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(search_button)
+        search_layout.addWidget(reset_search_button)
+        self.layout.addLayout(search_layout)
 
+        self.search_input.returnPressed.connect(self._apply_search)
+        search_button.clicked.connect(self._apply_search)
+        reset_search_button.clicked.connect(self._reset_search)
 
         self.table_view = QTableView()
         self.table_view.setModel(self.model)
@@ -348,6 +306,9 @@ class InventoryView(QWidget):
         id_col_index = col_names_in_schema.index("id_unit_inventory") if "id_unit_inventory" in col_names_in_schema else -1
         if id_col_index != -1:
              self.table_view.hideColumn(id_col_index)
+             # Сортировка по щелчку на заголовке; по умолчанию - в порядке добавления
+             self.table_view.horizontalHeader().setSortIndicator(id_col_index, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
 
         self.table_view.horizontalHeader().setStretchLastSection(True)
         self.table_view.setSelectionBehavior(QTableView.SelectRows)
@@ -364,12 +325,16 @@ class InventoryView(QWidget):
         edit_button = QPushButton("Редактировать выбранный")
         delete_button = QPushButton("Удалить выбранный")
         refresh_button = QPushButton("Обновить список") # Добавим кнопку обновления
+        import_button = QPushButton("Импорт из CSV")
+        export_button = QPushButton("Экспорт в CSV")
 
         buttons_layout.addWidget(add_button)
         buttons_layout.addWidget(edit_button)
         buttons_layout.addWidget(delete_button)
         buttons_layout.addWidget(refresh_button)
         buttons_layout.addStretch()
+        buttons_layout.addWidget(import_button)
+        buttons_layout.addWidget(export_button)
 
         self.layout.addLayout(buttons_layout)
 
@@ -378,19 +343,58 @@ class InventoryView(QWidget):
         edit_button.clicked.connect(self._edit_item)
         delete_button.clicked.connect(self._delete_item)
         refresh_button.clicked.connect(self._refresh_list)
-
-        # Подключаем сигнал model.primeInsert() для установки значений по умолчанию при добавлении новой строки
-        self.model.primeInsert.connect(self._init_new_row)
-        # Подключаем сигнал model.dataChanged для обработки ошибок сохранения (при OnManualSubmit не так критично, но полезно)
-        self.model.dataChanged.connect(self._handle_data_changed)
-
+        import_button.clicked.connect(self._import_inventory)
+        export_button.clicked.connect(self._export_inventory)
 
     def _refresh_list(self):
         """Обновляет данные в таблице."""
-        self.model.select() # Перезагружаем данные из базы
+        self.model.reload() # Перезагружаем первую страницу из базы
         print("Список объектов инвентаризации обновлен.")
 
 
+    def _import_inventory(self):
+        """Импортирует полную выгрузку инвентаризации (Units_inventory + Units_extended_info) из CSV."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Импорт инвентаризации", "",
+                                                   "CSV файлы (*.csv);;Все файлы (*)")
+        if not file_path:
+            print("Выбор файла отменен.")
+            return
+        print(f"Выбран файл для импорта инвентаризации: {file_path}")
+        # Импорт выполняется в фоновом потоке, результат приходит в _on_import_finished
+        run_database_job(self, "Импорт инвентаризации", self.db,
+                         lambda db, progress: import_multi_table_csv(db, file_path, UNITS_INVENTORY_IMPORT, progress_callback=progress),
+                         self._on_import_finished)
+
+    def _export_inventory(self):
+        """
+        Экспортирует всю инвентаризацию в CSV: идентификаторы дополняются наименованиями
+        связанных записей, а дополнительные сведения (Units_extended_info) - их столбцами.
+        """
+        file_path, _ = QFileDialog.getSaveFileName(self, "Экспорт инвентаризации", f"{self.table_name}.csv", EXPORT_FILE_FILTER)
+        if not file_path:
+            print("Выбор файла отменен.")
+            return
+        relations = dict(self.relation_columns)
+        relations["id_unit_inventory"] = ("Units_extended_info", "id_unit_inventory",
+                                          tuple(col for col in get_column_names("Units_extended_info") if col != "id_unit_inventory"))
+        print(f"Выбран файл для экспорта инвентаризации: {file_path}")
+        run_database_job(self, "Экспорт инвентаризации", self.db,
+                         lambda db, progress: export_data_to_csv(db, file_path, self.table_name, progress_callback=progress, relations=relations),
+                         self._on_export_finished)
+
+    def _on_export_finished(self, success, message):
+        if success:
+            QMessageBox.information(self, "Экспорт завершен", message)
+        else:
+            QMessageBox.critical(self, "Ошибка экспорта", message)
+
+    def _on_import_finished(self, success, message):
+        if success:
+            QMessageBox.information(self, "Импорт завершен", message)
+            self.model.reload()
+        else:
+            QMessageBox.critical(self, "Ошибка импорта", message)
+
     def _add_item(self):
         """Открывает диалог для добавления нового объекта инвентаризации."""
         dialog = InventoryItemDialog(self.db, parent=self)
@@ -398,43 +402,22 @@ class InventoryView(QWidget):
             if dialog.validate_data():
                 data = dialog.get_data()
 
-                # Добавляем новую запись в Units_inventory через модель
-                row_count = self.model.rowCount()
-                self.model.insertRow(row_count)
+                self._init_new_row(data)
 
-                # Устанавливаем данные в модель Units_inventory
-                # Используем fieldIndex для надежности
-                field_indices = {col: self.model.fieldIndex(col) for col in data if col in [c.split()[0] for c in DATABASE_SCHEMA.get(self.table_name, [])]}
-
-                for key, value in data.items():
-                    if key in field_indices and field_indices[key] != -1:
-                         # Преобразуем None в QVariant(QVariant.Type.Int) для INTEGER полей, если нужно
-                         # Или просто передаем None, SQLite обычно обрабатывает это как NULL
-                         self.model.setData(self.model.index(row_count, field_indices[key]), value)
-
-
-                # Сохраняем изменения в Units_inventory
-                if self.model.submitAll():
+                # Добавляем новую запись в Units_inventory
+                success, new_item_id = self.model.insert_record(data)
+                if success:
                     print("Объект инвентаризации успешно добавлен в Units_inventory.")
 
-                    # Получаем ID только что добавленной записи
-                    # Это можно сделать, выбрав модель заново или выполнив запрос
-                    self.model.select() # Обновляем модель, чтобы получить новый ID
-                    # Находим добавленную строку (например, по инвентарному номеру, если он уникален)
-                    # Или просто берем последнюю строку, если уверены, что она наша
-                    new_row_index = self.model.rowCount() - 1
-                    new_item_id = self.model.data(self.model.index(new_row_index, self.model.fieldIndex("id_unit_inventory")), Qt.EditRole)
-
                     # Если есть данные для Units_extended_info, добавляем их
-                    extended_info_data = {k: data[k] for k in data if k in [c.split()[0] for c in DATABASE_SCHEMA.get("Units_extended_info", [])]}
+                    extended_info_data = {k: data[k] for k in data if k in EXTENDED_INFO_COLUMNS}
                     if any(extended_info_data.values()): # Если хотя бы одно поле расширенной инфо заполнено
                          self._add_extended_info(new_item_id, extended_info_data)
 
-
+                    self.model.refresh_key(new_item_id) # Расширенная информация влияет на совпадение с поиском
                 else:
-                    print("Ошибка при добавлении объекта в Units_inventory:", self.model.lastError().text())
-                    QMessageBox.critical(self, "Ошибка", f"Не удалось добавить объект: {self.model.lastError().text()}")
-                    self.model.revertAll() # Отменяем изменения в Units_inventory
+                    print("Ошибка при добавлении объекта в Units_inventory:", new_item_id)
+                    QMessageBox.critical(self, "Ошибка", f"Не удалось добавить объект: {new_item_id}")
 
 
     def _add_extended_info(self, unit_inventory_id, extended_info_data):
@@ -456,6 +439,7 @@ class InventoryView(QWidget):
 
         if query.exec_():
             print(f"Расширенная информация успешно добавлена для ID {unit_inventory_id}.")
+            mark_tables_changed("Units_extended_info")
         else:
             print(f"Ошибка при добавлении расширенной информации для ID {unit_inventory_id}:", query.lastError().text())
             QMessageBox.warning(self, "Предупреждение", f"Не удалось добавить расширенную информацию для объекта (ID {unit_inventory_id}): {query.lastError().text()}")
@@ -473,17 +457,13 @@ class InventoryView(QWidget):
         row = selected_index.row()
 
         # Получаем ID объекта инвентаризации
-        item_id = self.model.data(self.model.index(row, self.model.fieldIndex("id_unit_inventory")), Qt.EditRole)
+        item_id = self.model.row_key(row)
         if item_id is None:
              QMessageBox.warning(self, "Ошибка", "Не удалось получить ID выбранного объекта.")
              return
 
         # Получаем текущие данные из Units_inventory через модель
-        item_data = {}
-        for col_name in [c.split()[0] for c in DATABASE_SCHEMA.get(self.table_name, []) if not c.strip().startswith("FOREIGN KEY")]:
-             col_index = self.model.fieldIndex(col_name)
-             if col_index != -1:
-                item_data[col_name] = self.model.data(self.model.index(row, col_index), Qt.EditRole)
+        item_data = self.model.row_data(row)
 
         # Получаем данные из Units_extended_info (если есть)
         extended_info_query = QSqlQuery(self.db)
@@ -517,18 +497,13 @@ class InventoryView(QWidget):
              if dialog.validate_data():
                 new_data = dialog.get_data()
 
-                # Обновляем данные в Units_inventory через модель
-                field_indices = {col: self.model.fieldIndex(col) for col in new_data if col in [c.split()[0] for c in DATABASE_SCHEMA.get(self.table_name, [])]}
-                for key, value in new_data.items():
-                    if key in field_indices and field_indices[key] != -1:
-                         self.model.setData(self.model.index(row, field_indices[key]), value)
-
-                # Сохраняем изменения в Units_inventory
-                if self.model.submitAll():
+                # Обновляем данные в Units_inventory
+                success, error_text = self.model.update_record(row, new_data)
+                if success:
                     print(f"Объект инвентаризации с ID {item_id} успешно отредактирован в Units_inventory.")
 
                     # Обновляем или добавляем данные в Units_extended_info
-                    extended_info_data = {k: new_data[k] for k in new_data if k in [c.split()[0] for c in DATABASE_SCHEMA.get("Units_extended_info", [])]}
+                    extended_info_data = {k: new_data[k] for k in new_data if k in EXTENDED_INFO_COLUMNS}
                     existing_extended_info_id = item_data.get('extended_info_id_unit_inventory') # ID существующей записи в Units_extended_info (равен item_id)
 
                     if any(extended_info_data.values()): # Если есть данные для сохранения в Units_extended_info
@@ -543,12 +518,12 @@ class InventoryView(QWidget):
                          self._delete_extended_info(item_id)
 
 
-                    self.model.select() # Обновляем представление после редактирования
+                    # Строка в модели уже обновлена; перечитываем ее еще раз, т.к. расширенная информация влияет на поиск
+                    self.model.refresh_key(item_id)
 
                 else:
-                    print("Ошибка при сохранении изменений в Units_inventory:", self.model.lastError().text())
-                    QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить изменения: {self.model.lastError().text()}")
-                    self.model.revertAll() # Отменяем изменения в Units_inventory
+                    print("Ошибка при сохранении изменений в Units_inventory:", error_text)
+                    QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить изменения: {error_text}")
 
 
     def _update_extended_info(self, unit_inventory_id, extended_info_data):
@@ -556,4 +531,89 @@ class InventoryView(QWidget):
         query = QSqlQuery(self.db)
         # Формируем SQL запрос для обновления
         set_clauses = [f"{col} = ?" for col in extended_info_data.keys()]
-        update_sql = f"UPDATE Units_extended_info SET {', '.join(
+        update_sql = f"UPDATE Units_extended_info SET {', '.join(set_clauses)} WHERE id_unit_inventory = ?"
+
+        query.prepare(update_sql)
+        for key in extended_info_data.keys():
+             query.addBindValue(extended_info_data[key])
+        query.addBindValue(unit_inventory_id) # Последний параметр - id_unit_inventory для WHERE
+
+        if query.exec_():
+            print(f"Расширенная информация успешно обновлена для ID {unit_inventory_id}.")
+            mark_tables_changed("Units_extended_info")
+        else:
+            print(f"Ошибка при обновлении расширенной информации для ID {unit_inventory_id}:", query.lastError().text())
+            QMessageBox.warning(self, "Предупреждение", f"Не удалось обновить расширенную информацию для объекта (ID {unit_inventory_id}): {query.lastError().text()}")
+
+
+    def _delete_extended_info(self, unit_inventory_id):
+        """Удаляет запись из Units_extended_info."""
+        query = QSqlQuery(self.db)
+        query.prepare("DELETE FROM Units_extended_info WHERE id_unit_inventory = ?")
+        query.addBindValue(unit_inventory_id)
+
+        if query.exec_():
+            print(f"Расширенная информация удалена для ID {unit_inventory_id}.")
+            mark_tables_changed("Units_extended_info")
+        else:
+            print(f"Ошибка при удалении расширенной информации для ID {unit_inventory_id}:", query.lastError().text())
+
+
+    def _delete_item(self):
+        """Удаляет выбранный объект инвентаризации."""
+        selected_indexes = self.table_view.selectedIndexes()
+        if not selected_indexes:
+            QMessageBox.warning(self, "Предупреждение", "Пожалуйста, выберите объект для удаления.")
+            return
+
+        row = selected_indexes[0].row()
+        item_id = self.model.row_key(row)
+        inventory_number = self.model.row_data(row).get("inventory_number", "")
+
+        reply = QMessageBox.question(self, "Подтверждение удаления",
+                                     f"Вы уверены, что хотите удалить объект с инв. номером '{inventory_number}' (ID: {item_id})?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+        if reply == QMessageBox.Yes:
+            # Запись в Units_extended_info удаляется каскадно (ON DELETE CASCADE)
+            success, error_text = self.model.delete_record(row)
+            if success:
+                print(f"Объект инвентаризации с ID {item_id} удален.")
+            else:
+                print("Ошибка при удалении объекта:", error_text)
+                QMessageBox.critical(self, "Ошибка", f"Не удалось удалить объект: {error_text}")
+
+
+    def _apply_search(self):
+        """Фильтрует список по строке поиска (FTS5 по текстовым полям и расширенной информации)."""
+        text = self.search_input.text().strip()
+        if not text:
+            self.model.set_filter("")
+            return
+
+        match_expression = build_fts_match(text) if inventory_fts_available(self.db) else None
+        if match_expression is not None:
+            success = self.model.set_filter(
+                f"t.id_unit_inventory IN (SELECT rowid FROM {INVENTORY_FTS_TABLE} WHERE {INVENTORY_FTS_TABLE} MATCH ?)",
+                [match_expression])
+        else:
+            # Короткая строка или FTS5 недоступен - поиск подстроки через LIKE
+            like_columns = INVENTORY_FTS_COLUMNS[self.table_name]
+            success = self.model.set_filter(" OR ".join(f"t.{col} LIKE ?" for col in like_columns),
+                                            [f"%{text}%"] * len(like_columns))
+
+        if not success:
+            print("Ошибка поиска:", self.model.last_error())
+
+
+    def _reset_search(self):
+        self.search_input.clear()
+        self.model.set_filter("")
+
+
+    def _init_new_row(self, data):
+        """Устанавливает значения по умолчанию для новой записи."""
+        if data.get("unit_count") is None:
+            data["unit_count"] = 1
+        if not data.get("date_order_buhgaltery"):
+            data["date_order_buhgaltery"] = QDate.currentDate().toString(Qt.ISODate)
@@ -10,7 +10,7 @@ from PyQt5.QtCore import Qt, QModelIndex, QDate
 from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
 
 # Импортируем схему базы данных
-from database import DATABASE_SCHEMA
+from database import get_column_names
 
 class NoteView(QWidget):
     def __init__(self, db_connection):
@@ -30,7 +30,7 @@ class NoteView(QWidget):
 
         # --- Настройки модели и таблицы ---
         self.table_name = "Note" # Название таблицы
-        self.column_names = [col.split()[0] for col in DATABASE_SCHEMA[self.table_name] if not col.strip().startswith("FOREIGN KEY")]
+        self.column_names = get_column_names(self.table_name)
         self.unique_column = None # Для заметок уникальность не требуется
 
         self.model = QSqlTableModel(self, self.db)
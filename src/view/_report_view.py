@@ -1,21 +1,18 @@
 # ui/report_view.py
+import os
 import sys
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QLabel,
                              QFileDialog, QMessageBox, QLineEdit, QDateEdit,
-                             QComboBox, QFormLayout, QHBoxLayout)
+                             QComboBox, QFormLayout, QHBoxLayout, QDialog,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QDialogButtonBox,
+                             QTableView)
 from PyQt5.QtSql import QSqlDatabase, QSqlQuery, QSqlError
 from PyQt5.QtCore import Qt, QDate
 
-# Импортируем библиотеку для работы с .docx
-try:
-    from docx import Document
-    from docx.shared import Inches
-except ImportError:
-    print("Библиотека 'python-docx' не найдена. Установите ее: pip install python-docx")
-    # Можно добавить обработку ошибки или уведомление пользователя в GUI
-
-# Импортируем схему базы данных для получения названий таблиц и столбцов
-from database import DATABASE_SCHEMA
+from src.model.report_model import (ReportPreviewModel, generate_inventory_report, generate_document_batch, DOCUMENT_GROUPING_LABELS,
+                                    load_summary, generate_summary_report, SUMMARY_DIMENSIONS, SUMMARY_MEASURES)
+from src.utils.background_jobs import run_database_job
+from src.utils.lookup_cache import get_lookup, get_subcategories, populate_combo, select_combo_item
 
 class ReportView(QWidget):
     def __init__(self, db_connection):
@@ -44,9 +41,8 @@ class ReportView(QWidget):
         # Фильтр по Подкатегории (будет зависеть от выбранной категории)
         self.subcategory_combo = QComboBox()
         self.subcategory_combo.addItem("Все подкатегории", None) # Опция "Все подкатегории"
-        # TODO: Реализовать обновление этого комбобокса при изменении category_combo
-        # self.category_combo.currentIndexChanged.connect(self._populate_subcategory_combo)
         self._populate_subcategory_combo() # Заполняем изначально все подкатегории
+        self.category_combo.currentIndexChanged.connect(self._update_subcategory_combo)
 
         # Фильтр по Типу единицы
         self.unit_type_combo = QComboBox()
@@ -103,239 +99,254 @@ class ReportView(QWidget):
         filter_layout.addRow(date_range_layout) # Добавляем макет с датами
 
         self.layout.addLayout(filter_layout)
-        self.layout.addStretch() # Растягиваем, чтобы кнопка была внизу
+
+        # --- Предпросмотр: строки читаются по мере прокрутки ---
+        preview_layout = QHBoxLayout()
+        preview_button = QPushButton("Предпросмотр")
+        preview_button.clicked.connect(self._refresh_preview)
+        self.preview_label = QLabel("Нажмите 'Предпросмотр', чтобы увидеть строки отчета по выбранным фильтрам.")
+        preview_layout.addWidget(preview_button)
+        preview_layout.addWidget(self.preview_label, 1)
+        self.layout.addLayout(preview_layout)
+
+        self.preview_model = ReportPreviewModel(self.db, self)
+        self.preview_model.rowsInserted.connect(self._update_preview_label)
+        self.preview_view = QTableView()
+        self.preview_view.setModel(self.preview_model)
+        self.preview_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.preview_view.verticalHeader().setDefaultSectionSize(22)
+        self.layout.addWidget(self.preview_view, 1) # Таблица занимает свободное место, кнопки остаются внизу
+        self._preview_active = False
 
         # --- Кнопка формирования отчета ---
-        generate_button = QPushButton("Сформировать отчет (.docx)")
+        generate_button = QPushButton("Сформировать отчет (.docx / .pdf)")
         generate_button.clicked.connect(self._generate_report)
         self.layout.addWidget(generate_button)
 
+        # --- Пакет документов по шаблонам (по тем же фильтрам) ---
+        batch_layout = QHBoxLayout()
+        self.template_combo = QComboBox()
+        self.template_combo.addItem("Заявки на выдачу основных средств", "transfer_sheet")
+        self.template_combo.addItem("Служебные записки на замену картриджа", "cartridge_sheet")
+        self.grouping_combo = QComboBox()
+        for group_by, label in DOCUMENT_GROUPING_LABELS.items():
+            self.grouping_combo.addItem(label, group_by)
+        self.destination_combo = QComboBox()
+        self.destination_combo.addItem("В архив ZIP", "zip")
+        self.destination_combo.addItem("В папку", "folder")
+        batch_button = QPushButton("Сформировать документы")
+        batch_button.clicked.connect(self._generate_document_batch)
+        batch_layout.addWidget(QLabel("Документы:"))
+        batch_layout.addWidget(self.template_combo)
+        batch_layout.addWidget(self.grouping_combo)
+        batch_layout.addWidget(self.destination_combo)
+        batch_layout.addWidget(batch_button)
+        self.layout.addLayout(batch_layout)
+
+        # --- Сводный отчет (количество по двум измерениям, по тем же фильтрам) ---
+        summary_layout = QHBoxLayout()
+        self.summary_rows_combo = QComboBox()
+        self.summary_columns_combo = QComboBox()
+        self.summary_columns_combo.addItem("Без столбцов", None)
+        for dimension, info in SUMMARY_DIMENSIONS.items():
+            self.summary_rows_combo.addItem(info.title, dimension)
+            self.summary_columns_combo.addItem(info.title, dimension)
+        self.summary_measure_combo = QComboBox()
+        for measure, (title, _) in SUMMARY_MEASURES.items():
+            self.summary_measure_combo.addItem(title, measure)
+        show_summary_button = QPushButton("Показать")
+        show_summary_button.clicked.connect(self._show_summary)
+        save_summary_button = QPushButton("Сохранить...")
+        save_summary_button.clicked.connect(self._save_summary)
+        summary_layout.addWidget(QLabel("Сводный отчет:"))
+        summary_layout.addWidget(self.summary_rows_combo)
+        summary_layout.addWidget(QLabel("по"))
+        summary_layout.addWidget(self.summary_columns_combo)
+        summary_layout.addWidget(self.summary_measure_combo)
+        summary_layout.addWidget(show_summary_button)
+        summary_layout.addWidget(save_summary_button)
+        self.layout.addLayout(summary_layout)
+
     # --- Методы заполнения комбобоксов ---
 
     def _populate_category_combo(self):
-        """Заполняет QComboBox категориями из базы данных."""
-        self.category_combo.clear()
-        self.category_combo.addItem("Все категории", None) # Опция "Все"
-        query = QSqlQuery("SELECT id_category, category FROM Category ORDER BY category", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.category_combo.addItem(item_name, item_id) # Сохраняем ID как UserData
+        """Заполняет QComboBox категориями из кэша справочников."""
+        populate_combo(self.category_combo, get_lookup(self.db, "Category").items, "Все категории")
+
+    def _update_subcategory_combo(self, index):
+        """Оставляет в списке подкатегорий только подкатегории выбранной категории."""
+        self._populate_subcategory_combo(self.category_combo.itemData(index))
 
     def _populate_subcategory_combo(self, category_id=None):
         """Заполняет QComboBox подкатегориями, опционально фильтруя по категории."""
-        self.subcategory_combo.clear()
-        self.subcategory_combo.addItem("Все подкатегории", None) # Опция "Все"
-        query = QSqlQuery(self.db)
-        sql = "SELECT id_subcategory, subcategory FROM Subcategory"
-        params = []
-        if category_id is not None:
-             sql += " WHERE id_category = ?"
-             params.append(category_id)
-        sql += " ORDER BY subcategory"
-
-        query.prepare(sql)
-        for param in params:
-             query.addBindValue(param)
-
-        if query.exec_():
-            while query.next():
-                item_id = query.value(0)
-                item_name = query.value(1)
-                self.subcategory_combo.addItem(item_name, item_id)
-        else:
-            print("Ошибка при загрузке подкатегорий:", query.lastError().text())
+        populate_combo(self.subcategory_combo, get_subcategories(self.db).items(category_id), "Все подкатегории")
 
 
     def _populate_unit_type_combo(self):
-        """Заполняет QComboBox типами единиц из базы данных."""
-        self.unit_type_combo.clear()
-        self.unit_type_combo.addItem("Все типы единиц", None) # Опция "Все"
-        query = QSqlQuery("SELECT id_unit_type, unit_type FROM Unit_type ORDER BY unit_type", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.unit_type_combo.addItem(item_name, item_id) # Сохраняем ID как UserData
+        """Заполняет QComboBox типами единиц из кэша справочников."""
+        populate_combo(self.unit_type_combo, get_lookup(self.db, "Unit_type").items, "Все типы единиц")
 
     def _populate_order_status_combo(self):
-        """Заполняет QComboBox статусами заказов из базы данных."""
-        self.order_status_combo.clear()
-        self.order_status_combo.addItem("Все статусы", None) # Опция "Все"
-        query = QSqlQuery("SELECT id_order_status, order_status FROM Order_status ORDER BY order_status", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.order_status_combo.addItem(item_name, item_id) # Сохраняем ID как UserData
-
+        """Заполняет QComboBox статусами заказов из кэша справочников."""
+        populate_combo(self.order_status_combo, get_lookup(self.db, "Order_status").items, "Все статусы")
+
+
+    def _filter_descriptions(self):
+        """Описание выбранных фильтров для шапки отчета."""
+        descriptions = []
+        for label, combo in (("Категория", self.category_combo), ("Подкатегория", self.subcategory_combo),
+                             ("Тип единицы", self.unit_type_combo), ("Статус заказа", self.order_status_combo)):
+            if combo.currentData() is not None:
+                descriptions.append(f"{label}: {combo.currentText()}")
+        for label, line_edit in (("Кабинет", self.cabinet_input), ("Производитель", self.manufacturer_input),
+                                 ("Модель", self.model_input), ("Серийный номер", self.serial_number_input),
+                                 ("Инвентарный номер", self.inventory_number_input)):
+            if line_edit.text().strip():
+                descriptions.append(f"{label}: {line_edit.text().strip()}")
+        descriptions.append(f"Дата заказа: {self.start_date_edit.date().toString(Qt.ISODate)} - "
+                            f"{self.end_date_edit.date().toString(Qt.ISODate)}")
+        return descriptions
+
+    def _current_filters(self):
+        """Выбранные параметры фильтрации (ключи - как в build_report_where)."""
+        return {
+            "id_category": self.category_combo.currentData(),
+            "id_subcategory": self.subcategory_combo.currentData(),
+            "id_unit_type": self.unit_type_combo.currentData(),
+            "id_order_status": self.order_status_combo.currentData(),
+            "cabinet": self.cabinet_input.text().strip(),
+            "manufacturer": self.manufacturer_input.text().strip(),
+            "model": self.model_input.text().strip(),
+            "serial_number": self.serial_number_input.text().strip(),
+            "inventory_number": self.inventory_number_input.text().strip(),
+            "start_date": self.start_date_edit.date().toString(Qt.ISODate),
+            "end_date": self.end_date_edit.date().toString(Qt.ISODate),
+        }
 
     def _generate_report(self):
-        """Формирует отчет на основе данных из базы и сохраняет его в .docx."""
+        """Формирует отчет .docx в фоновом потоке (с прогрессом и отменой)."""
         print("Формирование отчета...")
-
-        # Получаем выбранные параметры фильтрации
-        selected_category_id = self.category_combo.currentData()
-        selected_subcategory_id = self.subcategory_combo.currentData()
-        selected_unit_type_id = self.unit_type_combo.currentData()
-        selected_order_status_id = self.order_status_combo.currentData()
-        cabinet_filter = self.cabinet_input.text().strip()
-        manufacturer_filter = self.manufacturer_input.text().strip()
-        model_filter = self.model_input.text().strip()
-        serial_number_filter = self.serial_number_input.text().strip()
-        inventory_number_filter = self.inventory_number_input.text().strip()
-        start_date = self.start_date_edit.date().toString(Qt.ISODate)
-        end_date = self.end_date_edit.date().toString(Qt.ISODate)
-
-        # Формируем SQL-запрос с учетом фильтров (используем новые таблицы)
-        query_string = """
-            SELECT
-                ui.inventory_number,
-                ui.serial_number,
-                ui.manufacturer,
-                ui.model,
-                c.category,       -- Название категории из связанной таблицы
-                sc.subcategory,   -- Название подкатегории из связанной таблицы
-                ut.unit_type,     -- Название типа единицы из связанной таблицы
-                ui.cabinet,
-                os.order_status,  -- Название статуса заказа из связанной таблицы
-                ui.date_order_buhgaltery,
-                ui.date_issue,
-                ui.notice,
-                uei.device_name,  -- Данные из расширенной информации (если есть)
-                uei.ip,
-                uei.mac
-            FROM
-                Units_inventory ui
-            LEFT JOIN Category c ON ui.id_category = c.id_category
-            LEFT JOIN Subcategory sc ON ui.id_subcategory = sc.id_subcategory
-            LEFT JOIN Unit_type ut ON ui.id_unit_type = ut.id_unit_type
-            LEFT JOIN Order_status os ON ui.id_order_status = os.id_order_status
-            LEFT JOIN Units_extended_info uei ON ui.id_unit_inventory = uei.id_unit_inventory -- Связь 1-к-1
-            WHERE 1=1
-        """
-        query_params = []
-
-        if selected_category_id is not None:
-            query_string += " AND ui.id_category = ?"
-            query_params.append(selected_category_id)
-
-        if selected_subcategory_id is not None:
-            query_string += " AND ui.id_subcategory = ?"
-            query_params.append(selected_subcategory_id)
-
-        if selected_unit_type_id is not None:
-            query_string += " AND ui.id_unit_type = ?"
-            query_params.append(selected_unit_type_id)
-
-        if selected_order_status_id is not None:
-            query_string += " AND ui.id_order_status = ?"
-            query_params.append(selected_order_status_id)
-
-        if cabinet_filter:
-            query_string += " AND ui.cabinet LIKE ?"
-            query_params.append(f"%{cabinet_filter}%")
-
-        if manufacturer_filter:
-            query_string += " AND ui.manufacturer LIKE ?"
-            query_params.append(f"%{manufacturer_filter}%")
-
-        if model_filter:
-            query_string += " AND ui.model LIKE ?"
-            query_params.append(f"%{model_filter}%")
-
-        if serial_number_filter:
-            query_string += " AND ui.serial_number LIKE ?"
-            query_params.append(f"%{serial_number_filter}%")
-
-        if inventory_number_filter:
-            query_string += " AND ui.inventory_number LIKE ?"
-            query_params.append(f"%{inventory_number_filter}%")
-
-
-        # Фильтр по дате заказа (date_order_buhgaltery)
-        query_string += " AND ui.date_order_buhgaltery BETWEEN ? AND ?"
-        query_params.append(start_date)
-        query_params.append(end_date)
-
-        query_string += " ORDER BY ui.date_order_buhgaltery, ui.inventory_number" # Сортировка
-
-        query = QSqlQuery(self.db)
-        query.prepare(query_string)
-        for param in query_params:
-            query.addBindValue(param)
-
-        if not query.exec_():
-            error_message = f"Ошибка при выполнении запроса к базе данных:\n{query.lastError().text()}"
-            print(error_message)
-            QMessageBox.critical(self, "Ошибка базы данных", error_message)
+        filters = self._current_filters()
+        filter_descriptions = self._filter_descriptions()
+
+        # Файл выбирается до формирования: строки пишутся в него по мере чтения из базы
+        default_filename = f"Отчет_инвентаризация_{QDate.currentDate().toString('yyyyMMdd')}.docx"
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Сохранить отчет",
+                                                                 default_filename,
+                                                                 "Документы Word (*.docx);;PDF (*.pdf);;Все файлы (*)")
+        if not file_path:
+            print("Сохранение отчета отменено.")
+            return
+        if selected_filter.startswith("PDF") and not file_path.lower().endswith(".pdf"):
+            file_path = os.path.splitext(file_path)[0] + ".pdf"
+
+        run_database_job(self, "Формирование отчета", self.db,
+                         lambda db, progress: generate_inventory_report(db, file_path, filters, filter_descriptions, progress),
+                         self._on_report_finished)
+
+    def _generate_document_batch(self):
+        """Формирует пакет документов по шаблону (по документу на группу) в фоновом потоке."""
+        template_name = self.template_combo.currentData()
+        group_by = self.grouping_combo.currentData()
+        filters = self._current_filters()
+        default_name = f"Документы_{QDate.currentDate().toString('yyyyMMdd')}"
+        if self.destination_combo.currentData() == "zip":
+            output_path, _ = QFileDialog.getSaveFileName(self, "Сохранить документы", default_name + ".zip",
+                                                         "Архив ZIP (*.zip)")
+            if output_path and not output_path.lower().endswith(".zip"):
+                output_path += ".zip"
+        else:
+            output_path = QFileDialog.getExistingDirectory(self, "Папка для документов")
+        if not output_path:
+            print("Формирование документов отменено.")
             return
 
-        # Создаем новый документ Word
-        try:
-            document = Document()
-
-            # Добавляем заголовок
-            document.add_heading('Отчет по инвентаризации', 0)
-
-            # Добавляем информацию о фильтрах (опционально)
-            document.add_paragraph(f"Сформирован: {QDate.currentDate().toString(Qt.ISODate)}")
-            # TODO: Добавить более подробную информацию о примененных фильтрах
-            document.add_paragraph("Примененные фильтры...")
-            document.add_paragraph("") # Пустая строка для отступа
-
-            # Добавляем таблицу
-            # Определяем заголовки столбцов для отчета (соответствуют SELECT в запросе)
-            headers = [
-                "Инв. номер", "Сер. номер", "Производитель", "Модель",
-                "Категория", "Подкатегория", "Тип единицы", "Кабинет",
-                "Статус заказа", "Дата заказа", "Дата выдачи", "Примечание",
-                "Имя устройства", "IP", "MAC"
-            ]
-            table = document.add_table(rows=1, cols=len(headers))
-            table.style = 'Table Grid' # Применяем стиль сетки
-
-            # Заполняем заголовки таблицы
-            header_cells = table.rows[0].cells
-            for i, header_text in enumerate(headers):
-                header_cells[i].text = header_text
-
-            # Заполняем таблицу данными из запроса
-            row_count = 0
-            while query.next():
-                row_cells = table.add_row().cells
-                # Заполняем ячейки данными из запроса по индексу
-                for i in range(len(headers)):
-                    value = query.value(i)
-                    # Преобразуем QDate в строку, если это дата
-                    if isinstance(value, QDate):
-                         row_cells[i].text = value.toString(Qt.ISODate)
-                    elif value is None:
-                         row_cells[i].text = "" # Пустая строка для NULL
-                    else:
-                         row_cells[i].text = str(value)
-
-                row_count += 1
-
-            if row_count == 0:
-                 document.add_paragraph("Нет данных, соответствующих выбранным фильтрам.")
-
-
-            # Диалог сохранения файла
-            default_filename = f"Отчет_инвентаризация_{QDate.currentDate().toString('yyyyMMdd')}.docx"
-            file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет",
-                                                       default_filename,
-                                                       "Документы Word (*.docx);;Все файлы (*)")
-
-            if file_path:
-                document.save(file_path)
-                QMessageBox.information(self, "Отчет сформирован", f"Отчет успешно сохранен в:\n{file_path}")
-                print(f"Отчет сохранен: {file_path}")
-            else:
-                print("Сохранение отчета отменено.")
-
-        except ImportError:
-             QMessageBox.critical(self, "Ошибка", "Библиотека 'python-docx' не установлена. Пожалуйста, установите ее (`pip install python-docx`).")
-        except Exception as e:
-            error_message = f"Произошла ошибка при создании или сохранении отчета:\n{e}"
-            print(error_message)
-            QMessageBox.critical(self, "Ошибка", error_message)
+        print(f"Формирование документов '{template_name}' ({group_by}) в {output_path}...")
+        run_database_job(self, "Формирование документов", self.db,
+                         lambda db, progress: generate_document_batch(db, output_path, template_name, group_by,
+                                                                      filters, progress),
+                         self._on_report_finished)
+
+    def _refresh_preview(self):
+        """Показывает первые строки отчета и общее количество по текущим фильтрам."""
+        success, message = self.preview_model.set_filters(self._current_filters())
+        if not success:
+            self.preview_label.setText("Ошибка предпросмотра.")
+            QMessageBox.critical(self, "Ошибка", message)
+            return
+        self._preview_active = True
+        self._update_preview_label()
+
+    def _update_preview_label(self, *args):
+        total = self.preview_model.total_count()
+        loaded = self.preview_model.loaded_count()
+        total_text = "?" if total is None else str(total)
+        self.preview_label.setText(f"Строк в отчете: {total_text} (показано: {loaded})")
+
+    def _summary_parameters(self):
+        return (self.summary_rows_combo.currentData(), self.summary_columns_combo.currentData(),
+                self.summary_measure_combo.currentData())
+
+    def _show_summary(self):
+        """Показывает сводный отчет в таблице (запрос с группировкой выполняется быстро, без фонового потока)."""
+        row_dimension, column_dimension, measure = self._summary_parameters()
+        summary, error = load_summary(self.db, row_dimension, column_dimension, measure, self._current_filters())
+        if error:
+            QMessageBox.critical(self, "Ошибка", error)
+            return
 
+        dialog = QDialog(self)
+        dialog.setWindowTitle(summary.title)
+        dialog.resize(900, 500)
+        layout = QVBoxLayout(dialog)
+        table = QTableWidget(len(summary.rows), len(summary.headers), dialog)
+        table.setHorizontalHeaderLabels(summary.headers)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row_index, values in enumerate(summary.rows):
+            for column_index, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if column_index > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row_index, column_index, item)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(table)
+        buttons = QDialogButtonBox(QDialogButtonBox.Close, dialog)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        dialog.exec_()
+
+    def _save_summary(self):
+        """Сохраняет сводный отчет в CSV, .docx или PDF."""
+        row_dimension, column_dimension, measure = self._summary_parameters()
+        default_filename = f"Сводный_отчет_{QDate.currentDate().toString('yyyyMMdd')}.csv"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить сводный отчет", default_filename,
+                                                   "CSV (*.csv);;Документы Word (*.docx);;PDF (*.pdf)")
+        if not file_path:
+            return
+        success, message = generate_summary_report(self.db, file_path, row_dimension, column_dimension, measure,
+                                                   self._current_filters(), self._filter_descriptions())
+        self._on_report_finished(success, message)
+
+    def _on_report_finished(self, success, message):
+        if success:
+            QMessageBox.information(self, "Отчет сформирован", message)
+            print(message)
+        else:
+            print(message)
+            QMessageBox.critical(self, "Ошибка", message)
+
+    def reload_lookups(self):
+        """Перечитывает справочники фильтров, сохраняя выбранные значения."""
+        self.preview_model.close() # Чтение старого предпросмотра прекращается до чтения справочников
+        selected = [(combo, combo.currentData()) for combo in
+                    (self.category_combo, self.unit_type_combo, self.order_status_combo)]
+        subcategory_id = self.subcategory_combo.currentData()
+        self._populate_category_combo()
+        self._populate_unit_type_combo()
+        self._populate_order_status_combo()
+        for combo, item_id in selected:
+            select_combo_item(combo, item_id)
+        self._populate_subcategory_combo(self.category_combo.currentData())
+        select_combo_item(self.subcategory_combo, subcategory_id)
+        if self._preview_active:
+            self._refresh_preview()
@@ -7,6 +7,8 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTableView, QPushButton,
 from PyQt5.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlError, QSqlRelation, QSqlRelationalTableModel
 from PyQt5.QtCore import Qt, QModelIndex, QDate, QVariant, pyqtSignal # Import pyqtSignal
 
+from src.utils.lookup_cache import get_lookup, populate_combo, select_combo_item
+
 # Импортируем универсальный обработчик CSV (Controller will use this)
 # from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
 
@@ -86,28 +88,12 @@ class EmployeeDialog(QDialog):
         self.layout.addWidget(self.button_box)
 
     def _populate_departments_combo(self):
-        """Заполняет QComboBox отделами из базы данных."""
-        # This still requires DB access, which is acceptable for a View component
-        # needing lookup data for its UI elements.
-        self.department_combo.clear()
-        self.department_combo.addItem("Выберите отдел", None) # Опция "Выберите"
-        query = QSqlQuery("SELECT id_department, department_fullname FROM Departments ORDER BY department_fullname", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.department_combo.addItem(item_name, item_id) # Сохраняем ID как EmployeeData
+        """Заполняет QComboBox отделами из кэша справочников."""
+        populate_combo(self.department_combo, get_lookup(self.db, "Departments").items, "Выберите отдел")
 
     def _select_combo_item(self, combo_box, item_id):
         """Выбирает элемент в комбобоксе по его EmployeeData (ID)."""
-        if item_id is None:
-            combo_box.setCurrentIndex(0) # Выбираем "Выберите..." или "Все..."
-            return
-        for i in range(combo_box.count()):
-            if combo_box.itemData(i) == item_id:
-                combo_box.setCurrentIndex(i)
-                return
-        # Если ID не найден, оставляем выбранным первый элемент (None)
-        combo_box.setCurrentIndex(0)
+        select_combo_item(combo_box, item_id)
 
 
     def get_data(self):
@@ -121,7 +107,7 @@ class EmployeeDialog(QDialog):
             'account': self.account_input.text().strip(),
             'ids_group_dc': self.ids_group_dc_input.text().strip(),
             'work_pc': self.work_pc_input.text().strip(),
-            'work_pc_ip': self.work_pc_ip_input.strip(), # Keep IP format as entered
+            'work_pc_ip': self.work_pc_ip_input.text().strip(), # Keep IP format as entered
             'telephone': self.telephone_input.text().strip(),
             'mail': self.mail_input.text().strip(),
         }
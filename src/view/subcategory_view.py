@@ -8,6 +8,8 @@ from PyQt5.QtSql import QSqlTableModel, QSqlDatabase, QSqlQuery, QSqlError, QSql
 from PyQt5.QtCore import Qt, QModelIndex, QDate, QVariant, pyqtSignal # Импортируем pyqtSignal
 import re # Для валидации двух символов (остается в View/Dialog для UI-валидации)
 
+from src.utils.lookup_cache import get_lookup, populate_combo, select_combo_item
+
 # Импортируем универсальный обработчик CSV (Контроллер будет использовать его)
 # from src.utils.csv_handler import import_data_from_csv, export_data_to_csv
 
@@ -55,29 +57,16 @@ class SubcategoryDialog(QDialog):
 
     def _populate_categories_combo(self):
         """
-        Заполняет QComboBox категориями из базы данных.
+        Заполняет QComboBox категориями из кэша справочников.
         Этот метод остается в View/Dialog, так как он напрямую связан с UI элементом.
         """
-        self.category_combo.clear()
-        self.category_combo.addItem("Выберите категорию", None)
-        query = QSqlQuery("SELECT id_category, category FROM Category ORDER BY category", self.db)
-        while query.next():
-            item_id = query.value(0)
-            item_name = query.value(1)
-            self.category_combo.addItem(item_name, item_id)
+        populate_combo(self.category_combo, get_lookup(self.db, "Category").items, "Выберите категорию")
 
     def _select_combo_item(self, combo_box, item_id):
         """
         Выбирает элемент в комбобоксе по его UserData (ID).
         """
-        if item_id is None:
-            combo_box.setCurrentIndex(0)
-            return
-        for i in range(combo_box.count()):
-            if combo_box.itemData(i) == item_id:
-                combo_box.setCurrentIndex(i)
-                return
-        combo_box.setCurrentIndex(0)
+        select_combo_item(combo_box, item_id)
 
 
     def get_data(self):
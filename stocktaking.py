@@ -0,0 +1,228 @@
+# stocktaking.py
+# Запуск операций без графического интерфейса (для плановых заданий и серверов без дисплея):
+#   python -m stocktaking import Employee employees.csv --merge --resolve-names
+#   python -m stocktaking export Units_inventory inventory.csv.gz
+#   python -m stocktaking report report.pdf --category 01 --start-date 2024-01-01 --end-date 2024-12-31
+#   python -m stocktaking report summary.csv --summary category:order_status
+#   python -m stocktaking bootstrap --import-dir public/import
+# Используются те же функции, что и в приложении (database, csv_handler, report_model),
+# но вместо QApplication создается QCoreApplication (QGuiApplication - только для PDF).
+import os
+import sys
+import time
+import signal
+import argparse
+import multiprocessing
+
+# Как часто (в секундах) выводится прогресс
+PROGRESS_PRINT_INTERVAL = 1.0
+
+# Фильтры отчета: (параметр командной строки, ключ фильтра build_report_where)
+REPORT_FILTER_OPTIONS = [
+    ("--category", "id_category"),
+    ("--subcategory", "id_subcategory"),
+    ("--unit-type", "id_unit_type"),
+    ("--order-status", "id_order_status"),
+    ("--cabinet", "cabinet"),
+    ("--manufacturer", "manufacturer"),
+    ("--model", "model"),
+    ("--serial-number", "serial_number"),
+    ("--inventory-number", "inventory_number"),
+    ("--start-date", "start_date"),
+    ("--end-date", "end_date"),
+]
+
+
+class _Progress:
+    """progress_callback для консоли: печатает число обработанных строк, Ctrl+C отменяет операцию."""
+
+    def __init__(self, label):
+        self.label = label
+        self.cancelled = False
+        self._started_at = time.monotonic()
+        self._last_print = 0.0
+
+    def cancel(self, *args):
+        self.cancelled = True
+
+    def __call__(self, processed):
+        now = time.monotonic()
+        if now - self._last_print >= PROGRESS_PRINT_INTERVAL:
+            self._last_print = now
+            elapsed = now - self._started_at
+            rate = processed / elapsed if elapsed > 0 else 0.0
+            print(f"{self.label}: {processed} ({rate:.0f}/с)", file=sys.stderr)
+        return not self.cancelled
+
+
+def _parse_digits(items):
+    """['id_department=2', ...] -> {'id_department': 2}."""
+    digits = {}
+    for item in items or []:
+        column, _, width = item.partition("=")
+        if not column or not width.isdigit():
+            raise argparse.ArgumentTypeError(f"Неверный формат --digits '{item}' (ожидается столбец=ширина).")
+        digits[column] = int(width)
+    return digits
+
+
+def _split_columns(text):
+    return [column.strip() for column in text.split(",") if column.strip()] if text else None
+
+
+def run_import(db, args, progress):
+    from database import get_table_info, get_id_column_digits
+    from src.utils.csv_handler import import_data_from_csv
+    from src.utils.multi_table_import import import_multi_table_csv, UNITS_INVENTORY_IMPORT
+
+    if args.table == "Units_inventory" and not args.columns:
+        # Файл инвентаризации содержит и столбцы Units_extended_info (как при импорте из приложения)
+        if args.dry_run or args.merge:
+            return False, "Для Units_inventory без --columns поддерживается только обычный импорт."
+        return import_multi_table_csv(db, args.file, UNITS_INVENTORY_IMPORT, progress_callback=progress)
+    if get_table_info(args.table) is None:
+        return False, f"Ошибка: Таблица '{args.table}' не найдена в схеме базы данных."
+    # Ширина идентификаторов по схеме, как при импорте из приложения; --digits ее переопределяет (0 - не дополнять)
+    digits = get_id_column_digits(args.table)
+    digits.update(_parse_digits(args.digits))
+    digits = {column: width for column, width in digits.items() if width}
+    return import_data_from_csv(db, args.file, args.table, _split_columns(args.columns), digits,
+                                unique_column=args.unique, progress_callback=progress, merge=args.merge,
+                                workers=args.workers, dry_run=args.dry_run, resolve_names=args.resolve_names,
+                                create_missing=args.create_missing)
+
+
+def run_export(db, args, progress):
+    from database import get_table_info
+    from src.utils.csv_handler import export_data_to_csv
+
+    if get_table_info(args.table) is None:
+        return False, f"Ошибка: Таблица '{args.table}' не найдена в схеме базы данных."
+    return export_data_to_csv(db, args.file, args.table, _split_columns(args.columns), progress_callback=progress)
+
+
+def run_report(db, args, progress):
+    from src.model.report_model import generate_inventory_report, generate_summary_report
+
+    filters = {key: getattr(args, option[2:].replace("-", "_")) for option, key in REPORT_FILTER_OPTIONS}
+    for key in ("id_unit_type", "id_order_status"):
+        if filters[key] is not None and filters[key].isdigit():
+            filters[key] = int(filters[key]) # Идентификаторы этих справочников - INTEGER
+    descriptions = [f"{option[2:]}: {filters[key]}" for option, key in REPORT_FILTER_OPTIONS if filters[key]]
+    if args.summary:
+        row_dimension, _, column_dimension = args.summary.partition(":")
+        return generate_summary_report(db, args.file, row_dimension, column_dimension or None, args.measure,
+                                       filters, descriptions)
+    return generate_inventory_report(db, args.file, filters, descriptions, progress)
+
+
+def run_bootstrap(db, args, progress):
+    from src.utils.bootstrap_import import bootstrap_import
+
+    return bootstrap_import(db, args.import_dir, progress_callback=progress, workers=args.workers)
+
+
+def build_parser():
+    from src.model.report_model import SUMMARY_DIMENSIONS, SUMMARY_MEASURES
+    from src.utils.bootstrap_import import DEFAULT_IMPORT_DIR
+
+    parser = argparse.ArgumentParser(prog="python -m stocktaking",
+                                     description="Импорт, экспорт, отчеты и первичная загрузка без графического интерфейса.")
+    parser.add_argument("--db", default="st.db", help="Файл базы данных (по умолчанию st.db)")
+    parser.add_argument("--profile", help="Профиль производительности SQLite (см. config.ini)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Импорт CSV в таблицу")
+    import_parser.add_argument("table", help="Таблица базы данных")
+    import_parser.add_argument("file", help="CSV-файл (разделитель ';', первая строка - заголовок)")
+    import_parser.add_argument("--columns", help="Столбцы таблицы в порядке столбцов файла, через запятую")
+    import_parser.add_argument("--digits", action="append", metavar="СТОЛБЕЦ=ШИРИНА",
+                               help="Дополнять числовые значения столбца нулями слева (можно повторять); "
+                                    "по умолчанию для столбцов id_* ширина берется из схемы, 0 - не дополнять")
+    import_parser.add_argument("--unique", help="Столбец, по которому пропускаются уже существующие записи")
+    mode = import_parser.add_mutually_exclusive_group()
+    mode.add_argument("--merge", action="store_true", help="Добавить новые и обновить существующие записи")
+    mode.add_argument("--dry-run", action="store_true", help="Только проверить файл, не изменяя базу")
+    import_parser.add_argument("--resolve-names", action="store_true",
+                               help="Принимать наименования вместо идентификаторов в столбцах-ссылках")
+    import_parser.add_argument("--create-missing", action="store_true",
+                               help="С --resolve-names: добавлять отсутствующие наименования в справочники")
+    import_parser.add_argument("--workers", type=int, help="Число процессов разбора файла")
+
+    export_parser = commands.add_parser("export", help="Экспорт таблицы в CSV (.csv, .csv.gz, .csv.xz)")
+    export_parser.add_argument("table", help="Таблица базы данных")
+    export_parser.add_argument("file", help="Файл результата")
+    export_parser.add_argument("--columns", help="Столбцы через запятую (по умолчанию - все)")
+
+    report_parser = commands.add_parser("report", help="Отчет по инвентаризации (.docx, .pdf) или сводный отчет (.csv, .docx, .pdf)")
+    report_parser.add_argument("file", help="Файл отчета; формат - по расширению")
+    for option, key in REPORT_FILTER_OPTIONS:
+        report_parser.add_argument(option, help=f"Фильтр {key}")
+    report_parser.add_argument("--summary", metavar="СТРОКИ[:СТОЛБЦЫ]",
+                               help="Сводный отчет по измерениям: " + ", ".join(SUMMARY_DIMENSIONS))
+    report_parser.add_argument("--measure", default="count", choices=list(SUMMARY_MEASURES),
+                               help="Показатель сводного отчета")
+
+    bootstrap_parser = commands.add_parser("bootstrap", help="Первичная загрузка каталога выгрузок")
+    bootstrap_parser.add_argument("--import-dir", default=DEFAULT_IMPORT_DIR,
+                                  help=f"Каталог с файлами (по умолчанию {DEFAULT_IMPORT_DIR})")
+    bootstrap_parser.add_argument("--workers", type=int, help="Число процессов разбора файлов")
+    return parser
+
+
+COMMANDS = {
+    "import": (run_import, "Обработано строк"),
+    "export": (run_export, "Выгружено строк"),
+    "report": (run_report, "Записано строк"),
+    "bootstrap": (run_bootstrap, "Обработано строк"),
+}
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "report" and args.summary:
+        from src.model.report_model import SUMMARY_DIMENSIONS
+        row_dimension, _, column_dimension = args.summary.partition(":")
+        unknown = [d for d in (row_dimension, column_dimension) if d and d not in SUMMARY_DIMENSIONS]
+        if unknown or not row_dimension:
+            parser.error(f"Неизвестное измерение сводного отчета: {', '.join(unknown) or args.summary}")
+    try:
+        _parse_digits(getattr(args, "digits", None))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    # Шрифты для PDF требуют QGuiApplication; остальным операциям достаточно QCoreApplication
+    if args.command == "report" and args.file.lower().endswith(".pdf"):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtGui import QGuiApplication as Application
+    else:
+        from PyQt5.QtCore import QCoreApplication as Application
+    app = Application(sys.argv[:1])
+
+    from database import connect_db, create_all_tables, close_db
+    db = connect_db(args.db, profile=args.profile)
+    if db is None:
+        return 1
+    if not create_all_tables(db):
+        print("Ошибка: Не удалось обновить структуру базы данных.", file=sys.stderr)
+        close_db(db)
+        return 1
+
+    function, label = COMMANDS[args.command]
+    progress = _Progress(label)
+    previous_handler = signal.signal(signal.SIGINT, progress.cancel) # Ctrl+C - отмена с откатом изменений
+    try:
+        success, message = function(db, args, progress)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        close_db(db)
+    print(message, file=sys.stdout if success else sys.stderr)
+    del app
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    # Нужен для процессов параллельного разбора CSV и сборки документов
+    multiprocessing.freeze_support()
+    sys.exit(main())
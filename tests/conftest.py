@@ -0,0 +1,8 @@
+# Корень репозитория в sys.path: тесты импортируют модули как приложение (database, src.utils...),
+# а дочерние процессы spawn получают этот же sys.path
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,72 @@
+# Потоковая запись таблиц в .docx: записанный файл открывается python-docx и сверяется с данными.
+import os
+import shutil
+import tempfile
+import unittest
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from src.utils import docx_writer
+from src.utils.docx_writer import write_docx_table
+
+HEADERS = ["Инв. номер", "Модель", "Примечание"]
+
+
+class WriteDocxTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "report.docx")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_table(self):
+        document = Document(self.path)
+        self.assertEqual(len(document.tables), 1)
+        return document, [[cell.text for cell in row.cells] for row in document.tables[0].rows]
+
+    def test_rows_are_written_in_order(self):
+        rows = [[f"{number:06d}", f"Модель {number}", None] for number in range(2500)]
+        progress = []
+        count = write_docx_table(self.path, "Отчет", ["Период: 2024"], HEADERS, iter(rows),
+                                 progress_callback=lambda written: progress.append(written))
+        self.assertEqual(count, 2500)
+        self.assertEqual(progress, [1000, 2000])
+
+        document, table = self.read_table()
+        self.assertEqual(table[0], HEADERS)
+        self.assertEqual(table[1:], [[number, model, ""] for number, model, _ in rows])
+        self.assertEqual(document.paragraphs[0].text, "Отчет")
+        self.assertIn("Период: 2024", [paragraph.text for paragraph in document.paragraphs])
+        # Строка заголовков повторяется на каждой странице
+        header_properties = document.tables[0].rows[0]._tr.trPr
+        self.assertIsNotNone(header_properties.find(qn("w:tblHeader")))
+
+    def test_special_characters(self):
+        rows = [
+            ["<&>", 'кавычки "24"', "строка 1\nстрока 2"],
+            ["\x01управляющие\x1f", 15, 0],
+        ]
+        self.assertEqual(write_docx_table(self.path, "Отчет", [], HEADERS, rows), 2)
+        _, table = self.read_table()
+        self.assertEqual(table[1], ["<&>", 'кавычки "24"', "строка 1\nстрока 2"])
+        self.assertEqual(table[2], ["управляющие", "15", "0"])
+
+    def test_empty_table_with_text(self):
+        self.assertEqual(write_docx_table(self.path, "Отчет", [], HEADERS, [], empty_text="Нет данных"), 0)
+        document, table = self.read_table()
+        self.assertEqual(table, [HEADERS])
+        self.assertEqual(document.paragraphs[-1].text, "Нет данных")
+
+    def test_cancel_removes_file(self):
+        rows = ([str(number), "", ""] for number in range(5000))
+        count = write_docx_table(self.path, "Отчет", [], HEADERS, rows,
+                                 progress_callback=lambda written: written < docx_writer.ROWS_PER_CHUNK * 2)
+        self.assertIsNone(count)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+# Разбиение CSV на блоки и параллельный разбор: результат и номера строк должны совпадать
+# с последовательным разбором файла (_parse_file).
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.utils.parallel_csv import (ParsedBlock, split_csv_file, read_csv_header, iter_parsed_blocks_parallel,
+                                    _parse_chunk, _parse_file)
+
+COLUMNS = ["id", "name", "notice"]
+DIGITS = {"id": 4}
+
+
+def _merge_blocks(blocks):
+    """Объединяет ParsedBlock по порядку в один (для сравнения с разбором файла целиком)."""
+    row_numbers, columns, errors, last_row = [], [[] for _ in COLUMNS], [], None
+    for block in blocks:
+        row_numbers.extend(block.row_numbers)
+        for column, values in zip(columns, block.columns):
+            column.extend(values)
+        errors.extend(block.errors)
+        last_row = block.last_row
+    return ParsedBlock(row_numbers, columns, errors, last_row)
+
+
+class ParallelCsvTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_csv(self, text, name="data.csv"):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w", encoding="utf-8", newline="") as csv_file:
+            csv_file.write(text)
+        return path
+
+    def parse_chunks_in_process(self, path, chunk_size):
+        """Разбор блоков split_csv_file в текущем процессе; None, если какой-то блок оборван."""
+        header, chunks = split_csv_file(path, chunk_size)
+        blocks = []
+        rows_before = 1
+        for start, end in chunks:
+            block = _parse_chunk((path, start, end, COLUMNS, DIGITS))
+            if block is None:
+                return None
+            blocks.append(ParsedBlock([rows_before + n for n in block.row_numbers], block.columns,
+                                      [(rows_before + n, e) for n, e in block.errors], rows_before + block.last_row))
+            rows_before += block.last_row
+        return _merge_blocks(blocks)
+
+    def assert_same_as_sequential(self, path, chunk_sizes):
+        expected = _parse_file((path, COLUMNS, DIGITS))
+        for chunk_size in chunk_sizes:
+            with self.subTest(chunk_size=chunk_size):
+                header, chunks = split_csv_file(path, chunk_size)
+                self.assertEqual(read_csv_header(header), COLUMNS)
+                # Блоки идут подряд без пропусков до конца файла
+                self.assertEqual(chunks[0][0], len(header))
+                self.assertEqual(chunks[-1][1], os.path.getsize(path))
+                for (_, end), (next_start, _) in zip(chunks, chunks[1:]):
+                    self.assertEqual(end, next_start)
+                self.assertEqual(self.parse_chunks_in_process(path, chunk_size), expected)
+
+    def test_quoted_newlines_across_chunk_boundaries(self):
+        lines = ["id;name;notice"]
+        for number in range(1, 30):
+            if number % 3 == 0:
+                lines.append(f'{number};"Принтер\nкаб. {number}";"строка 1\n""в кавычках""\nстрока 3"')
+            else:
+                lines.append(f"{number};Монитор;")
+        path = self.write_csv("\r\n".join(lines) + "\r\n")
+        # Все размеры блока, в том числе с границей внутри каждого многострочного поля
+        self.assert_same_as_sequential(path, range(1, os.path.getsize(path) + 2))
+
+    def test_file_without_trailing_newline(self):
+        path = self.write_csv('id;name;notice\n1;a;\n2;"b\nc";x\n3;d;последняя')
+        self.assert_same_as_sequential(path, range(1, os.path.getsize(path) + 2))
+        expected = _parse_file((path, COLUMNS, DIGITS))
+        self.assertEqual(expected.columns[2][-1], "последняя")
+
+    def test_blank_lines_and_errors_are_numbered_like_sequential(self):
+        text = ("id;name;notice\n"
+                "1;a;\n"
+                "\n"
+                "2;b\n"                # Неверное количество столбцов
+                ";;\n"                 # Пустая строка из одних разделителей
+                'x;"c\nd";\n'          # Не число в столбце с дополнением нулями
+                "\n\n"
+                "5;e;f\n")
+        path = self.write_csv(text)
+        expected = _parse_file((path, COLUMNS, DIGITS))
+        self.assertEqual(expected.row_numbers, [2, 9]) # Номер записи, а не физической строки
+        self.assertEqual([row for row, _ in expected.errors], [4, 6])
+        self.assertEqual(expected.columns[0], ["0001", "0005"])
+        self.assert_same_as_sequential(path, range(1, len(text.encode("utf-8")) + 2))
+
+    def test_stray_quote_in_unquoted_field(self):
+        # Кавычка-дюйм в поле без кавычек сбивает четность, и граница блока может попасть
+        # внутрь поля в кавычках - такой блок должен определяться как оборванный
+        lines = ["id;name;notice"]
+        for number in range(1, 40):
+            if number % 7 == 0:
+                lines.append(f'{number};Монитор 24";')
+            elif number % 5 == 0:
+                lines.append(f'{number};"Принтер\nкаб. {number}";')
+            else:
+                lines.append(f"{number};Клавиатура;")
+        path = self.write_csv("\n".join(lines) + "\n")
+        broken = [size for size in range(1, os.path.getsize(path)) if self.parse_chunks_in_process(path, size) is None]
+        self.assertTrue(broken)
+
+        expected = _parse_file((path, COLUMNS, DIGITS))
+        for chunk_size in (broken[0], broken[len(broken) // 2], 64):
+            with self.subTest(chunk_size=chunk_size):
+                _, chunks = split_csv_file(path, chunk_size)
+                blocks = iter_parsed_blocks_parallel(path, chunks, COLUMNS, DIGITS, workers=2)
+                self.assertEqual(_merge_blocks(blocks), expected)
+
+    def test_parallel_matches_sequential(self):
+        lines = ["id;name;notice"]
+        for number in range(1, 500):
+            if number % 50 == 0:
+                lines.append("")
+            elif number % 97 == 0:
+                lines.append(f"{number};без примечания")
+            else:
+                lines.append(f'{number};"Системный блок\n№ {number}";"""{number}"""')
+        path = self.write_csv("\n".join(lines) + "\n")
+        expected = _parse_file((path, COLUMNS, DIGITS))
+        _, chunks = split_csv_file(path, 1000)
+        self.assertGreater(len(chunks), 5)
+        blocks = iter_parsed_blocks_parallel(path, chunks, COLUMNS, DIGITS, workers=2)
+        self.assertEqual(_merge_blocks(blocks), expected)
+
+    def test_empty_and_header_only_files(self):
+        self.assertEqual(split_csv_file(self.write_csv("", "empty.csv")), (b"", []))
+        header, chunks = split_csv_file(self.write_csv("id;name;notice\n", "header.csv"))
+        self.assertEqual((read_csv_header(header), chunks), (COLUMNS, []))
+        header, chunks = split_csv_file(self.write_csv("id;name;notice", "header_only.csv"))
+        self.assertEqual((read_csv_header(header), chunks), (COLUMNS, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+# Кэш результатов отчетов: версии данных, LRU по числу строк, вытеснение и хранение на диске.
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from src.utils import report_cache
+from src.utils.report_cache import ReportCache, CACHE_FILE_SUFFIX, normalize_filters
+
+
+def _rows(count, prefix="row"):
+    return [(f"{prefix} {number}", number) for number in range(count)]
+
+
+class ReportCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def disk_files(self):
+        return sorted(name for name in os.listdir(self.cache_dir) if name.endswith(CACHE_FILE_SUFFIX))
+
+    def test_record_stores_fully_read_result(self):
+        cache = ReportCache(max_rows=100)
+        self.assertIsNone(cache.get("report", 1))
+        rows = _rows(5)
+        self.assertEqual(list(cache.record("report", 1, iter(rows))), rows)
+        self.assertEqual(list(cache.get("report", 1)), rows)
+
+    def test_partially_read_result_is_not_stored(self):
+        cache = ReportCache(max_rows=100)
+        recorder = cache.record("report", 1, iter(_rows(5)))
+        next(recorder)
+        recorder.close() # Отмена формирования отчета
+        self.assertIsNone(cache.get("report", 1))
+
+    def test_changed_token_invalidates_entry(self):
+        cache = ReportCache(max_rows=100)
+        cache.put("report", 1, _rows(3))
+        self.assertIsNone(cache.get("report", 2))
+        self.assertIsNone(cache.get("report", 1)) # Устаревшая запись удалена
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ReportCache(max_rows=10)
+        cache.put("a", 1, _rows(4, "a"))
+        cache.put("b", 1, _rows(4, "b"))
+        cache.get("a", 1) # "a" использована последней
+        cache.put("c", 1, _rows(4, "c"))
+        self.assertIsNone(cache.get("b", 1))
+        self.assertEqual(list(cache.get("a", 1)), _rows(4, "a"))
+        self.assertEqual(list(cache.get("c", 1)), _rows(4, "c"))
+
+    def test_large_result_without_cache_dir_is_not_stored(self):
+        cache = ReportCache(max_rows=10)
+        rows = _rows(25)
+        self.assertEqual(list(cache.record("report", 1, iter(rows))), rows)
+        self.assertIsNone(cache.get("report", 1))
+
+    def test_large_result_spills_to_disk(self):
+        cache = ReportCache(max_rows=10, cache_dir=self.cache_dir)
+        rows = _rows(25)
+        with mock.patch.object(report_cache, "SPILL_CHUNK_ROWS", 4):
+            self.assertEqual(list(cache.record("report", 1, iter(rows))), rows)
+        self.assertEqual(len(self.disk_files()), 1)
+        self.assertEqual(list(cache.get("report", 1)), rows)
+        # Результат с другой версией данных не возвращается, файл удаляется
+        self.assertIsNone(cache.get("report", 2))
+        self.assertEqual(self.disk_files(), [])
+
+    def test_cancelled_spill_leaves_no_files(self):
+        cache = ReportCache(max_rows=10, cache_dir=self.cache_dir)
+        recorder = cache.record("report", 1, iter(_rows(25)))
+        for _ in range(20):
+            next(recorder)
+        recorder.close()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        self.assertIsNone(cache.get("report", 1))
+
+    def test_evicted_entries_move_to_disk(self):
+        cache = ReportCache(max_rows=10, cache_dir=self.cache_dir, disk_entries=2)
+        for name in ("a", "b", "c", "d"):
+            cache.put(name, 1, _rows(8, name))
+        # В памяти осталась только "d", вытесненные "a"-"c" на диске, но хранятся не больше двух
+        self.assertEqual(len(self.disk_files()), 2)
+        self.assertIsNone(cache.get("a", 1))
+        self.assertEqual(list(cache.get("c", 1)), _rows(8, "c"))
+        self.assertEqual(list(cache.get("d", 1)), _rows(8, "d"))
+
+        cache.clear()
+        self.assertEqual(self.disk_files(), [])
+        self.assertIsNone(cache.get("d", 1))
+
+    def test_normalize_filters(self):
+        self.assertEqual(normalize_filters({"model": " HP ", "cabinet": "", "id_category": None, "id_unit_type": 2}),
+                         (("id_unit_type", 2), ("model", "HP")))
+        self.assertEqual(normalize_filters({"b": "1", "a": "2"}), normalize_filters({"a": "2", "b": "1"}))
+
+
+if __name__ == "__main__":
+    unittest.main()